@@ -0,0 +1,433 @@
+"""Benchmark cache adapters under realistic, reproducible workloads.
+
+Usage::
+
+    python benchmarks/bench_adapters.py [--adapters memory,disk,redis]
+        [--workload read-heavy] [--workers 1,4] [--mode threads|processes]
+        [--json] [--out results.json] [--compare baseline.json]
+
+Keys follow a Zipfian or uniform popularity over a fixed key space; each
+operation is a read (cache-aside: a miss is followed by a fill) or a write,
+with TTLs and value sizes drawn from configurable mixes.  Operation streams
+are generated from ``--seed`` before timing starts, so two runs of the same
+command replay the same requests.  Results (ops/sec, p50/p99/p999 latency,
+hit ratio) are printed as a table or as JSON for comparison across commits.
+
+Redis runs offline: ``--redis-url`` if given, else a spawned ``redis-server``
+when one is on PATH, else an in-process fakeredis TCP server (fakeredis
+required).  With ``--mode processes`` every worker opens its own adapter;
+``memory`` / ``concurrent`` caches are then private and prefilled per worker.
+``--adapters disk --mode processes --workers 1,2,4,8`` shows how throughput
+scales with processes sharing one SQLite file.
+"""
+from __future__ import annotations
+
+import argparse
+import bisect
+import json
+import math
+import multiprocessing as mp
+import os
+import platform
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Any, Iterator, Optional
+
+from dd_cache.base import BaseCacheAdapter
+
+ADAPTERS = ["memory", "concurrent", "disk", "disk-wb", "redis", "tiered-disk"]
+_PROCESS_LOCAL = {"memory", "concurrent"}
+
+WORKLOADS: dict[str, dict[str, Any]] = {
+    "read-heavy": {"distribution": "zipf", "zipf_s": 0.99, "read_ratio": 0.95,
+                   "ttl_mix": "none", "value_size": "fixed:1024"},
+    "write-heavy": {"distribution": "uniform", "read_ratio": 0.5,
+                    "ttl_mix": "none", "value_size": "fixed:1024"},
+    "llm": {"distribution": "zipf", "zipf_s": 0.8, "read_ratio": 0.9,
+            "ttl_mix": "0.6:none,0.3:3600,0.1:1", "value_size": "lognormal:4096:1.0"},
+    "session": {"distribution": "zipf", "zipf_s": 1.1, "read_ratio": 0.8,
+                "ttl_mix": "1.0:2", "value_size": "lognormal:256:0.5"},
+}
+
+_MAX_VALUE = 1 << 20
+_VALUE_POOL = 256
+
+
+# ----------------------------------------------------------------------
+# Workload generation
+# ----------------------------------------------------------------------
+
+def parse_ttl_mix(spec: str) -> list[tuple[float, Optional[int]]]:
+    """``"0.7:none,0.3:60"`` -> ``[(0.7, None), (0.3, 60)]``; ``"none"`` means no TTLs."""
+    if spec == "none":
+        return [(1.0, None)]
+    mix = []
+    for part in spec.split(","):
+        weight, ttl = part.split(":")
+        mix.append((float(weight), None if ttl == "none" else int(ttl)))
+    return mix
+
+
+def value_sizes(spec: str, rng: random.Random, n: int) -> list[int]:
+    """``fixed:N`` or ``lognormal:MEDIAN:SIGMA`` -> *n* sizes in bytes."""
+    kind, *params = spec.split(":")
+    if kind == "fixed":
+        return [int(params[0])] * n
+    if kind == "lognormal":
+        median, sigma = float(params[0]), float(params[1])
+        mu = math.log(median)
+        return [min(_MAX_VALUE, max(1, int(rng.lognormvariate(mu, sigma)))) for _ in range(n)]
+    raise SystemExit(f"unknown value size distribution {spec!r}")
+
+
+def make_ops(workload: dict[str, Any], ops: int, seed: int) -> list[tuple[bool, str, Optional[int], int]]:
+    """Generate ``(is_read, key, ttl, value_index)`` tuples for one worker."""
+    rng = random.Random(seed)
+    keys = workload["keys"]
+    ids = list(range(keys))
+    random.Random(0).shuffle(ids)  # hot keys are not neighbours in key order
+    if workload["distribution"] == "zipf":
+        s = workload["zipf_s"]
+        cdf, total = [], 0.0
+        for rank in range(keys):
+            total += 1.0 / (rank + 1) ** s
+            cdf.append(total)
+        pick = lambda: ids[bisect.bisect_left(cdf, rng.random() * total)]  # noqa: E731
+    else:
+        pick = lambda: ids[rng.randrange(keys)]  # noqa: E731
+    ttl_mix = parse_ttl_mix(workload["ttl_mix"])
+    ttls = [ttl for _, ttl in ttl_mix]
+    weights = [weight for weight, _ in ttl_mix]
+    read_ratio = workload["read_ratio"]
+    return [
+        (
+            rng.random() < read_ratio,
+            f"bench:{pick():08d}",
+            rng.choices(ttls, weights)[0],
+            rng.randrange(_VALUE_POOL),
+        )
+        for _ in range(ops)
+    ]
+
+
+def make_values(workload: dict[str, Any], seed: int) -> list[bytes]:
+    rng = random.Random(seed)
+    return [rng.randbytes(size) if hasattr(rng, "randbytes") else os.urandom(size)
+            for size in value_sizes(workload["value_size"], rng, _VALUE_POOL)]
+
+
+# ----------------------------------------------------------------------
+# Adapters
+# ----------------------------------------------------------------------
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@contextmanager
+def local_redis(url: Optional[str]) -> Iterator[Optional[str]]:
+    """Yield a Redis URL: *url*, a spawned ``redis-server``, or fakeredis over TCP."""
+    if url is not None:
+        yield url
+        return
+    port = _free_port()
+    if shutil.which("redis-server"):
+        proc = subprocess.Popen(
+            ["redis-server", "--port", str(port), "--save", "", "--appendonly", "no"],
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        try:
+            for _ in range(100):
+                try:
+                    socket.create_connection(("127.0.0.1", port), timeout=0.1).close()
+                    break
+                except OSError:
+                    time.sleep(0.05)
+            yield f"redis://127.0.0.1:{port}/0"
+        finally:
+            proc.terminate()
+            proc.wait()
+        return
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        yield None
+        return
+    server = TcpFakeServer(("127.0.0.1", port))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"redis://127.0.0.1:{port}/0"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def open_adapter(name: str, workdir: str, redis_url: Optional[str]) -> BaseCacheAdapter:
+    if name == "memory":
+        from dd_cache import InMemoryCache
+        return InMemoryCache()
+    if name == "concurrent":
+        from dd_cache import ConcurrentInMemoryCache
+        return ConcurrentInMemoryCache()
+    if name in ("disk", "disk-wb"):
+        from dd_cache import DiskCache
+        return DiskCache(Path(workdir) / f"{name}.db", write_behind=name == "disk-wb")
+    if name == "redis":
+        import redis
+        from dd_cache import RedisCache
+        return RedisCache(client=redis.Redis.from_url(redis_url))
+    if name == "tiered-disk":
+        from dd_cache import DiskCache, TieredCache
+        return TieredCache(DiskCache(Path(workdir) / "tiered.db"), l1_ttl=1)
+    raise SystemExit(f"unknown adapter {name!r}; choose from {', '.join(ADAPTERS)}")
+
+
+def prefill(cache: BaseCacheAdapter, workload: dict[str, Any], values: list[bytes]) -> None:
+    keys = workload["keys"]
+    for start in range(0, keys, 1000):
+        cache.set_many({
+            f"bench:{i:08d}": values[i % _VALUE_POOL]
+            for i in range(start, min(start + 1000, keys))
+        })
+
+
+# ----------------------------------------------------------------------
+# Runner
+# ----------------------------------------------------------------------
+
+def run_ops(cache: BaseCacheAdapter, ops: list, values: list[bytes]) -> dict[str, Any]:
+    """Replay *ops*; returns start/end timestamps, per-op latencies and hits."""
+    clock = time.perf_counter
+    get_lat: list[float] = []
+    set_lat: list[float] = []
+    hits = 0
+    start = clock()
+    for is_read, key, ttl, vi in ops:
+        t0 = clock()
+        if is_read:
+            if cache.get(key) is None:
+                cache.set(key, values[vi], ttl=ttl)  # cache-aside fill
+            else:
+                hits += 1
+            get_lat.append(clock() - t0)
+        else:
+            cache.set(key, values[vi], ttl=ttl)
+            set_lat.append(clock() - t0)
+    return {"start": start, "end": clock(), "get": get_lat, "set": set_lat, "hits": hits}
+
+
+def _process_worker(args: tuple) -> dict[str, Any]:
+    name, workdir, redis_url, workload, ops, seed, ready, go = args
+    cache = open_adapter(name, workdir, redis_url)
+    values = make_values(workload, workload["seed"])
+    if name in _PROCESS_LOCAL and workload["prefill"]:
+        prefill(cache, workload, values)
+    stream = make_ops(workload, ops, seed)
+    ready.release()
+    go.wait()
+    try:
+        return run_ops(cache, stream, values)
+    finally:
+        cache.close()
+
+
+def run_threads(cache: BaseCacheAdapter, workload: dict[str, Any], workers: int) -> list[dict]:
+    values = make_values(workload, workload["seed"])
+    streams = [make_ops(workload, workload["ops"] // workers, workload["seed"] + w + 1)
+               for w in range(workers)]
+    barrier = threading.Barrier(workers)
+    results: list[dict] = [{}] * workers
+
+    def work(w: int) -> None:
+        barrier.wait()
+        results[w] = run_ops(cache, streams[w], values)
+
+    threads = [threading.Thread(target=work, args=(w,)) for w in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return results
+
+
+def run_processes(name: str, workdir: str, redis_url: Optional[str],
+                  workload: dict[str, Any], workers: int) -> list[dict]:
+    ctx = mp.get_context("spawn")
+    manager = ctx.Manager()
+    ready, go = manager.Semaphore(0), manager.Event()
+    jobs = [(name, workdir, redis_url, workload, workload["ops"] // workers,
+             workload["seed"] + w + 1, ready, go) for w in range(workers)]
+    with ctx.Pool(workers) as pool:
+        pending = pool.map_async(_process_worker, jobs)
+        for _ in range(workers):
+            ready.acquire()
+        go.set()
+        results = pending.get()
+    manager.shutdown()
+    return results
+
+
+def percentiles(samples: list[float]) -> dict[str, float]:
+    if not samples:
+        return {"count": 0}
+    ordered = sorted(samples)
+    n = len(ordered)
+
+    def at(q: float) -> float:
+        return round(ordered[min(n - 1, int(q * n))] * 1e6, 2)
+
+    return {
+        "count": n,
+        "mean_us": round(sum(ordered) / n * 1e6, 2),
+        "p50_us": at(0.50),
+        "p99_us": at(0.99),
+        "p999_us": at(0.999),
+    }
+
+
+def summarise(name: str, mode: str, workers: int, results: list[dict]) -> dict[str, Any]:
+    elapsed = max(r["end"] for r in results) - min(r["start"] for r in results)
+    gets = [x for r in results for x in r["get"]]
+    sets = [x for r in results for x in r["set"]]
+    ops = len(gets) + len(sets)
+    return {
+        "adapter": name,
+        "mode": mode,
+        "workers": workers,
+        "ops": ops,
+        "seconds": round(elapsed, 4),
+        "ops_per_sec": round(ops / elapsed, 1) if elapsed else 0.0,
+        "hit_ratio": round(sum(r["hits"] for r in results) / len(gets), 4) if gets else 0.0,
+        "latency": {"all": percentiles(gets + sets), "get": percentiles(gets), "set": percentiles(sets)},
+    }
+
+
+def bench(name: str, workload: dict[str, Any], workers: int, mode: str,
+          redis_url: Optional[str]) -> dict[str, Any]:
+    with tempfile.TemporaryDirectory(prefix="dd-cache-bench-") as workdir:
+        cache = open_adapter(name, workdir, redis_url)
+        cache.clear()
+        values = make_values(workload, workload["seed"])
+        try:
+            if mode == "threads":
+                if workload["prefill"]:
+                    prefill(cache, workload, values)
+                results = run_threads(cache, workload, workers)
+            else:
+                if workload["prefill"] and name not in _PROCESS_LOCAL:
+                    prefill(cache, workload, values)
+                cache.close()  # workers open their own; SQLite files stay in workdir
+                results = run_processes(name, workdir, redis_url, workload, workers)
+        finally:
+            cache.close()
+    return summarise(name, mode, workers, results)
+
+
+# ----------------------------------------------------------------------
+# Reporting
+# ----------------------------------------------------------------------
+
+def git_commit() -> Optional[str]:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                             text=True, cwd=Path(__file__).parent, check=True)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return out.stdout.strip()
+
+
+def print_table(report: dict[str, Any], baseline: Optional[dict[str, Any]]) -> None:
+    base = {}
+    if baseline is not None:
+        base = {(r["adapter"], r["mode"], r["workers"]): r for r in baseline["results"]}
+    header = f"{'adapter':<14}{'workers':>8}{'ops/s':>12}{'hit%':>7}{'p50 µs':>9}{'p99 µs':>9}{'p999 µs':>10}"
+    print(f"workload: {report['workload']}")
+    print(header + ("   vs baseline" if base else ""))
+    for r in report["results"]:
+        lat = r["latency"]["all"]
+        line = (f"{r['adapter']:<14}{r['workers']:>8}{r['ops_per_sec']:>12,.0f}"
+                f"{r['hit_ratio'] * 100:>7.1f}{lat['p50_us']:>9}{lat['p99_us']:>9}{lat['p999_us']:>10}")
+        old = base.get((r["adapter"], r["mode"], r["workers"]))
+        if old:
+            speed = r["ops_per_sec"] / old["ops_per_sec"] if old["ops_per_sec"] else float("nan")
+            p99 = lat["p99_us"] / old["latency"]["all"]["p99_us"] if old["latency"]["all"]["p99_us"] else float("nan")
+            line += f"   {speed:.2f}x ops/s, {p99:.2f}x p99"
+        print(line)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--adapters", default="memory,concurrent,disk,redis",
+                        help=f"comma-separated subset of {','.join(ADAPTERS)}")
+    parser.add_argument("--workload", choices=sorted(WORKLOADS), default="read-heavy")
+    parser.add_argument("--distribution", choices=["zipf", "uniform"])
+    parser.add_argument("--zipf-s", type=float, help="Zipf exponent (higher = more skew)")
+    parser.add_argument("--read-ratio", type=float)
+    parser.add_argument("--ttl-mix", help='e.g. "0.7:none,0.3:60"')
+    parser.add_argument("--value-size", help='"fixed:N" or "lognormal:MEDIAN:SIGMA"')
+    parser.add_argument("--keys", type=int, default=10_000, help="key space size")
+    parser.add_argument("--ops", type=int, default=50_000, help="operations per run, split over workers")
+    parser.add_argument("--workers", default="1", help="comma-separated worker counts, e.g. 1,4,8")
+    parser.add_argument("--mode", choices=["threads", "processes"], default="threads")
+    parser.add_argument("--no-prefill", action="store_true", help="start every run with an empty cache")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--redis-url", help="benchmark an existing server instead of a local one")
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    parser.add_argument("--out", type=Path, help="also write the JSON report to this file")
+    parser.add_argument("--compare", type=Path, help="JSON report from an earlier run to diff against")
+    args = parser.parse_args()
+
+    workload = {"name": args.workload, "zipf_s": 0.99, **WORKLOADS[args.workload]}
+    for field in ("distribution", "zipf_s", "read_ratio", "ttl_mix", "value_size"):
+        value = getattr(args, field)
+        if value is not None:
+            workload[field] = value
+    workload.update(keys=args.keys, ops=args.ops, seed=args.seed, prefill=not args.no_prefill)
+
+    names = args.adapters.split(",")
+    results = []
+    with local_redis(args.redis_url) if "redis" in names else nullcontext() as redis_url:
+        for name in names:
+            if name == "redis" and redis_url is None:
+                print("skipping redis: no --redis-url, redis-server or fakeredis", file=sys.stderr)
+                continue
+            for workers in map(int, args.workers.split(",")):
+                if name == "memory" and workers > 1 and args.mode == "threads":
+                    print(f"skipping memory with {workers} threads: InMemoryCache is not thread-safe,"
+                          " see 'concurrent'", file=sys.stderr)
+                    continue
+                results.append(bench(name, workload, workers, args.mode, redis_url))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        },
+        "workload": workload,
+        "results": results,
+    }
+    if args.out is not None:
+        args.out.write_text(json.dumps(report, indent=2))
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+    baseline = json.loads(args.compare.read_text()) if args.compare is not None else None
+    print_table(report, baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Compare dd-cache codecs: bytes stored and encode/decode time per payload.
+
+Usage::
+
+    python benchmarks/bench_codecs.py [--repeat 50]
+
+NumPy payloads are included when NumPy is installed.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import time
+
+from dd_cache.codecs import Codec
+
+CODECS = [
+    Codec("pickle"),
+    Codec("pickle5"),
+    Codec("marshal"),
+    Codec("json"),
+    Codec("pickle", "zlib"),
+    Codec("pickle", "lzma"),
+    Codec("pickle", "bz2"),
+    Codec("json", "zlib"),
+    Codec("pickle5", "zlib"),
+]
+
+
+def payloads() -> dict[str, object]:
+    response = {
+        "model": "gpt-x",
+        "choices": [{"text": "The quick brown fox jumps over the lazy dog. " * 200}],
+        "usage": {"prompt_tokens": 812, "completion_tokens": 2048},
+    }
+    data: dict[str, object] = {
+        "small_dict": {"user": 42, "name": "Alice", "score": 99.5},
+        "llm_response": response,
+        "token_ids": list(range(8192)),
+    }
+    try:
+        import numpy as np
+    except ImportError:
+        return data
+    rng = np.random.default_rng(0)
+    data["embeddings_1kx384_f32"] = rng.standard_normal((1000, 384), dtype=np.float32)
+    return data
+
+
+def bench(codec: Codec, value: object, repeat: int) -> dict[str, float] | None:
+    try:
+        blob = codec.encode(value)
+    except Exception:
+        return None  # e.g. json/marshal cannot encode NumPy arrays
+    start = time.perf_counter()
+    for _ in range(repeat):
+        codec.encode(value)
+    encode_us = (time.perf_counter() - start) / repeat * 1e6
+    start = time.perf_counter()
+    for _ in range(repeat):
+        codec.decode(blob)
+    decode_us = (time.perf_counter() - start) / repeat * 1e6
+    return {"bytes": len(blob), "encode_us": round(encode_us, 1), "decode_us": round(decode_us, 1)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--json", action="store_true", help="emit JSON instead of a table")
+    args = parser.parse_args()
+
+    results: dict[str, dict[str, dict[str, float]]] = {}
+    for name, value in payloads().items():
+        results[name] = {}
+        for codec in CODECS:
+            row = bench(codec, value, args.repeat)
+            if row is not None:
+                results[name][codec.name] = row
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, rows in results.items():
+        print(f"\n{name}")
+        print(f"  {'codec':<14}{'bytes':>12}{'encode µs':>12}{'decode µs':>12}")
+        for codec_name, row in rows.items():
+            print(f"  {codec_name:<14}{row['bytes']:>12,}{row['encode_us']:>12}{row['decode_us']:>12}")
+
+
+if __name__ == "__main__":
+    main()
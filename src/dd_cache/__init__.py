@@ -1,16 +1,47 @@
 """dd-cache: backend-swappable caching layer for the dd-* ecosystem."""
 
+from dd_cache.adapters.array import ArrayCache
+from dd_cache.adapters.async_disk import AsyncDiskCache
+from dd_cache.adapters.async_memory import AsyncInMemoryCache
+from dd_cache.adapters.async_redis import AsyncRedisCache
 from dd_cache.adapters.disk import DiskCache
-from dd_cache.adapters.memory import InMemoryCache
+from dd_cache.adapters.memory import ConcurrentInMemoryCache, InMemoryCache
+from dd_cache.adapters.namespaced import NamespacedCache
 from dd_cache.adapters.redis_adapter import RedisCache
+from dd_cache.adapters.sharded import ShardedCache
+from dd_cache.adapters.shared import SharedMemoryCache
+from dd_cache.adapters.tiered import TieredCache
+from dd_cache.async_base import AsyncBaseCacheAdapter
 from dd_cache.base import BaseCacheAdapter
-from dd_cache.models import CacheError, CacheStats
+from dd_cache.codecs import Codec
+from dd_cache.decorators import cached
+from dd_cache.metrics import MetricsSink, StatsDSink
+from dd_cache.models import CacheError, CacheStats, CallStats
+from dd_cache.semantic import SemanticCache
+from dd_cache.snapshot import migrate
 
 __all__ = [
     "BaseCacheAdapter",
     "CacheError",
     "CacheStats",
+    "CallStats",
+    "Codec",
+    "cached",
+    "migrate",
+    "MetricsSink",
+    "StatsDSink",
     "InMemoryCache",
+    "ConcurrentInMemoryCache",
     "DiskCache",
     "RedisCache",
+    "ArrayCache",
+    "TieredCache",
+    "ShardedCache",
+    "SharedMemoryCache",
+    "NamespacedCache",
+    "SemanticCache",
+    "AsyncBaseCacheAdapter",
+    "AsyncInMemoryCache",
+    "AsyncDiskCache",
+    "AsyncRedisCache",
 ]
@@ -0,0 +1,389 @@
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Optional
+
+from dd_cache.adapters.disk import _ThreadConnections
+from dd_cache.base import _STATS_PURGE_LIMIT, MISSING, BaseCacheAdapter
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.snapshot import Entry
+from dd_cache.utils import prefix_end
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_DEFAULT_DIR = ".cache/dd_arrays"
+
+_DDL = """
+CREATE TABLE IF NOT EXISTS arrays (
+    key        TEXT PRIMARY KEY,
+    file       TEXT NOT NULL,
+    nbytes     INTEGER NOT NULL,
+    expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS arrays_expires_at
+    ON arrays (expires_at) WHERE expires_at IS NOT NULL;
+CREATE TABLE IF NOT EXISTS arrays_tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS arrays_tags_key ON arrays_tags (key);
+CREATE TRIGGER IF NOT EXISTS arrays_untag_delete AFTER DELETE ON arrays BEGIN
+    DELETE FROM arrays_tags WHERE key = OLD.key;
+END;
+CREATE TABLE IF NOT EXISTS arrays_meta (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+CREATE TRIGGER IF NOT EXISTS arrays_count_insert AFTER INSERT ON arrays BEGIN
+    UPDATE arrays_meta SET value = value + 1 WHERE name = 'entries';
+    UPDATE arrays_meta SET value = value + NEW.nbytes WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS arrays_bytes_update AFTER UPDATE OF nbytes ON arrays BEGIN
+    UPDATE arrays_meta SET value = value - OLD.nbytes + NEW.nbytes WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS arrays_count_delete AFTER DELETE ON arrays BEGIN
+    UPDATE arrays_meta SET value = value - 1 WHERE name = 'entries';
+    UPDATE arrays_meta SET value = value - OLD.nbytes WHERE name = 'bytes';
+END;
+"""
+
+
+class ArrayCache(BaseCacheAdapter):
+    """Memory-mapped NumPy array cache (the dd-embed ``EmbeddingCache``
+    replacement).
+
+    Requires NumPy (``pip install dd-cache[numpy]``).  Each array is written
+    once as a ``.npy`` file under *directory*; a small SQLite index maps keys
+    to files and expiry times.  ``get()`` returns a read-only ``np.memmap``
+    over the file, so nothing is deserialised or copied: opening a multi-GB
+    embedding table is instant, pages load on demand, and every process
+    mapping the same file shares one copy in the OS page cache.
+
+    Overwrites write a new file and swap the index row, so arrays already
+    handed out stay valid.  Up to *max_open* recently used maps are kept
+    open to make repeated reads free.  Only arrays with a fixed-size dtype
+    can be stored.
+    """
+
+    def __init__(self, directory: str | Path = _DEFAULT_DIR, *, max_open: int = 128) -> None:
+        try:
+            import numpy
+        except ImportError as exc:
+            raise CacheError(
+                "ArrayCache requires the 'numpy' package. "
+                "Install it with: pip install dd-cache[numpy]"
+            ) from exc
+        self._np = numpy
+        self._dir = Path(directory)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._conns = _ThreadConnections(self._connect)
+        self._conn.execute("PRAGMA journal_mode=wal")
+        self._conn.executescript(_DDL)
+        with self._transaction() as conn:
+            # Seed the trigger-kept totals once per index.
+            for name, total in (("entries", "COUNT(*)"), ("bytes", "COALESCE(SUM(nbytes), 0)")):
+                conn.execute(
+                    f"INSERT OR IGNORE INTO arrays_meta (name, value) SELECT ?, {total} FROM arrays",
+                    (name,),
+                )
+        self._max_open = max_open
+        self._maps: OrderedDict[str, np.memmap] = OrderedDict()
+        self._maps_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(str(self._dir / "index.db"), timeout=30.0, check_same_thread=False)
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._conns.get()
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """A write transaction that takes the write lock up front, so rows
+        read inside it cannot be replaced by another process before it
+        commits."""
+        conn = self._conn
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            yield conn
+
+    def _open(self, file: str) -> "np.memmap":
+        with self._maps_lock:
+            arr = self._maps.get(file)
+            if arr is not None:
+                self._maps.move_to_end(file)
+                return arr
+        arr = self._np.load(self._dir / file, mmap_mode="r", allow_pickle=False)
+        with self._maps_lock:
+            self._maps[file] = arr
+            if len(self._maps) > self._max_open:
+                self._maps.popitem(last=False)
+        return arr
+
+    def _unlink(self, file: str) -> None:
+        with self._maps_lock:
+            self._maps.pop(file, None)
+        try:
+            os.unlink(self._dir / file)
+        except OSError:
+            pass  # already gone, or still mapped on a platform that forbids it
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        row = self._conn.execute(
+            "SELECT file, expires_at FROM arrays WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return MISSING
+        file, expires_at = row
+        if expires_at is not None and time.time() > expires_at:
+            self._expire(key)
+            return MISSING
+        try:
+            arr = self._open(file)
+        except FileNotFoundError:
+            return MISSING  # replaced by another process between query and open
+        self.metrics.incr("bytes_out", arr.nbytes)
+        return arr, expires_at
+
+    def _remove(self, key: str) -> bool:
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT file, expires_at FROM arrays WHERE key = ?", (key,)
+            ).fetchone()
+            conn.execute("DELETE FROM arrays WHERE key = ?", (key,))
+        if row is None:
+            return False
+        self._unlink(row[0])
+        return row[1] is None or time.time() <= row[1]
+
+    def _expire(self, key: str) -> None:
+        """Remove *key* if it is still expired; a row another process has
+        replaced since it was read is left alone."""
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT file FROM arrays WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                (key, now),
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "DELETE FROM arrays WHERE key = ? AND expires_at IS NOT NULL AND expires_at <= ?",
+                    (key, now),
+                )
+        if row is not None:
+            self._unlink(row[0])
+            self.metrics.incr("expirations")
+
+    # ------------------------------------------------------------------
+    # Namespace internals
+    # ------------------------------------------------------------------
+
+    def _ns_generation(self, name: str, *, bump: bool = False) -> int:
+        with self._conn as conn:
+            if bump:
+                conn.execute(
+                    "INSERT INTO arrays_meta (name, value) VALUES (?, 1) "
+                    "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+                    (f"ns:{name}",),
+                )
+            row = conn.execute("SELECT value FROM arrays_meta WHERE name = ?", (f"ns:{name}",)).fetchone()
+        return row[0] if row else 0
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        end = prefix_end(prefix) if prefix else None
+        sql = "SELECT key, file FROM arrays WHERE key >= ?"
+        params: tuple[Any, ...] = (prefix, batch)
+        if end is not None:
+            sql += " AND key < ?"
+            params = (prefix, end, batch)
+        while True:
+            with self._transaction() as conn:
+                rows = conn.execute(sql + " LIMIT ?", params).fetchall()
+                conn.executemany("DELETE FROM arrays WHERE key = ?", [(k,) for k, _ in rows])
+            for _, file in rows:
+                self._unlink(file)
+            yield len(rows)
+            if len(rows) < batch:
+                return
+
+    def _pages(self, columns: str, prefix: str, batch: int) -> Iterator[list[Any]]:
+        """Yield pages of up to *batch* index rows of *columns* (key first)
+        for keys starting with *prefix*, in key order."""
+        end = prefix_end(prefix) if prefix else None
+        bound, op = prefix, ">="
+        while True:
+            sql = f"SELECT {columns} FROM arrays WHERE key {op} ?"
+            params: tuple[Any, ...] = (bound, batch)
+            if end is not None:
+                sql += " AND key < ?"
+                params = (bound, end, batch)
+            rows = self._conn.execute(sql + " ORDER BY key LIMIT ?", params).fetchall()
+            if rows:
+                yield rows
+            if len(rows) < batch:
+                return
+            bound, op = rows[-1][0], ">"
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        for rows in self._pages("key, file, expires_at", prefix, batch):
+            now = time.time()
+            entries = []
+            for key, file, expires_at in rows:
+                if expires_at is not None and expires_at <= now:
+                    continue
+                try:
+                    entries.append((key, self._open(file), expires_at))
+                except FileNotFoundError:
+                    pass  # replaced meanwhile
+            if entries:
+                yield entries
+
+    def _scan_keys(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        # Index rows only: no array file is opened.
+        for rows in self._pages("key, expires_at", prefix, batch):
+            now = time.time()
+            keys = [key for key, expires_at in rows if expires_at is None or expires_at > now]
+            if keys:
+                yield keys
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        entry = self._lookup(key)
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        return None if entry is MISSING else entry[0]
+
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        arr = self._np.asarray(value)
+        if arr.dtype.hasobject:
+            raise CacheError("ArrayCache only stores arrays with a fixed-size dtype")
+        name = uuid.uuid4().hex
+        file = f"{name[:2]}/{name}.npy"
+        path = self._dir / file
+        path.parent.mkdir(exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as fh:
+            self._np.lib.format.write_array(fh, arr, allow_pickle=False)
+        os.replace(tmp, path)
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._transaction() as conn:
+            old = conn.execute("SELECT file FROM arrays WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT INTO arrays (key, file, nbytes, expires_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET file = excluded.file, nbytes = excluded.nbytes, "
+                "expires_at = excluded.expires_at",
+                (key, file, arr.nbytes, expires_at),
+            )
+            conn.execute("DELETE FROM arrays_tags WHERE key = ?", (key,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO arrays_tags (tag, key) VALUES (?, ?)",
+                [(tag, key) for tag in tags],
+            )
+        if old is not None:
+            self._unlink(old[0])
+        self.metrics.incr("sets")
+        self.metrics.incr("bytes_in", arr.nbytes)
+        self.metrics.observe("set", time.perf_counter() - start)
+
+    def delete(self, key: str) -> bool:
+        start = time.perf_counter()
+        existed = self._remove(key)
+        if existed:
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
+        return existed
+
+    def exists(self, key: str) -> bool:
+        row = self._conn.execute(
+            "SELECT expires_at FROM arrays WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return False
+        if row[0] is not None and time.time() > row[0]:
+            self._expire(key)
+            return False
+        return True
+
+    def clear(self) -> None:
+        with self._transaction() as conn:
+            files = [r[0] for r in conn.execute("SELECT file FROM arrays")]
+            conn.execute("DELETE FROM arrays")
+        for file in files:
+            self._unlink(file)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        tags = tuple(dict.fromkeys(tags))
+        if not tags:
+            return 0
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT key, file, expires_at FROM arrays WHERE key IN "
+                f"(SELECT key FROM arrays_tags WHERE tag IN ({','.join('?' * len(tags))}))",
+                tags,
+            ).fetchall()
+            conn.executemany("DELETE FROM arrays WHERE key = ?", [(row[0],) for row in rows])
+        now = time.time()
+        for _, file, _ in rows:
+            self._unlink(file)
+        removed = sum(1 for _, _, expires_at in rows if expires_at is None or expires_at >= now)
+        self.metrics.incr("deletes", removed)
+        return removed
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        with self._transaction() as conn:
+            rows = conn.execute(
+                "SELECT key, file FROM arrays WHERE expires_at IS NOT NULL AND expires_at < ? "
+                "ORDER BY expires_at LIMIT ?",
+                (time.time(), -1 if limit is None else limit),
+            ).fetchall()
+            conn.executemany("DELETE FROM arrays WHERE key = ?", [(k,) for k, _ in rows])
+        for _, file in rows:
+            self._unlink(file)
+        self.metrics.incr("expirations", len(rows))
+        return len(rows)
+
+    def stats(self) -> CacheStats:
+        # Reclaim a bounded batch of due rows via the expiry index, then read
+        # the trigger-kept totals: no table scan, however many arrays there
+        # are.  Rows still due beyond the batch are counted until purged.
+        if self._conn.execute(
+            "SELECT 1 FROM arrays WHERE expires_at IS NOT NULL AND expires_at < ? LIMIT 1",
+            (time.time(),),
+        ).fetchone() is not None:
+            self.purge_expired(_STATS_PURGE_LIMIT)
+        totals = dict(self._conn.execute(
+            "SELECT name, value FROM arrays_meta WHERE name IN ('entries', 'bytes')"
+        ).fetchall())
+        total, nbytes = totals.get("entries", 0), totals.get("bytes", 0)
+        has_ttl = self._conn.execute(
+            "SELECT 1 FROM arrays WHERE expires_at IS NOT NULL LIMIT 1"
+        ).fetchone() is not None
+        return CacheStats(
+            backend="array",
+            total_keys=total,
+            ttl_enabled=has_ttl,
+            extra={"path": str(self._dir), "bytes": nbytes, "open_maps": len(self._maps)},
+            **self.metrics.snapshot(),
+        )
+
+    def close(self) -> None:
+        with self._maps_lock:
+            self._maps.clear()
+        self._conns.close_all()
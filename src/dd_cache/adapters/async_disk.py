@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, Mapping, Optional, TypeVar
+
+from dd_cache.adapters.disk import _DEFAULT_PATH, DiskCache
+from dd_cache.async_base import AsyncBaseCacheAdapter
+from dd_cache.base import TTLArg
+from dd_cache.models import CacheStats
+
+T = TypeVar("T")
+
+
+class AsyncDiskCache(AsyncBaseCacheAdapter):
+    """SQLite-backed cache for asyncio code.
+
+    Every call is offloaded to a dedicated thread pool of *max_workers*
+    threads (each with its own SQLite connection), so disk latency and
+    fsyncs never stall the event loop.  Extra keyword arguments are passed
+    through to :class:`DiskCache`.
+    """
+
+    def __init__(self, path: str | Path = _DEFAULT_PATH, *, max_workers: int = 4, **kwargs: Any) -> None:
+        self._cache = DiskCache(path, **kwargs)
+        self._metrics = self._cache.metrics  # one set of counters with the wrapped cache
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="dd-cache-disk")
+
+    async def _run(self, fn: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(fn, *args, **kwargs))
+
+    async def get(self, key: str) -> Any:
+        return await self._run(self._cache.get, key)
+
+    async def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        return await self._run(self._cache._lookup, key, with_expiry=with_expiry)
+
+    async def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        return await self._run(self._cache._acquire_fill_lock, key, timeout)
+
+    async def _release_fill_lock(self, key: str) -> None:
+        await self._run(self._cache._release_fill_lock, key)
+
+    async def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        await self._run(self._cache.set, key, value, ttl=ttl, tags=tuple(tags))
+
+    async def delete(self, key: str) -> bool:
+        return await self._run(self._cache.delete, key)
+
+    async def exists(self, key: str) -> bool:
+        return await self._run(self._cache.exists, key)
+
+    async def clear(self) -> None:
+        await self._run(self._cache.clear)
+
+    async def stats(self) -> CacheStats:
+        return await self._run(self._cache.stats)
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        return await self._run(self._cache.get_many, list(keys))
+
+    async def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        await self._run(self._cache.set_many, dict(items), ttl=ttl, tags=tuple(tags))
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        return await self._run(self._cache.delete_many, list(keys))
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        return await self._run(self._cache.invalidate_tags, *tags)
+
+    async def close(self) -> None:
+        await self._run(self._cache.close)
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,58 @@
+from __future__ import annotations
+
+from typing import Any, Iterable, Mapping, Optional
+
+from dd_cache.adapters.memory import InMemoryCache
+from dd_cache.async_base import AsyncBaseCacheAdapter
+from dd_cache.base import TTLArg
+from dd_cache.models import CacheStats
+
+
+class AsyncInMemoryCache(AsyncBaseCacheAdapter):
+    """In-process cache for asyncio code.
+
+    Wraps an :class:`InMemoryCache`; each coroutine runs its dict operation
+    to completion without awaiting, so it is atomic with respect to other
+    tasks on the loop and needs no lock.  Constructor arguments are passed
+    through to :class:`InMemoryCache`.
+    """
+
+    def __init__(self, **kwargs: Any) -> None:
+        self._cache = InMemoryCache(**kwargs)
+        self._metrics = self._cache.metrics  # one set of counters with the wrapped cache
+
+    async def get(self, key: str) -> Any:
+        return self._cache.get(key)
+
+    async def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        return self._cache._lookup(key, with_expiry=with_expiry)
+
+    async def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        self._cache.set(key, value, ttl=ttl, tags=tags)
+
+    async def delete(self, key: str) -> bool:
+        return self._cache.delete(key)
+
+    async def exists(self, key: str) -> bool:
+        return self._cache.exists(key)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+
+    async def stats(self) -> CacheStats:
+        return self._cache.stats()
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        return self._cache.get_many(keys)
+
+    async def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        self._cache.set_many(items, ttl=ttl, tags=tags)
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        return self._cache.delete_many(keys)
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        return self._cache.invalidate_tags(*tags)
+
+    async def close(self) -> None:
+        self._cache.close()
@@ -0,0 +1,255 @@
+from __future__ import annotations
+
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Mapping, Optional
+
+from dd_cache.adapters.redis_adapter import (
+    _BATCH,
+    _LOCK_PREFIX,
+    _TAG_PREFIX,
+    RedisCache,
+    _queue_retag,
+    _queue_retag_fixups,
+)
+from dd_cache.async_base import AsyncBaseCacheAdapter
+from dd_cache.base import MISSING, TTLArg, ttl_for
+from dd_cache.codecs import DEFAULT_CODEC, Codec
+from dd_cache.models import CacheError, CacheStats
+
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis_lib
+
+
+class AsyncRedisCache(AsyncBaseCacheAdapter):
+    """Redis-backed cache built on ``redis.asyncio``.
+
+    Requires the ``redis`` package (``pip install dd-cache[redis]``).  All
+    commands share one connection pool of up to *max_connections*
+    connections, so concurrent tasks multiplex over a bounded set of
+    sockets.  Pass *client* to reuse an existing async client.  Values are
+    serialised with *codec* (default: pickle).  Tags, and *tagging*, work
+    as in :class:`~dd_cache.adapters.redis_adapter.RedisCache`.
+    """
+
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        *,
+        max_connections: int = 50,
+        client: Optional["aioredis_lib.Redis"] = None,
+        codec: Codec = DEFAULT_CODEC,
+        tagging: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        self._codec = codec
+        self._tagging = tagging
+        self._lock_token = uuid.uuid4().hex.encode()
+        if client is not None:
+            self._client = client
+            return
+        try:
+            import redis.asyncio as aioredis
+        except ImportError as exc:
+            raise CacheError(
+                "AsyncRedisCache requires the 'redis' package. "
+                "Install it with: pip install dd-cache[redis]"
+            ) from exc
+        pool = aioredis.ConnectionPool(
+            host=host, port=port, db=db, max_connections=max_connections, **kwargs
+        )
+        self._client: aioredis_lib.Redis = aioredis.Redis(connection_pool=pool)
+
+    # ------------------------------------------------------------------
+    # Stampede protection internals
+    # ------------------------------------------------------------------
+
+    async def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        if with_expiry:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            data, pttl = await pipe.execute()
+        else:
+            data, pttl = await self._client.get(key), -1
+        if data is None:
+            return MISSING
+        self.metrics.incr("bytes_out", len(data))
+        expires_at = time.time() + pttl / 1000 if pttl is not None and pttl > 0 else None
+        return self._codec.decode(data), expires_at
+
+    async def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        return bool(await self._client.set(
+            _LOCK_PREFIX + key, self._lock_token, nx=True, px=max(int(timeout * 1000), 1)
+        ))
+
+    async def _release_fill_lock(self, key: str) -> None:
+        from redis.exceptions import WatchError
+
+        lock_key = _LOCK_PREFIX + key
+        async with self._client.pipeline() as pipe:
+            try:
+                await pipe.watch(lock_key)
+                if await pipe.get(lock_key) == self._lock_token:
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    await pipe.execute()
+            except WatchError:
+                pass  # lock expired and was re-taken meanwhile; it is not ours
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    async def _write_tagged(
+        self, keys: list[tuple[str, Optional[int]]], tags: tuple[str, ...], queue: Callable[[Any], Any],
+    ) -> list[Any]:
+        pipe = self._client.pipeline(transaction=False)
+        queue(pipe)
+        if not tags and not self._tagging:
+            return await pipe.execute()
+        written = len(pipe)
+        _queue_retag(pipe, keys, tags)
+        replies = await pipe.execute()
+        fixups = self._client.pipeline(transaction=False)
+        if _queue_retag_fixups(fixups, keys, tags, replies[written:]):
+            await fixups.execute()
+        return replies[:written]
+
+    async def _unlink_tagged(self, keys: list[str]) -> int:
+        if not self._tagging:
+            return await self._client.unlink(*keys)
+        return (await self._write_tagged([(key, None) for key in keys], (), lambda pipe: pipe.unlink(*keys)))[0]
+
+    # ------------------------------------------------------------------
+    # AsyncBaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    async def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        data = await self._client.get(key)
+        self.metrics.lookup(data is not None, time.perf_counter() - start)
+        if data is None:
+            return None
+        self.metrics.incr("bytes_out", len(data))
+        return self._codec.decode(data)
+
+    async def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        data = self._codec.encode(value)
+        tags = tuple(tags)
+        if tags or self._tagging:
+            await self._write_tagged([(key, ttl)], tags, lambda pipe: pipe.set(key, data, ex=ttl))
+        else:
+            await self._client.set(key, data, ex=ttl)
+        self.metrics.incr("sets")
+        self.metrics.incr("bytes_in", len(data))
+        self.metrics.observe("set", time.perf_counter() - start)
+
+    async def delete(self, key: str) -> bool:
+        start = time.perf_counter()
+        if self._tagging:
+            existed = bool((await self._write_tagged([(key, None)], (), lambda pipe: pipe.delete(key)))[0])
+        else:
+            existed = bool(await self._client.delete(key))
+        if existed:
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
+        return existed
+
+    async def exists(self, key: str) -> bool:
+        return bool(await self._client.exists(key))
+
+    async def clear(self) -> None:
+        await self._client.flushdb()
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        from redis.exceptions import ResponseError
+
+        start = time.perf_counter()
+        removed = 0
+        for tag in dict.fromkeys(tags):
+            detached = f"{_TAG_PREFIX}{tag}:invalidating:{uuid.uuid4().hex}"
+            try:
+                await self._client.rename(_TAG_PREFIX + tag, detached)
+            except ResponseError:
+                continue  # no such tag
+            chunk: list[str] = []
+            async for key in self._client.sscan_iter(detached, count=_BATCH):
+                chunk.append(key.decode() if isinstance(key, bytes) else key)
+                if len(chunk) >= _BATCH:
+                    removed += await self._unlink_tagged(chunk)
+                    chunk = []
+            if chunk:
+                removed += await self._unlink_tagged(chunk)
+            await self._client.unlink(detached)
+        self.metrics.incr("deletes", removed)
+        self.metrics.observe("invalidate_tags", time.perf_counter() - start)
+        return removed
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        result: dict[str, Any] = {}
+        requested = read = 0
+        for chunk in RedisCache._chunks(list(dict.fromkeys(keys))):
+            requested += len(chunk)
+            for key, data in zip(chunk, await self._client.mget(chunk)):
+                if data is not None:
+                    read += len(data)
+                    result[key] = self._codec.decode(data)
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", requested - len(result))
+        self.metrics.incr("bytes_out", read)
+        self.metrics.observe("get_many", time.perf_counter() - start)
+        return result
+
+    async def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
+        written = 0
+        for chunk in RedisCache._chunks(list(items)):
+            encoded = [(key, self._codec.encode(items[key]), ttl_for(ttl, key)) for key in chunk]
+            written += sum(len(data) for _, data, _ in encoded)
+
+            def queue_sets(pipe: Any, encoded: list[tuple[str, bytes, Optional[int]]] = encoded) -> None:
+                for key, data, key_ttl in encoded:
+                    pipe.set(key, data, ex=key_ttl)
+
+            await self._write_tagged([(key, key_ttl) for key, _, key_ttl in encoded], tags, queue_sets)
+        self.metrics.incr("sets", len(items))
+        self.metrics.incr("bytes_in", written)
+        self.metrics.observe("set_many", time.perf_counter() - start)
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        start = time.perf_counter()
+        deleted = 0
+        for chunk in RedisCache._chunks(list(dict.fromkeys(keys))):
+            deleted += await self._unlink_tagged(chunk)
+        self.metrics.incr("deletes", deleted)
+        self.metrics.observe("delete_many", time.perf_counter() - start)
+        return deleted
+
+    async def stats(self) -> CacheStats:
+        from redis.exceptions import ResponseError
+
+        try:
+            info = await self._client.info()
+        except ResponseError:
+            info = {}  # INFO is disabled on some proxies and managed services
+        return CacheStats(
+            backend="redis",
+            total_keys=await self._client.dbsize(),
+            ttl_enabled=True,
+            extra={
+                "codec": self._codec.name,
+                "redis_version": info.get("redis_version", "unknown"),
+                "used_memory_human": info.get("used_memory_human", "unknown"),
+            },
+            **self.metrics.snapshot(),
+        )
+
+    async def close(self) -> None:
+        close = getattr(self._client, "aclose", None) or self._client.close
+        await close()
@@ -1,105 +1,1049 @@
 from __future__ import annotations
 
+import hashlib
+import math
+import random
 import sqlite3
+import threading
 import time
+import uuid
+import weakref
 from pathlib import Path
-from typing import Any, Optional
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, TypeVar
 
-from dd_cache.base import BaseCacheAdapter
-from dd_cache.models import CacheStats
-from dd_cache.utils import deserialize, serialize
+from dd_cache.base import _STATS_PURGE_LIMIT, MISSING, BaseCacheAdapter, TTLArg, ttl_for
+from dd_cache.codecs import DEFAULT_CODEC, Codec
+from dd_cache.expiry import ExpirySweeper
+from dd_cache.filters import KeyFilter
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.snapshot import Entry
+from dd_cache.utils import prefix_end
 
 _DEFAULT_PATH = ".cache/dd_cache.db"
+_IN_CHUNK = 500  # stays well below SQLite's bound-parameter limit
+_JOURNAL_MODES = {"delete", "truncate", "persist", "memory", "wal", "off"}
+_SYNCHRONOUS = {"off", "normal", "full", "extra"}
+_NOT_BUFFERED = object()
+_TOUCH_BATCH = 256  # access-time stamps queued before they are written
+_VACUUM_PAGES = 1024  # free pages returned to the OS per incremental step
+_DEDUP_MIN_SIZE = 64  # smaller values are stored inline; a blob row costs more
+_GC_BATCH = 256  # unreferenced blobs deleted per collection step
+
+T = TypeVar("T")
+
+_Entry = tuple[bytes, Optional[float], tuple[str, ...]]  # buffered (blob, expires_at, tags)
+
+# A true upsert (not INSERT OR REPLACE) so the row-count triggers see an
+# UPDATE rather than an uncounted delete plus a counted insert.
+_UPSERT_SQL = (
+    "INSERT INTO cache (key, value, expires_at, size, accessed_at, blob) VALUES (?, ?, ?, ?, ?, ?) "
+    "ON CONFLICT (key) DO UPDATE SET value = excluded.value, expires_at = excluded.expires_at, "
+    "size = excluded.size, accessed_at = excluded.accessed_at, blob = excluded.blob"
+)
+
+_BLOB_SQL = "INSERT INTO cache_blobs (hash, value) VALUES (?, ?) ON CONFLICT (hash) DO NOTHING"
+
+# Rows written in dedup mode hold an empty value and the hash of a shared
+# blob; every read resolves both kinds, whichever mode wrote them.
+_READ_FROM = "cache LEFT JOIN cache_blobs ON cache_blobs.hash = cache.blob"
+_VALUE = "COALESCE(cache_blobs.value, cache.value)"
 
 _DDL = """
 CREATE TABLE IF NOT EXISTS cache (
     key        TEXT PRIMARY KEY,
     value      BLOB NOT NULL,
-    expires_at REAL
+    expires_at REAL,
+    size       INTEGER NOT NULL DEFAULT 0,
+    accessed_at REAL NOT NULL DEFAULT 0,
+    blob       BLOB
+);
+CREATE INDEX IF NOT EXISTS cache_expires_at
+    ON cache (expires_at) WHERE expires_at IS NOT NULL;
+CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at);
+CREATE TABLE IF NOT EXISTS cache_locks (
+    key        TEXT PRIMARY KEY,
+    owner      TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS cache_meta (
+    name  TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
 );
+CREATE TRIGGER IF NOT EXISTS cache_count_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_meta SET value = value + 1 WHERE name = 'entries';
+END;
+CREATE TRIGGER IF NOT EXISTS cache_count_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_meta SET value = value - 1 WHERE name = 'entries';
+END;
+CREATE TRIGGER IF NOT EXISTS cache_bytes_insert AFTER INSERT ON cache BEGIN
+    UPDATE cache_meta SET value = value + NEW.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS cache_bytes_update AFTER UPDATE OF size ON cache BEGIN
+    UPDATE cache_meta SET value = value - OLD.size + NEW.size WHERE name = 'bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS cache_bytes_delete AFTER DELETE ON cache BEGIN
+    UPDATE cache_meta SET value = value - OLD.size WHERE name = 'bytes';
+END;
+CREATE TABLE IF NOT EXISTS cache_tags (
+    tag TEXT NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (tag, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS cache_tags_key ON cache_tags (key);
+CREATE TRIGGER IF NOT EXISTS cache_untag_delete AFTER DELETE ON cache BEGIN
+    DELETE FROM cache_tags WHERE key = OLD.key;
+END;
+CREATE TABLE IF NOT EXISTS cache_blobs (
+    hash  BLOB PRIMARY KEY,
+    value BLOB NOT NULL,
+    refs  INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS cache_blobs_orphans ON cache_blobs (refs) WHERE refs = 0;
+CREATE TRIGGER IF NOT EXISTS cache_blob_ref_insert AFTER INSERT ON cache
+WHEN NEW.blob IS NOT NULL BEGIN
+    UPDATE cache_blobs SET refs = refs + 1 WHERE hash = NEW.blob;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_blob_ref_update AFTER UPDATE OF blob ON cache
+WHEN OLD.blob IS NOT NEW.blob BEGIN
+    UPDATE cache_blobs SET refs = refs - 1 WHERE hash = OLD.blob;
+    UPDATE cache_blobs SET refs = refs + 1 WHERE hash = NEW.blob;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_blob_ref_delete AFTER DELETE ON cache
+WHEN OLD.blob IS NOT NULL BEGIN
+    UPDATE cache_blobs SET refs = refs - 1 WHERE hash = OLD.blob;
+END;
+CREATE TRIGGER IF NOT EXISTS cache_blob_count_insert AFTER INSERT ON cache_blobs BEGIN
+    UPDATE cache_meta SET value = value + 1 WHERE name = 'blobs';
+    UPDATE cache_meta SET value = value + length(NEW.value) WHERE name = 'blob_bytes';
+END;
+CREATE TRIGGER IF NOT EXISTS cache_blob_count_delete AFTER DELETE ON cache_blobs BEGIN
+    UPDATE cache_meta SET value = value - 1 WHERE name = 'blobs';
+    UPDATE cache_meta SET value = value - length(OLD.value) WHERE name = 'blob_bytes';
+END;
 """
 
+_GC_SQL = (
+    "DELETE FROM cache_blobs WHERE hash IN "
+    "(SELECT hash FROM cache_blobs WHERE refs = 0 LIMIT ?)"
+)
+
+_TAG_SQL = "INSERT OR IGNORE INTO cache_tags (tag, key) VALUES (?, ?)"
+
+_DELETE_RANGE_SQL = (
+    "DELETE FROM cache WHERE key IN "
+    "(SELECT key FROM cache WHERE key >= ?{upper} LIMIT ?)"
+)
+
+_DELETE_LIVE_SQL = (
+    "DELETE FROM cache WHERE key = ? AND (expires_at IS NULL OR expires_at >= ?)"
+)
+
+_EVICT_SQL = (
+    "DELETE FROM cache WHERE key IN "
+    "(SELECT key FROM cache ORDER BY accessed_at LIMIT ?)"
+)
+
+_PURGE_SQL = """
+DELETE FROM cache WHERE key IN (
+    SELECT key FROM cache
+    WHERE expires_at IS NOT NULL AND expires_at < ?
+    ORDER BY expires_at LIMIT ?
+)
+"""
+
+
+def _is_busy(exc: sqlite3.OperationalError) -> bool:
+    message = str(exc).lower()
+    return "locked" in message or "busy" in message
+
+
+class _ThreadConnections:
+    """One SQLite connection per thread, opened lazily.
+
+    Connections of threads that have exited are closed the next time a new
+    thread opens one, so short-lived worker threads do not leak handles.
+    """
+
+    def __init__(self, connect: Callable[[], sqlite3.Connection]) -> None:
+        self._connect = connect
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._conns: dict[int, tuple[weakref.ref[threading.Thread], sqlite3.Connection]] = {}
+
+    def get(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = self._connect()
+            thread = threading.current_thread()
+            with self._lock:
+                for ident, (ref, old) in list(self._conns.items()):
+                    owner = ref()
+                    if owner is None or not owner.is_alive():
+                        old.close()
+                        del self._conns[ident]
+                self._conns[id(conn)] = (weakref.ref(thread), conn)
+        return conn
+
+    def __len__(self) -> int:
+        return len(self._conns)
+
+    def close_all(self) -> None:
+        with self._lock:
+            for _, conn in self._conns.values():
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
 
 class DiskCache(BaseCacheAdapter):
     """SQLite-backed persistent cache.
 
-    Values are serialised with pickle.  Expired entries are evicted lazily
+    Values are serialised with *codec* (default: plain pickle; see
+    :class:`~dd_cache.codecs.Codec` for faster serializers and compression).
+    Expired entries are evicted lazily
     on ``get()``.  The SQLite database file (and parent directories) are
     created automatically.
+
+    With *active_expiry* a daemon sweeper, on its own connection, deletes up
+    to *sweep_batch* expired rows every *sweep_interval* seconds using the
+    partial index on ``expires_at``, so write-once keys do not pile up.
+
+    Durability can be traded for write throughput:
+
+    * *journal_mode* — e.g. ``"wal"`` so readers never block on the writer.
+    * *synchronous* — ``"off"``, ``"normal"``, ``"full"`` or ``"extra"``;
+      ``"normal"`` is safe against corruption in WAL mode and skips most
+      fsyncs.
+    * *write_behind* — buffer sets and deletes in memory and group-commit
+      them in one transaction every *flush_interval* seconds or once
+      *flush_ops* writes are pending.  Reads consult the buffer first, so
+      they always see unflushed writes; ``close()`` and :meth:`flush` drain
+      it.  Buffered writes are lost if the process dies before a flush.
+
+    With *max_bytes* and/or *max_entries* the cache stays within a budget
+    of stored (serialised) bytes and rows.  Each row records its size and
+    last access time; a hit re-stamps it only when the stored time is more
+    than *access_resolution* seconds old, and stamps are queued and written
+    by the next write that needs them, so reads never write.  When a write
+    takes the cache over budget, expired rows and then the least recently
+    used ones are deleted *evict_batch* at a time through an index on the
+    access time, each batch in its own short transaction.  New files use
+    ``auto_vacuum=INCREMENTAL``, and pages freed by evictions and purges are
+    returned to the filesystem a few at a time; :meth:`vacuum` converts
+    files created before this (a one-off full rewrite).
+
+    With *dedup*, values are stored once per distinct serialised blob: a
+    row keeps the blob's BLAKE2b hash instead of the bytes, triggers keep a
+    reference count per blob, and a write whose blob already exists stores
+    only the hash.  Blobs no longer referenced are deleted a batch at a
+    time by later writes, purges and the sweeper.  Values under 64 bytes
+    stay inline.  Byte budgets still count each key's full value size.
+
+    With *key_filter*, a counting Bloom filter of the keys (sized by
+    *filter_capacity* and *filter_error_rate*, see
+    :class:`~dd_cache.filters.KeyFilter`) is built from the table on open
+    and kept up to date by this instance's writes, so most lookups of
+    absent keys return without touching SQLite.  Keys written by other
+    processes read as misses until :meth:`rebuild_filter` runs (a fill lock
+    held elsewhere adds its key), so enable it where this process does the
+    writing.
+
+    The cache is safe to share between threads and between processes
+    opening the same file.  Each thread gets its own connection; WAL mode
+    (the default *journal_mode*) lets readers run concurrently with the
+    single writer, and writers wait up to *busy_timeout* seconds for the
+    lock, then retry with jittered backoff up to *busy_retries* times.
     """
 
-    def __init__(self, path: str | Path = _DEFAULT_PATH) -> None:
+    def __init__(
+        self,
+        path: str | Path = _DEFAULT_PATH,
+        *,
+        active_expiry: bool = False,
+        sweep_interval: float = 1.0,
+        sweep_batch: int = 1000,
+        journal_mode: Optional[str] = "wal",
+        synchronous: Optional[str] = None,
+        write_behind: bool = False,
+        flush_interval: float = 0.05,
+        flush_ops: int = 1000,
+        busy_timeout: float = 30.0,
+        busy_retries: int = 5,
+        codec: Codec = DEFAULT_CODEC,
+        max_bytes: Optional[int] = None,
+        max_entries: Optional[int] = None,
+        evict_batch: int = 256,
+        access_resolution: float = 60.0,
+        dedup: bool = False,
+        key_filter: bool = False,
+        filter_capacity: Optional[int] = None,
+        filter_error_rate: float = 0.01,
+    ) -> None:
+        if journal_mode is not None and journal_mode.lower() not in _JOURNAL_MODES:
+            raise CacheError(f"Unknown journal_mode {journal_mode!r}")
+        if synchronous is not None and synchronous.lower() not in _SYNCHRONOUS:
+            raise CacheError(f"Unknown synchronous level {synchronous!r}")
+        if (max_bytes is not None and max_bytes <= 0) or (max_entries is not None and max_entries <= 0):
+            raise CacheError("max_bytes and max_entries must be positive")
         self._path = Path(path)
         self._path.parent.mkdir(parents=True, exist_ok=True)
-        self._conn = sqlite3.connect(str(self._path))
-        self._conn.execute(_DDL)
-        self._conn.commit()
+        self._codec = codec
+        self._dedup = dedup
+        self._synchronous = synchronous
+        self._busy_timeout = busy_timeout
+        self._busy_retries = busy_retries
+        self._conns = _ThreadConnections(self._connect)
+        self._lock_owner = uuid.uuid4().hex
+        # Only takes effect while the file is still empty.
+        self._retry(lambda: self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL"))
+        if journal_mode is not None:
+            self._retry(lambda: self._conn.execute(f"PRAGMA journal_mode={journal_mode}"))
+        self._retry(lambda: self._migrate(self._conn))
+        self._retry(lambda: self._conn.executescript(_DDL))
+        self._write(self._seed_totals)
+
+        # Size bounds; access-time stamps wait in _touched: key -> time.
+        self._max_bytes = max_bytes
+        self._max_entries = max_entries
+        self._bounded = max_bytes is not None or max_entries is not None
+        self._evict_batch = evict_batch
+        self._access_resolution = access_resolution
+        self._touched: dict[str, float] = {}
+        self._touch_lock = threading.Lock()
+
+        # Write-behind buffer: key -> (blob, expires_at, tags), or None for a delete.
+        self._write_behind = write_behind
+        self._flush_ops = flush_ops
+        self._pending: dict[str, Optional[_Entry]] = {}
+        self._flushing: dict[str, Optional[_Entry]] = {}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if write_behind:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(flush_interval,),
+                name="dd-cache-flush", daemon=True,
+            )
+            self._flusher.start()
+
+        self._filter: Optional[KeyFilter] = None
+        if key_filter:
+            self._filter = KeyFilter(filter_capacity, filter_error_rate)
+            self.rebuild_filter()
+
+        self._sweeper: Optional[ExpirySweeper] = None
+        if active_expiry:
+            self._sweeper = ExpirySweeper(
+                self._sweep, interval=sweep_interval, batch=sweep_batch
+            ).start()
 
     # ------------------------------------------------------------------
-    # BaseCacheAdapter interface
+    # Internal helpers
     # ------------------------------------------------------------------
 
-    def get(self, key: str) -> Any:
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self._path), timeout=self._busy_timeout, check_same_thread=False
+        )
+        if self._synchronous is not None:
+            conn.execute(f"PRAGMA synchronous={self._synchronous}")
+        return conn
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        return self._conns.get()
+
+    def _retry(self, fn: Callable[[], T]) -> T:
+        """Call *fn*, retrying with jittered exponential backoff while
+        another connection holds the database lock."""
+        delay = 0.005
+        for attempt in range(self._busy_retries + 1):
+            try:
+                return fn()
+            except sqlite3.OperationalError as exc:
+                if attempt == self._busy_retries or not _is_busy(exc):
+                    raise
+                time.sleep(delay * (1 + random.random()))
+                delay = min(delay * 2, 0.5)
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def _write(self, fn: Callable[[sqlite3.Connection], T]) -> T:
+        """Run *fn(conn)* in one transaction on this thread's connection."""
+        conn = self._conn
+
+        def attempt() -> T:
+            with conn:
+                return fn(conn)
+
+        return self._retry(attempt)
+
+    @staticmethod
+    def _migrate(conn: sqlite3.Connection) -> None:
+        """Add the size, access-time and blob columns to files from older
+        versions."""
+        if "blob" in {row[1] for row in conn.execute("PRAGMA table_info(cache)")}:
+            return
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(cache)")}
+            if columns and "size" not in columns:
+                conn.execute("ALTER TABLE cache ADD COLUMN size INTEGER NOT NULL DEFAULT 0")
+                conn.execute("ALTER TABLE cache ADD COLUMN accessed_at REAL NOT NULL DEFAULT 0")
+                conn.execute("UPDATE cache SET size = length(value)")
+            if columns and "blob" not in columns:
+                conn.execute("ALTER TABLE cache ADD COLUMN blob BLOB")
+
+    @staticmethod
+    def _seed_totals(conn: sqlite3.Connection) -> None:
+        """Initialise the trigger-maintained row count and byte totals (once
+        per file)."""
+        for name, total, table in (
+            ("entries", "COUNT(*)", "cache"),
+            ("bytes", "COALESCE(SUM(size), 0)", "cache"),
+            ("blobs", "COUNT(*)", "cache_blobs"),
+            ("blob_bytes", "COALESCE(SUM(length(value)), 0)", "cache_blobs"),
+        ):
+            if conn.execute("SELECT 1 FROM cache_meta WHERE name = ?", (name,)).fetchone() is None:
+                conn.execute(
+                    f"INSERT OR IGNORE INTO cache_meta (name, value) SELECT ?, {total} FROM {table}",
+                    (name,),
+                )
+
+    def _upsert(
+        self,
+        conn: sqlite3.Connection,
+        rows: list[tuple[str, bytes, Optional[float]]],
+        tags: Mapping[str, tuple[str, ...]],
+    ) -> None:
+        """Write *rows*, replacing each key's tags with those in *tags*."""
+        now = time.time()
+        if self._dedup:
+            blobs: dict[bytes, bytes] = {}
+            params = []
+            for key, blob, expires_at in rows:
+                if len(blob) < _DEDUP_MIN_SIZE:
+                    params.append((key, blob, expires_at, len(blob), now, None))
+                    continue
+                digest = hashlib.blake2b(blob, digest_size=16).digest()
+                blobs[digest] = blob
+                params.append((key, b"", expires_at, len(blob), now, digest))
+            # Existing blobs are left alone; only their hash is referenced.
+            conn.executemany(_BLOB_SQL, blobs.items())
+            conn.executemany(_UPSERT_SQL, params)
+        else:
+            conn.executemany(
+                _UPSERT_SQL, [(key, blob, expires_at, len(blob), now, None) for key, blob, expires_at in rows]
+            )
+        conn.executemany("DELETE FROM cache_tags WHERE key = ?", [(row[0],) for row in rows])
+        if tags:
+            conn.executemany(_TAG_SQL, [(tag, key) for key, key_tags in tags.items() for tag in key_tags])
+
+    def _buffered(self, key: str) -> Any:
+        """Return the buffered entry for *key*, None for a buffered delete,
+        or ``_NOT_BUFFERED``."""
+        with self._buffer_lock:
+            if key in self._pending:
+                return self._pending[key]
+            return self._flushing.get(key, _NOT_BUFFERED)
+
+    def _buffer(self, key: str, entry: Optional[_Entry]) -> None:
+        with self._buffer_lock:
+            self._pending[key] = entry
+            full = len(self._pending) >= self._flush_ops
+        if full:
+            self._flush()
+
+    def _flush(self) -> int:
+        with self._flush_lock:
+            with self._buffer_lock:
+                if not self._pending:
+                    return 0
+                batch = self._flushing = self._pending
+                self._pending = {}
+            upserts = [(k, e[0], e[1]) for k, e in batch.items() if e is not None]
+            tags = {k: e[2] for k, e in batch.items() if e is not None and e[2]}
+            deletes = [(k,) for k, e in batch.items() if e is None]
+
+            def write(conn: sqlite3.Connection) -> None:
+                if upserts:
+                    self._upsert(conn, upserts, tags)
+                if deletes:
+                    conn.executemany("DELETE FROM cache WHERE key = ?", deletes)
+
+            try:
+                self._write(write)
+            except sqlite3.Error:
+                with self._buffer_lock:
+                    # Requeue the batch; writes buffered meanwhile are newer.
+                    self._pending = {**batch, **self._pending}
+                    self._flushing = {}
+                raise
+            with self._buffer_lock:
+                self._flushing = {}
+            if self._bounded and upserts:
+                self._enforce_limits()
+            if self._dedup:
+                self._collect_blobs()
+            return len(batch)
+
+    def _flush_loop(self, interval: float) -> None:
+        while not self._flusher_stop.wait(interval):
+            try:
+                self._flush()
+            except sqlite3.Error:
+                pass  # e.g. database locked; the batch is retried next tick
+
+    def _expire(self, key: str) -> None:
+        self.metrics.incr("expirations")
+        self._filter_stale(1)
+        if self._write_behind:
+            self._buffer(key, None)
+        else:
+            self._write(lambda c: c.execute(
+                "DELETE FROM cache WHERE key = ? AND expires_at < ?", (key, time.time())
+            ))
+
+    def _purge(self, limit: Optional[int]) -> int:
+        removed = self._write(lambda c: c.execute(
+            _PURGE_SQL, (time.time(), -1 if limit is None else limit)
+        ).rowcount)
+        self.metrics.incr("expirations", removed)
+        self._filter_stale(removed)
+        return removed
+
+    def _touch(self, key: str, accessed_at: float) -> None:
+        """Queue a new access time for *key* if its stored one is stale."""
+        if not self._bounded:
+            return
+        now = time.time()
+        if now - accessed_at >= self._access_resolution:
+            with self._touch_lock:
+                self._touched[key] = now
+
+    def _write_touches(self) -> None:
+        with self._touch_lock:
+            touched, self._touched = self._touched, {}
+        if touched:
+            self._write(lambda c: c.executemany(
+                "UPDATE cache SET accessed_at = ? WHERE key = ? AND accessed_at < ?",
+                [(stamp, key, stamp) for key, stamp in touched.items()],
+            ))
+
+    def _usage(self) -> tuple[int, int]:
+        totals = dict(self._conn.execute(
+            "SELECT name, value FROM cache_meta WHERE name IN ('entries', 'bytes')"
+        ).fetchall())
+        return totals.get("entries", 0), totals.get("bytes", 0)
+
+    def _enforce_limits(self) -> None:
+        """Delete expired, then least recently used, rows until the cache is
+        within *max_bytes* and *max_entries*."""
+        if len(self._touched) >= _TOUCH_BATCH:
+            self._write_touches()
+        removed = evicted = 0
+        while True:
+            entries, size = self._usage()
+            over_entries = entries - self._max_entries if self._max_entries is not None else 0
+            over_bytes = size - self._max_bytes if self._max_bytes is not None else 0
+            if over_entries <= 0 and over_bytes <= 0:
+                break
+            if not removed:
+                self._write_touches()  # recency must be current before choosing victims
+            purged = self._purge(self._evict_batch)
+            removed += purged
+            if purged:
+                continue
+            # Rows to drop: the entry overflow, or the byte overflow in rows
+            # of average size, whichever is larger.
+            needed = max(over_entries, math.ceil(over_bytes * entries / size) if over_bytes > 0 else 0)
+            count = min(max(needed, 1), self._evict_batch)
+            batch = self._write(lambda c: c.execute(_EVICT_SQL, (count,)).rowcount)
+            if not batch:
+                break
+            removed += batch
+            evicted += batch
+        self.metrics.incr("evictions", evicted)
+        self._filter_stale(evicted)
+        if removed:
+            self._reclaim_space()
+
+    def _collect_blobs(self, *, drain: bool = False) -> int:
+        """Delete up to ``_GC_BATCH`` unreferenced blobs (all of them with
+        *drain*), one short transaction per batch."""
+        collected = 0
+        # The read through the partial index keeps this write-free when
+        # there is nothing to collect.
+        while self._conn.execute("SELECT 1 FROM cache_blobs WHERE refs = 0 LIMIT 1").fetchone():
+            removed = self._write(lambda c: c.execute(_GC_SQL, (_GC_BATCH,)).rowcount)
+            collected += removed
+            if not drain or removed < _GC_BATCH:
+                break
+        return collected
+
+    def _reclaim_space(self) -> None:
+        """Drop a batch of unreferenced blobs, then return up to
+        ``_VACUUM_PAGES`` free pages to the filesystem (a no-op unless the
+        file uses incremental auto-vacuum)."""
+        self._collect_blobs()
+        if self._conn.execute("PRAGMA freelist_count").fetchone()[0]:
+            self._retry(lambda: self._conn.execute(f"PRAGMA incremental_vacuum({_VACUUM_PAGES})").fetchall())
+
+    def _filter_stale(self, count: int) -> None:
+        """Note *count* rows removed without their keys known to the filter,
+        rebuilding it once enough have piled up."""
+        if self._filter is not None and count:
+            self._filter.mark_stale(count)
+            if self._filter.due:
+                self.rebuild_filter()
+
+    @staticmethod
+    def _chunks(keys: list[str]) -> Iterable[list[str]]:
+        for i in range(0, len(keys), _IN_CHUNK):
+            yield keys[i:i + _IN_CHUNK]
+
+    def _sweep(self, limit: int) -> int:
+        removed = self._purge(limit)
+        if removed:
+            self._reclaim_space()
+        return removed
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        if self._write_behind:
+            entry = self._buffered(key)
+            if entry is not _NOT_BUFFERED:
+                if entry is None:
+                    return MISSING
+                value_blob, expires_at = entry[:2]
+                if expires_at is not None and time.time() > expires_at:
+                    return MISSING
+                self.metrics.incr("bytes_out", len(value_blob))
+                return self._codec.decode(value_blob), expires_at
+        if self._filter is not None and not self._filter.might_contain(key):
+            return MISSING
         row = self._conn.execute(
-            "SELECT value, expires_at FROM cache WHERE key = ?", (key,)
+            f"SELECT {_VALUE}, expires_at, accessed_at FROM {_READ_FROM} WHERE key = ?", (key,)
         ).fetchone()
         if row is None:
-            return None
-        value_blob, expires_at = row
+            if self._filter is not None:
+                self._filter.missed()
+            return MISSING
+        value_blob, expires_at, accessed_at = row
         if expires_at is not None and time.time() > expires_at:
-            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
-            self._conn.commit()
-            return None
-        return deserialize(value_blob)
+            self._expire(key)
+            return MISSING
+        self._touch(key, accessed_at)
+        self.metrics.incr("bytes_out", len(value_blob))
+        return self._codec.decode(value_blob), expires_at
+
+    def _lookup_many(self, keys: list[str]) -> dict[str, tuple[Any, Optional[float]]]:
+        result: dict[str, tuple[Any, Optional[float]]] = {}
+        expired: list[str] = []
+        now = time.time()
+        lookup = keys
+        read = 0
+        if self._write_behind:
+            remaining = []
+            for key in lookup:
+                entry = self._buffered(key)
+                if entry is _NOT_BUFFERED:
+                    remaining.append(key)
+                elif entry is not None and (entry[1] is None or now <= entry[1]):
+                    read += len(entry[0])
+                    result[key] = self._codec.decode(entry[0]), entry[1]
+            lookup = remaining
+        if self._filter is not None:
+            lookup = [key for key in lookup if self._filter.might_contain(key)]
+        found = 0
+        for chunk in self._chunks(lookup):
+            rows = self._conn.execute(
+                f"SELECT key, {_VALUE}, expires_at, accessed_at FROM {_READ_FROM} "
+                f"WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            ).fetchall()
+            found += len(rows)
+            for key, value_blob, expires_at, accessed_at in rows:
+                if expires_at is not None and now > expires_at:
+                    expired.append(key)
+                else:
+                    self._touch(key, accessed_at)
+                    read += len(value_blob)
+                    result[key] = self._codec.decode(value_blob), expires_at
+        if self._filter is not None:
+            self._filter.missed(len(lookup) - found)
+        if expired and not self._write_behind:
+            self._write(lambda c: c.executemany(
+                "DELETE FROM cache WHERE key = ? AND expires_at < ?",
+                [(k, now) for k in expired],
+            ))
+            self.metrics.incr("expirations", len(expired))
+            self._filter_stale(len(expired))
+        self.metrics.incr("bytes_out", read)
+        return result
+
+    def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        def acquire(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            conn.execute(
+                "DELETE FROM cache_locks WHERE key = ? AND expires_at < ?", (key, now)
+            )
+            return conn.execute(
+                "INSERT OR IGNORE INTO cache_locks (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, self._lock_owner, now + timeout),
+            ).rowcount == 1
+
+        acquired = self._write(acquire)
+        if not acquired and self._filter is not None:
+            self._filter.add(key)  # another process is filling it; let the polls through
+        return acquired
+
+    def _release_fill_lock(self, key: str) -> None:
+        self._flush()  # publish a buffered fill before other processes stop waiting
+        self._write(lambda c: c.execute(
+            "DELETE FROM cache_locks WHERE key = ? AND owner = ?", (key, self._lock_owner)
+        ))
+
+    # ------------------------------------------------------------------
+    # Namespace internals
+    # ------------------------------------------------------------------
+
+    def _ns_generation(self, name: str, *, bump: bool = False) -> int:
+        meta = f"ns:{name}"
+        if not bump:
+            row = self._conn.execute("SELECT value FROM cache_meta WHERE name = ?", (meta,)).fetchone()
+            return row[0] if row else 0
+
+        def advance(conn: sqlite3.Connection) -> int:
+            conn.execute(
+                "INSERT INTO cache_meta (name, value) VALUES (?, 1) "
+                "ON CONFLICT (name) DO UPDATE SET value = value + 1",
+                (meta,),
+            )
+            return conn.execute("SELECT value FROM cache_meta WHERE name = ?", (meta,)).fetchone()[0]
+
+        return self._write(advance)
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        self._flush()
+        end = prefix_end(prefix) if prefix else None
+        if end is None:
+            sql, params = _DELETE_RANGE_SQL.format(upper=""), (prefix, batch)
+        else:
+            sql, params = _DELETE_RANGE_SQL.format(upper=" AND key < ?"), (prefix, end, batch)
+        while True:
+            # Each step is one short transaction over a primary-key range.
+            removed = self._write(lambda c: c.execute(sql, params).rowcount)
+            self._filter_stale(removed)
+            yield removed
+            if removed < batch:
+                return
+
+    def _pages(self, columns: str, source: str, prefix: str, batch: int) -> Iterator[list[Any]]:
+        """Yield pages of up to *batch* rows of *columns* (key first) for
+        keys starting with *prefix*, in key order."""
+        self._flush()
+        end = prefix_end(prefix) if prefix else None
+        bound, op = prefix, ">="
+        while True:
+            # Keyset pagination over the primary key: each page is one short
+            # indexed read, and nothing is held between pages.
+            sql = f"SELECT {columns} FROM {source} WHERE key {op} ?"
+            params: tuple[Any, ...] = (bound, batch)
+            if end is not None:
+                sql += " AND key < ?"
+                params = (bound, end, batch)
+            rows = self._conn.execute(sql + " ORDER BY key LIMIT ?", params).fetchall()
+            if rows:
+                yield rows
+            if len(rows) < batch:
+                return
+            bound, op = rows[-1][0], ">"
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        for rows in self._pages(f"key, {_VALUE}, expires_at", _READ_FROM, prefix, batch):
+            now = time.time()
+            entries = [
+                (key, self._codec.decode(blob), expires_at)
+                for key, blob, expires_at in rows
+                if expires_at is None or expires_at > now
+            ]
+            if entries:
+                yield entries
+
+    def _scan_keys(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        for rows in self._pages("key, expires_at", "cache", prefix, batch):
+            now = time.time()
+            keys = [key for key, expires_at in rows if expires_at is None or expires_at > now]
+            if keys:
+                yield keys
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        entry = self._lookup(key)
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        return None if entry is MISSING else entry[0]
 
-    def set(self, key: str, value: Any, *, ttl: Optional[int] = None) -> None:
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
         expires_at = time.time() + ttl if ttl is not None else None
-        self._conn.execute(
-            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
-            (key, serialize(value), expires_at),
-        )
-        self._conn.commit()
+        row = (key, self._codec.encode(value), expires_at)
+        if self._filter is not None:
+            self._filter.add(key)
+        if self._write_behind:
+            self._buffer(key, (row[1], expires_at, tags))
+        else:
+            self._write(lambda c: self._upsert(c, [row], {key: tags} if tags else {}))
+            if self._bounded:
+                self._enforce_limits()
+            if self._dedup:
+                self._collect_blobs()
+        self.metrics.incr("sets")
+        self.metrics.incr("bytes_in", len(row[1]))
+        self.metrics.observe("set", time.perf_counter() - start)
+        if self._filter is not None and self._filter.due:
+            self.rebuild_filter()
 
     def delete(self, key: str) -> bool:
-        existed = self.exists(key)
-        self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
-        self._conn.commit()
+        start = time.perf_counter()
+        if self._write_behind:
+            existed = self.exists(key)
+            self._buffer(key, None)
+        else:
+            def delete(conn: sqlite3.Connection) -> bool:
+                existed = conn.execute(_DELETE_LIVE_SQL, (key, time.time())).rowcount > 0
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return existed
+
+            existed = self._write(delete)
+            if self._dedup:
+                self._collect_blobs()
+        if existed:
+            if self._filter is not None:
+                self._filter.remove(key)
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
         return existed
 
     def exists(self, key: str) -> bool:
+        if self._write_behind:
+            entry = self._buffered(key)
+            if entry is not _NOT_BUFFERED:
+                return entry is not None and (entry[1] is None or time.time() <= entry[1])
+        if self._filter is not None and not self._filter.might_contain(key):
+            return False
         row = self._conn.execute(
             "SELECT expires_at FROM cache WHERE key = ?", (key,)
         ).fetchone()
         if row is None:
+            if self._filter is not None:
+                self._filter.missed()
             return False
         expires_at = row[0]
         if expires_at is not None and time.time() > expires_at:
-            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
-            self._conn.commit()
+            self._expire(key)
             return False
         return True
 
     def clear(self) -> None:
-        self._conn.execute("DELETE FROM cache")
-        self._conn.commit()
+        with self._flush_lock:  # let an in-flight group commit land first
+            with self._buffer_lock:
+                self._pending = {}
+            with self._touch_lock:
+                self._touched = {}
 
-    def stats(self) -> CacheStats:
+            def clear(conn: sqlite3.Connection) -> None:
+                conn.execute("DELETE FROM cache")
+                conn.execute("DELETE FROM cache_blobs")
+
+            self._write(clear)
+            if self._filter is not None:
+                self._filter.clear()
+        self._reclaim_space()
+
+    def flush(self) -> int:
+        """Group-commit buffered writes now; returns how many were written.
+        A no-op unless *write_behind* is enabled."""
+        return self._flush()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        keys = list(dict.fromkeys(keys))
+        result = {key: entry[0] for key, entry in self._lookup_many(keys).items()}
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", len(keys) - len(result))
+        self.metrics.observe("get_many", time.perf_counter() - start)
+        return result
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
         now = time.time()
-        row = self._conn.execute(
-            "SELECT COUNT(*) FROM cache WHERE expires_at IS NULL OR expires_at > ?",
-            (now,),
-        ).fetchone()
-        total = row[0] if row else 0
-        ttl_row = self._conn.execute(
-            "SELECT COUNT(*) FROM cache WHERE expires_at IS NOT NULL"
-        ).fetchone()
-        has_ttl = (ttl_row[0] > 0) if ttl_row else False
+        rows = []
+        for key, value in items.items():
+            key_ttl = ttl_for(ttl, key)
+            rows.append((key, self._codec.encode(value), now + key_ttl if key_ttl is not None else None))
+        if self._filter is not None:
+            self._filter.add_many(items)
+        if self._write_behind:
+            with self._buffer_lock:
+                for key, blob, expires_at in rows:
+                    self._pending[key] = (blob, expires_at, tags)
+                full = len(self._pending) >= self._flush_ops
+            if full:
+                self._flush()
+        else:
+            self._write(lambda c: self._upsert(c, rows, dict.fromkeys(items, tags) if tags else {}))
+            if self._bounded:
+                self._enforce_limits()
+            if self._dedup:
+                self._collect_blobs()
+        self.metrics.incr("sets", len(rows))
+        self.metrics.incr("bytes_in", sum(len(row[1]) for row in rows))
+        self.metrics.observe("set_many", time.perf_counter() - start)
+        if self._filter is not None and self._filter.due:
+            self.rebuild_filter()
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        start = time.perf_counter()
+        self._flush()
+        chunks = list(self._chunks(list(dict.fromkeys(keys))))
+
+        def delete(conn: sqlite3.Connection) -> int:
+            deleted = 0
+            now = time.time()
+            for chunk in chunks:
+                placeholders = ",".join("?" * len(chunk))
+                deleted += conn.execute(
+                    f"DELETE FROM cache WHERE key IN ({placeholders}) "
+                    f"AND (expires_at IS NULL OR expires_at >= ?)",
+                    (*chunk, now),
+                ).rowcount
+                conn.execute(f"DELETE FROM cache WHERE key IN ({placeholders})", chunk)
+            return deleted
+
+        deleted = self._write(delete)
+        if self._dedup:
+            self._collect_blobs()
+        self._filter_stale(deleted)
+        self.metrics.incr("deletes", deleted)
+        self.metrics.observe("delete_many", time.perf_counter() - start)
+        return deleted
+
+    def invalidate_tags(self, *tags: str) -> int:
+        start = time.perf_counter()
+        self._flush()
+        chunks = list(self._chunks(list(dict.fromkeys(tags))))
+
+        def invalidate(conn: sqlite3.Connection) -> int:
+            now = time.time()
+            removed = 0
+            for chunk in chunks:
+                # Both subqueries walk the (tag, key) primary key; the delete
+                # trigger drops the entries' tag rows.
+                inner = f"SELECT key FROM cache_tags WHERE tag IN ({','.join('?' * len(chunk))})"
+                removed += conn.execute(
+                    f"SELECT COUNT(*) FROM cache WHERE key IN ({inner}) "
+                    "AND (expires_at IS NULL OR expires_at >= ?)",
+                    (*chunk, now),
+                ).fetchone()[0]
+                conn.execute(f"DELETE FROM cache WHERE key IN ({inner})", chunk)
+            return removed
+
+        removed = self._write(invalidate)
+        if self._dedup:
+            self._collect_blobs()
+        self._filter_stale(removed)
+        self.metrics.incr("deletes", removed)
+        self.metrics.observe("invalidate_tags", time.perf_counter() - start)
+        return removed
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        self._flush()
+        removed = self._purge(limit)
+        self._reclaim_space()
+        return removed
+
+    def vacuum(self) -> None:
+        """Rewrite the file compactly in one pass.  Files created before
+        incremental reclamation existed are switched to it on the way."""
+        self._flush()
+        self._collect_blobs(drain=True)
+        self._retry(lambda: self._conn.execute("PRAGMA auto_vacuum=INCREMENTAL"))
+        self._retry(lambda: self._conn.execute("VACUUM"))
+
+    def rebuild_filter(self) -> None:
+        """Rebuild the key filter from the table (streaming keys through one
+        cursor) and the write-behind buffer.  Also picks up keys written by
+        other processes."""
+        if self._filter is None:
+            raise CacheError("this DiskCache was opened without key_filter=True")
+
+        def keys() -> Iterator[str]:
+            # Read lazily, once the filter is recording concurrent adds.
+            with self._buffer_lock:
+                buffered = [k for k, e in {**self._flushing, **self._pending}.items() if e is not None]
+            yield from buffered
+            for (key,) in self._conn.execute("SELECT key FROM cache"):
+                yield key
+
+        self._filter.rebuild(keys(), self._usage()[0])
+
+    def stats(self) -> CacheStats:
+        self._flush()
+        # Reclaim a bounded batch of due rows via the expiry index, then read
+        # the trigger-kept row count: no table scan, however large the
+        # cache.  Rows still due beyond the batch are counted until purged.
+        if self._conn.execute(
+            "SELECT 1 FROM cache WHERE expires_at IS NOT NULL AND expires_at < ? LIMIT 1",
+            (time.time(),),
+        ).fetchone() is not None:
+            self._purge(_STATS_PURGE_LIMIT)
+        total, size = self._usage()
+        has_ttl = self._conn.execute(
+            "SELECT 1 FROM cache WHERE expires_at IS NOT NULL LIMIT 1"
+        ).fetchone() is not None
+        extra: dict[str, Any] = {
+            "path": str(self._path),
+            "codec": self._codec.name,
+            "connections": len(self._conns),
+            "bytes": size,
+        }
+        if self._bounded:
+            extra["max_bytes"] = self._max_bytes
+            extra["max_entries"] = self._max_entries
+        if self._filter is not None:
+            extra["filter"] = self._filter.stats()
+        if self._dedup:
+            totals = dict(self._conn.execute(
+                "SELECT name, value FROM cache_meta WHERE name IN ('blobs', 'blob_bytes')"
+            ).fetchall())
+            extra["dedup"] = True
+            extra["blobs"] = totals.get("blobs", 0)
+            extra["blob_bytes"] = totals.get("blob_bytes", 0)
+        if self._write_behind:
+            extra["write_behind"] = True
+        if self._sweeper is not None:
+            extra["swept"] = self._sweeper.swept
         return CacheStats(
             backend="disk",
             total_keys=total,
             ttl_enabled=has_ttl,
-            extra={"path": str(self._path)},
+            extra=extra,
+            **self.metrics.snapshot(),
         )
 
     def close(self) -> None:
-        self._conn.close()
+        if self._flusher is not None:
+            self._flusher_stop.set()
+            self._flusher.join()
+            self._flusher = None
+        self._flush()
+        self._write_touches()
+        if self._sweeper is not None:
+            self._sweeper.stop()
+        self._conns.close_all()
@@ -1,22 +1,73 @@
 from __future__ import annotations
 
+import itertools
+import threading
 import time
-from typing import Any, Optional
+from contextlib import ExitStack, nullcontext
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional
 
-from dd_cache.base import BaseCacheAdapter
-from dd_cache.models import CacheStats
+from dd_cache.base import _STATS_PURGE_LIMIT, MISSING, BaseCacheAdapter, TTLArg, ttl_for
+from dd_cache.eviction import EvictionPolicy, make_policy
+from dd_cache.expiry import ExpiryHeap, ExpirySweeper
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.snapshot import Entry
+from dd_cache.utils import estimate_size
 
 
 class InMemoryCache(BaseCacheAdapter):
     """Thread-unsafe in-process cache backed by a plain dict.
 
     TTL is enforced lazily: expired entries are treated as cache misses on
-    ``get()`` / ``exists()`` without a background sweep thread.
+    ``get()`` / ``exists()``.  A deadline heap tracks TTL'd keys so
+    :meth:`purge_expired` and ``stats()`` only touch entries that are due,
+    never the whole store.  With *active_expiry* a daemon sweeper removes up
+    to *sweep_batch* expired entries every *sweep_interval* seconds
+    (``None`` starts no thread, for callers that drive
+    :meth:`purge_expired` themselves).  Running a sweeper makes the instance
+    internally locked.
+
+    The cache is unbounded by default.  Pass *max_entries* and/or
+    *max_bytes* to cap it; when a limit is exceeded, entries are evicted
+    according to *policy* (``"lru"``, ``"lfu"``, ``"tinylfu"`` or an
+    :class:`~dd_cache.eviction.EvictionPolicy` instance).  Value sizes are
+    estimated with *sizeof* (default :func:`dd_cache.utils.estimate_size`).
+
+    Tags are indexed in a reverse ``tag -> keys`` map, so
+    :meth:`invalidate_tags` touches only the tagged entries.
     """
 
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        *,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: str | EvictionPolicy = "lru",
+        sizeof: Optional[Callable[[Any], int]] = None,
+        active_expiry: bool = False,
+        sweep_interval: Optional[float] = 1.0,
+        sweep_batch: int = 1000,
+    ) -> None:
         self._store: dict[str, Any] = {}
         self._expiry: dict[str, float] = {}  # unix timestamp of expiry
+        self._sizes: dict[str, int] = {}     # estimated bytes per value
+        self._tags: dict[str, set[str]] = {}         # tag -> keys
+        self._key_tags: dict[str, tuple[str, ...]] = {}  # key -> tags
+        self._bytes = 0
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._sizeof = sizeof or estimate_size
+        self._policy: Optional[EvictionPolicy] = None
+        if max_entries is not None or max_bytes is not None:
+            self._policy = make_policy(policy, capacity=max_entries)
+        self._heap = ExpiryHeap()
+        self._sweeper: Optional[ExpirySweeper] = None
+        self._lock: Any = nullcontext()
+        if active_expiry and sweep_interval is not None:
+            self._lock = threading.RLock()
+            self._sweeper = ExpirySweeper(
+                self.purge_expired, interval=sweep_interval, batch=sweep_batch
+            ).start()
+        self._thread_safe = self._sweeper is not None
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -26,56 +77,452 @@ class InMemoryCache(BaseCacheAdapter):
         exp = self._expiry.get(key)
         return exp is not None and time.time() > exp
 
+    def _expire(self, key: str) -> None:
+        self._evict(key)
+        self.metrics.incr("expirations")
+
     def _evict(self, key: str) -> None:
         self._store.pop(key, None)
         self._expiry.pop(key, None)
+        self._bytes -= self._sizes.pop(key, 0)
+        if self._policy is not None:
+            self._policy.remove(key)
+        self._untag(key)
 
-    # ------------------------------------------------------------------
-    # BaseCacheAdapter interface
-    # ------------------------------------------------------------------
+    def _untag(self, key: str) -> None:
+        for tag in self._key_tags.pop(key, ()):
+            keys = self._tags[tag]
+            keys.discard(key)
+            if not keys:
+                del self._tags[tag]
 
-    def get(self, key: str) -> Any:
-        if self._is_expired(key):
-            self._evict(key)
-            return None
-        return self._store.get(key)
+    def _tag(self, key: str, tags: tuple[str, ...]) -> None:
+        if key in self._key_tags:
+            self._untag(key)
+        if tags:
+            self._key_tags[key] = tags
+            for tag in tags:
+                self._tags.setdefault(tag, set()).add(key)
 
-    def set(self, key: str, value: Any, *, ttl: Optional[int] = None) -> None:
+    def _make_room(self, key: str, size: int) -> None:
+        """Evict until storing *size* bytes under *key* fits both budgets."""
+        old = self._sizes.get(key)
+        extra_entries = 0 if old is not None else 1
+        extra_bytes = size - (old or 0)
+        while (
+            (self._max_entries is not None
+             and len(self._store) + extra_entries > self._max_entries)
+            or (self._max_bytes is not None
+                and self._bytes + extra_bytes > self._max_bytes)
+        ):
+            victim = self._policy.pop_victim()  # type: ignore[union-attr]
+            if victim is None:
+                break
+            if self._store.pop(victim, MISSING) is not MISSING:
+                self.metrics.incr("evictions")
+            self._expiry.pop(victim, None)
+            self._bytes -= self._sizes.pop(victim, 0)
+            self._untag(victim)
+            if victim == key:
+                extra_entries, extra_bytes = 1, size
+
+    def _store_value(
+        self, key: str, value: Any, size: int, ttl: Optional[int], tags: tuple[str, ...] = ()
+    ) -> None:
+        if self._max_bytes is not None and size > self._max_bytes:
+            # Never admit a value that cannot fit; drop any older one.
+            if key in self._store:
+                self._evict(key)
+                self.metrics.incr("evictions")
+            return
+        if self._policy is not None:
+            self._make_room(key, size)
+        existed = key in self._store
         self._store[key] = value
         if ttl is not None:
-            self._expiry[key] = time.time() + ttl
+            exp = time.time() + ttl
+            self._expiry[key] = exp
+            self._heap.push(key, exp)
+            if len(self._heap) > 2 * len(self._expiry) + 64:
+                self._heap.rebuild(self._expiry)  # drop entries of overwritten keys
         else:
             self._expiry.pop(key, None)
+        self._bytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+        if tags or self._key_tags:
+            self._tag(key, tags)
+        if self._policy is not None:
+            if existed:
+                self._policy.record_access(key)
+            else:
+                self._policy.record_insert(key)
+
+    def _matching(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        """Yield the keys starting with *prefix*, *batch* at a time.  The
+        lock is held only for a C-level copy of the key references (one
+        pointer per key, as a dict cannot be iterated while writers change
+        it); the filtering happens outside it.  Callers re-check each key."""
+        with self._lock:
+            snapshot = tuple(self._store)
+        matching = (key for key in snapshot if key.startswith(prefix))
+        while True:
+            keys = list(itertools.islice(matching, batch))
+            if not keys:
+                return
+            yield keys
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        for keys in self._matching(prefix, batch):
+            removed = 0
+            with self._lock:
+                for key in keys:
+                    if key in self._store:
+                        self._evict(key)
+                        removed += 1
+            yield removed
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        for keys in self._matching(prefix, batch):
+            now = time.time()
+            entries = []
+            with self._lock:
+                for key in keys:
+                    if key in self._store:
+                        exp = self._expiry.get(key)
+                        if exp is None or exp > now:
+                            entries.append((key, self._store[key], exp))
+            if entries:
+                yield entries
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        entry = self._lookup(key)
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        return None if entry is MISSING else entry[0]
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        with self._lock:
+            if key not in self._store:
+                return MISSING
+            if self._is_expired(key):
+                self._expire(key)
+                return MISSING
+            if self._policy is not None:
+                self._policy.record_access(key)
+            return self._store[key], self._expiry.get(key)
+
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        size = self._sizeof(value)
+        with self._lock:
+            self._store_value(key, value, size, ttl, tuple(tags))
+        self.metrics.incr("sets")
+        self.metrics.observe("set", time.perf_counter() - start)
 
     def delete(self, key: str) -> bool:
-        existed = key in self._store and not self._is_expired(key)
-        self._evict(key)
+        start = time.perf_counter()
+        with self._lock:
+            existed = key in self._store and not self._is_expired(key)
+            self._evict(key)
+        if existed:
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
         return existed
 
     def exists(self, key: str) -> bool:
-        if key not in self._store:
-            return False
-        if self._is_expired(key):
-            self._evict(key)
-            return False
-        return True
+        with self._lock:
+            if key not in self._store:
+                return False
+            if self._is_expired(key):
+                self._expire(key)
+                return False
+            return True
 
     def clear(self) -> None:
-        self._store.clear()
-        self._expiry.clear()
+        with self._lock:
+            self._store.clear()
+            self._expiry.clear()
+            self._sizes.clear()
+            self._tags.clear()
+            self._key_tags.clear()
+            self._bytes = 0
+            if self._policy is not None:
+                self._policy.clear()
+            self._heap.clear()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        result: dict[str, Any] = {}
+        misses = 0
+        with self._lock:
+            for key in keys:
+                if key not in self._store:
+                    misses += 1
+                    continue
+                if self._is_expired(key):
+                    self._expire(key)
+                    misses += 1
+                    continue
+                if self._policy is not None:
+                    self._policy.record_access(key)
+                result[key] = self._store[key]
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", misses)
+        self.metrics.observe("get_many", time.perf_counter() - start)
+        return result
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
+        sized = [(key, value, self._sizeof(value)) for key, value in items.items()]
+        with self._lock:
+            for key, value, size in sized:
+                self._store_value(key, value, size, ttl_for(ttl, key), tags)
+        self.metrics.incr("sets", len(sized))
+        self.metrics.observe("set_many", time.perf_counter() - start)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        start = time.perf_counter()
+        deleted = 0
+        with self._lock:
+            for key in keys:
+                if key in self._store and not self._is_expired(key):
+                    deleted += 1
+                self._evict(key)
+        self.metrics.incr("deletes", deleted)
+        self.metrics.observe("delete_many", time.perf_counter() - start)
+        return deleted
+
+    def invalidate_tags(self, *tags: str) -> int:
+        start = time.perf_counter()
+        removed = 0
+        with self._lock:
+            keys = set().union(*(self._tags.get(tag, ()) for tag in tags))
+            for key in keys:
+                removed += not self._is_expired(key)
+                self._evict(key)
+        self.metrics.incr("deletes", removed)
+        self.metrics.observe("invalidate_tags", time.perf_counter() - start)
+        return removed
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        with self._lock:
+            due = self._heap.pop_due(time.time(), self._expiry, limit)
+            for key in due:
+                self._evict(key)
+            self.metrics.incr("expirations", len(due))
+            return len(due)
 
     def stats(self) -> CacheStats:
-        # Count only non-expired keys
-        now = time.time()
-        live = sum(
-            1 for k in self._store
-            if k not in self._expiry or self._expiry[k] > now
-        )
+        with self._lock:
+            # A bounded batch of due entries is purged first, so len() is
+            # the live count unless more than that many are due at once.
+            self.purge_expired(_STATS_PURGE_LIMIT)
+            live = len(self._store)
+            extra: dict[str, Any] = {
+                "bytes": self._bytes,
+                "evictions": self.metrics.counters["evictions"],
+            }
+            if self._policy is not None:
+                extra.update(
+                    policy=type(self._policy).__name__,
+                    max_entries=self._max_entries,
+                    max_bytes=self._max_bytes,
+                )
+            if self._sweeper is not None:
+                extra["swept"] = self._sweeper.swept
+            ttl_enabled = bool(self._expiry)
         return CacheStats(
             backend="memory",
             total_keys=live,
-            ttl_enabled=bool(self._expiry),
+            ttl_enabled=ttl_enabled,
+            extra=extra,
+            **self.metrics.snapshot(),
+        )
+
+    def close(self) -> None:
+        if self._sweeper is not None:
+            self._sweeper.stop()
+
+
+class ConcurrentInMemoryCache(BaseCacheAdapter):
+    """Thread-safe in-process cache striped over *shards* lock-guarded shards.
+
+    Each key hashes to one :class:`InMemoryCache` shard with its own lock,
+    ``_store`` and ``_expiry`` maps, so threads touching different shards
+    never wait on each other.  ``clear()`` and ``stats()`` take every shard
+    lock (always in the same order) to act on a consistent snapshot.
+
+    *max_entries* / *max_bytes* are split evenly across shards; *policy*
+    must be a policy name because each shard needs its own instance.  With
+    *active_expiry* one sweeper thread purges every shard in turn, taking
+    only one shard lock at a time.
+    """
+
+    def __init__(
+        self,
+        shards: int = 16,
+        *,
+        max_entries: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        policy: str = "lru",
+        sizeof: Optional[Callable[[Any], int]] = None,
+        active_expiry: bool = False,
+        sweep_interval: Optional[float] = 1.0,
+        sweep_batch: int = 1000,
+    ) -> None:
+        if shards < 1:
+            raise CacheError("ConcurrentInMemoryCache needs at least one shard")
+        if isinstance(policy, EvictionPolicy):
+            raise CacheError(
+                "ConcurrentInMemoryCache takes a policy name, not an instance, "
+                "since every shard needs its own policy"
+            )
+        per_entries = -(-max_entries // shards) if max_entries is not None else None
+        per_bytes = -(-max_bytes // shards) if max_bytes is not None else None
+        self._n = shards
+        self._shards = [
+            InMemoryCache(max_entries=per_entries, max_bytes=per_bytes,
+                          policy=policy, sizeof=sizeof,
+                          active_expiry=active_expiry, sweep_interval=None)
+            for _ in range(shards)
+        ]
+        for shard in self._shards:
+            shard._metrics = self.metrics  # one set of counters for the whole cache
+        self._locks = [threading.Lock() for _ in range(shards)]
+        self._sweeper: Optional[ExpirySweeper] = None
+        if active_expiry and sweep_interval is not None:
+            self._sweeper = ExpirySweeper(
+                self.purge_expired, interval=sweep_interval, batch=sweep_batch
+            ).start()
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _all_locks(self) -> ExitStack:
+        stack = ExitStack()
+        for lock in self._locks:
+            stack.enter_context(lock)
+        return stack
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        i = hash(key) % self._n
+        with self._locks[i]:
+            return self._shards[i].get(key)
+
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        i = hash(key) % self._n
+        with self._locks[i]:
+            self._shards[i].set(key, value, ttl=ttl, tags=tags)
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        i = hash(key) % self._n
+        with self._locks[i]:
+            return self._shards[i]._lookup(key, with_expiry=with_expiry)
+
+    def delete(self, key: str) -> bool:
+        i = hash(key) % self._n
+        with self._locks[i]:
+            return self._shards[i].delete(key)
+
+    def exists(self, key: str) -> bool:
+        i = hash(key) % self._n
+        with self._locks[i]:
+            return self._shards[i].exists(key)
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        for shard, lock in zip(self._shards, self._locks):
+            steps = shard._delete_prefix(prefix, batch)
+            while True:
+                with lock:
+                    removed = next(steps, None)
+                if removed is None:
+                    break
+                yield removed
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        for shard, lock in zip(self._shards, self._locks):
+            steps = shard._scan_entries(prefix, batch)
+            while True:
+                with lock:
+                    entries = next(steps, None)
+                if entries is None:
+                    break
+                yield entries
+
+    def _group(self, keys: Iterable[str]) -> dict[int, list[str]]:
+        groups: dict[int, list[str]] = {}
+        for key in keys:
+            groups.setdefault(hash(key) % self._n, []).append(key)
+        return groups
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        result: dict[str, Any] = {}
+        for i, shard_keys in self._group(keys).items():
+            with self._locks[i]:
+                result.update(self._shards[i].get_many(shard_keys))
+        return result
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        tags = tuple(tags)
+        for i, shard_keys in self._group(items).items():
+            shard_items = {key: items[key] for key in shard_keys}
+            with self._locks[i]:
+                self._shards[i].set_many(shard_items, ttl=ttl, tags=tags)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        deleted = 0
+        for i, shard_keys in self._group(keys).items():
+            with self._locks[i]:
+                deleted += self._shards[i].delete_many(shard_keys)
+        return deleted
+
+    def clear(self) -> None:
+        with self._all_locks():
+            for shard in self._shards:
+                shard.clear()
+
+    def invalidate_tags(self, *tags: str) -> int:
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                removed += shard.invalidate_tags(*tags)
+        return removed
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        removed = 0
+        for shard, lock in zip(self._shards, self._locks):
+            remaining = None if limit is None else limit - removed
+            if remaining == 0:
+                break
+            with lock:
+                removed += shard.purge_expired(remaining)
+        return removed
+
+    def stats(self) -> CacheStats:
+        with self._all_locks():
+            shard_stats = [shard.stats() for shard in self._shards]
+        return CacheStats(
+            backend="memory",
+            total_keys=sum(s.total_keys for s in shard_stats),
+            ttl_enabled=any(s.ttl_enabled for s in shard_stats),
+            extra={
+                "shards": self._n,
+                "bytes": sum(s.extra["bytes"] for s in shard_stats),
+                "evictions": self.metrics.counters["evictions"],
+            },
+            **self.metrics.snapshot(),
         )
 
     def close(self) -> None:
-        pass  # nothing to flush or disconnect
+        if self._sweeper is not None:
+            self._sweeper.stop()
@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+import itertools
+import threading
+import time
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from dd_cache.base import BaseCacheAdapter, TTLArg
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.snapshot import Entry
+
+
+class NamespacedCache(BaseCacheAdapter):
+    """A namespace inside another adapter, with O(1) bulk invalidation.
+
+    Usually obtained through ``cache.namespace(name)``.  Keys are stored in
+    *parent* as ``ns:<name>:<generation>:<key>``.  ``clear()`` advances the
+    namespace's generation (a single counter update in the backend), which
+    makes every existing entry unreachable at once; a daemon thread then
+    deletes the retired generation *reclaim_batch* keys at a time, pausing
+    *reclaim_pause* seconds between steps (incremental ``SCAN`` + ``UNLINK``
+    on Redis, indexed range deletes on SQLite).  Other namespaces and plain
+    keys are never touched.  A parent that must stay on one thread (a plain
+    :class:`~dd_cache.adapters.memory.InMemoryCache`) is instead reclaimed
+    one batch per namespace operation.
+
+    The generation is re-read from the backend at most every
+    *generation_ttl* seconds, so a clear issued by another process takes up
+    to that long to be seen here.  Writes racing a clear may land in the
+    retired generation; nothing can read them and they age out by TTL or
+    eviction.  Tags are namespaced like keys.  ``stats()`` reports the
+    parent's statistics.  ``close()``
+    stops reclamation but leaves *parent* open.
+    """
+
+    def __init__(
+        self,
+        parent: BaseCacheAdapter,
+        name: str,
+        *,
+        generation_ttl: float = 1.0,
+        reclaim_batch: int = 1000,
+        reclaim_pause: float = 0.01,
+    ) -> None:
+        if not name or ":" in name:
+            raise CacheError(f"namespace name must be non-empty and contain no ':': {name!r}")
+        self._parent = parent
+        self._name = name
+        self._metrics = parent.metrics  # operations are counted once, by the parent
+        self._generation_ttl = generation_ttl
+        self._reclaim_batch = reclaim_batch
+        self._reclaim_pause = reclaim_pause
+        self._generation = parent._ns_generation(name)
+        self._checked = time.monotonic()
+        self._reclaimers: list[threading.Thread] = []
+        self._backlog: Optional[Iterator[int]] = None  # inline reclamation
+        self._stop = threading.Event()
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def _thread_safe(self) -> bool:  # type: ignore[override]
+        return self._parent._thread_safe
+
+    def _prefix(self) -> str:
+        if self._backlog is not None and next(self._backlog, None) is None:
+            self._backlog = None
+        now = time.monotonic()
+        if now - self._checked >= self._generation_ttl:
+            self._generation = self._parent._ns_generation(self._name)
+            self._checked = now
+        return f"ns:{self._name}:{self._generation}:"
+
+    def _reclaim(self, prefix: str) -> None:
+        try:
+            for _ in self._parent._delete_prefix(prefix, self._reclaim_batch):
+                if self._stop.wait(self._reclaim_pause):
+                    return
+        except Exception:
+            pass  # e.g. parent closed; leftovers are unreachable and age out
+
+    def wait_reclaimed(self, timeout: Optional[float] = None) -> bool:
+        """Block until background reclamation finishes; returns False if
+        *timeout* seconds pass first."""
+        if self._backlog is not None:
+            for _ in self._backlog:
+                pass
+            self._backlog = None
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in list(self._reclaimers):
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+            if thread.is_alive():
+                return False
+        self._reclaimers = [t for t in self._reclaimers if t.is_alive()]
+        return True
+
+    # ------------------------------------------------------------------
+    # Stampede protection internals
+    # ------------------------------------------------------------------
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        return self._parent._lookup(self._prefix() + key, with_expiry=with_expiry)
+
+    def _lookup_many(self, keys: list[str]) -> dict[str, tuple[Any, Optional[float]]]:
+        prefix = self._prefix()
+        found = self._parent._lookup_many([prefix + key for key in keys])
+        return {key[len(prefix):]: entry for key, entry in found.items()}
+
+    def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        return self._parent._acquire_fill_lock(self._prefix() + key, timeout)
+
+    def _release_fill_lock(self, key: str) -> None:
+        self._parent._release_fill_lock(self._prefix() + key)
+
+    # ------------------------------------------------------------------
+    # Iteration internals
+    # ------------------------------------------------------------------
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        ns = self._prefix()
+        for entries in self._parent._scan_entries(ns + prefix, batch):
+            yield [(key[len(ns):], value, expires_at) for key, value, expires_at in entries]
+
+    def _scan_keys(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        ns = self._prefix()
+        for keys in self._parent._scan_keys(ns + prefix, batch):
+            yield [key[len(ns):] for key in keys]
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        return self._parent._delete_prefix(self._prefix() + prefix, batch)
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        return self._parent.get(self._prefix() + key)
+
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        prefix = self._prefix()
+        self._parent.set(prefix + key, value, ttl=ttl, tags=[prefix + tag for tag in tags])
+
+    def delete(self, key: str) -> bool:
+        return self._parent.delete(self._prefix() + key)
+
+    def exists(self, key: str) -> bool:
+        return self._parent.exists(self._prefix() + key)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        prefix = self._prefix()
+        found = self._parent.get_many(prefix + key for key in keys)
+        return {key[len(prefix):]: value for key, value in found.items()}
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        prefix = self._prefix()
+        if isinstance(ttl, Mapping):
+            ttl = {prefix + key: key_ttl for key, key_ttl in ttl.items()}
+        self._parent.set_many(
+            {prefix + key: value for key, value in items.items()},
+            ttl=ttl, tags=[prefix + tag for tag in tags],
+        )
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        prefix = self._prefix()
+        return self._parent.delete_many(prefix + key for key in keys)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        prefix = self._prefix()
+        return self._parent.invalidate_tags(*(prefix + tag for tag in tags))
+
+    def clear(self) -> None:
+        generation = self._parent._ns_generation(self._name, bump=True)
+        self._generation, self._checked = generation, time.monotonic()
+        retired = f"ns:{self._name}:{generation - 1}:"
+        if not self._parent._thread_safe:
+            steps = self._parent._delete_prefix(retired, self._reclaim_batch)
+            self._backlog = steps if self._backlog is None else itertools.chain(self._backlog, steps)
+            return
+        thread = threading.Thread(
+            target=self._reclaim, args=(retired,), name="dd-cache-ns-reclaim", daemon=True,
+        )
+        self._reclaimers = [t for t in self._reclaimers if t.is_alive()] + [thread]
+        thread.start()
+
+    def stats(self) -> CacheStats:
+        parent = self._parent.stats()
+        return parent.model_copy(update={
+            "extra": {
+                **parent.extra,
+                "namespace": self._name,
+                "generation": self._generation,
+                "reclaiming": sum(t.is_alive() for t in self._reclaimers) + (self._backlog is not None),
+            },
+        })
+
+    def close(self) -> None:
+        self._stop.set()
+        for thread in self._reclaimers:
+            thread.join()
+        self._reclaimers = []
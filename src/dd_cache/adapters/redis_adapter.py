@@ -1,69 +1,487 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, Any, Optional
+import re
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, Optional
 
-from dd_cache.base import BaseCacheAdapter
+from dd_cache.base import MISSING, BaseCacheAdapter, TTLArg, ttl_for
+from dd_cache.codecs import DEFAULT_CODEC, Codec
+from dd_cache.filters import KeyFilter
 from dd_cache.models import CacheError, CacheStats
-from dd_cache.utils import deserialize, serialize
+from dd_cache.snapshot import Entry
 
 if TYPE_CHECKING:
     import redis as redis_lib
 
+_BATCH = 1000  # keys per MGET / pipeline flush / UNLINK
+_LOCK_PREFIX = "dd-cache:lock:"
+_NS_PREFIX = "dd-cache:ns:"
+_TAG_PREFIX = "dd-cache:tag:"
+_KEYTAGS_PREFIX = "dd-cache:keytags:"
+_INTERNAL_PREFIX = "dd-cache:"
+
+
+def _scan_pattern(prefix: str) -> str:
+    """``SCAN MATCH`` pattern for keys starting with *prefix* taken literally."""
+    return re.sub(r"([*?\[\]\\])", r"\\\1", prefix) + "*"
+
+
+def _queue_retag(pipe: Any, keys: list[tuple[str, Optional[int]]], tags: tuple[str, ...]) -> None:
+    """Queue the commands that give each ``(key, ttl)`` in *keys* exactly
+    *tags* (none for a delete): read and drop the key's tag list, record
+    the new one with the key's TTL, and add the keys to each tag's set,
+    reading its PTTL first.  :func:`_queue_retag_fixups` finishes the job
+    from the replies."""
+    for key, ttl in keys:
+        pipe.smembers(_KEYTAGS_PREFIX + key)
+        pipe.unlink(_KEYTAGS_PREFIX + key)
+        if tags:
+            pipe.sadd(_KEYTAGS_PREFIX + key, *tags)
+            if ttl is not None:
+                pipe.expire(_KEYTAGS_PREFIX + key, ttl)
+    for tag in tags:
+        pipe.pttl(_TAG_PREFIX + tag)
+        pipe.sadd(_TAG_PREFIX + tag, *[key for key, _ in keys])
+
+
+def _queue_retag_fixups(
+    pipe: Any, keys: list[tuple[str, Optional[int]]], tags: tuple[str, ...], replies: list[Any],
+) -> bool:
+    """Queue, from the *replies* to :func:`_queue_retag`, an ``SREM`` of
+    each key from the tags it no longer carries and whatever extends each
+    of *tags*' sets to outlive its longest-lived member.  Returns whether
+    anything was queued."""
+    replies_iter = iter(replies)
+    queued = False
+    for key, ttl in keys:
+        old = next(replies_iter)
+        next(replies_iter)
+        if tags:
+            next(replies_iter)
+            if ttl is not None:
+                next(replies_iter)
+        for tag in old:
+            tag = tag.decode() if isinstance(tag, bytes) else tag
+            if tag not in tags:
+                pipe.srem(_TAG_PREFIX + tag, key)
+                queued = True
+    ttls = [ttl for _, ttl in keys]
+    longest = None if None in ttls else max(ttls, default=0) * 1000
+    for tag in tags:
+        pttl = next(replies_iter)  # -2: new set, -1: already kept forever
+        next(replies_iter)
+        if longest is None:
+            if pttl >= 0:
+                pipe.persist(_TAG_PREFIX + tag)
+                queued = True
+        elif pttl == -2 or 0 <= pttl < longest:
+            pipe.pexpire(_TAG_PREFIX + tag, longest)
+            queued = True
+    return queued
+
 
 class RedisCache(BaseCacheAdapter):
     """Redis-backed cache.
 
     Requires the ``redis`` package (``pip install dd-cache[redis]``).
-    Values are serialised with pickle so arbitrary Python objects are supported.
+    Values are serialised with *codec* (default: pickle, so arbitrary Python
+    objects are supported).
     TTL is delegated to native Redis ``EX`` seconds.
+
+    Pass *client* to reuse an existing ``redis.Redis``-compatible client
+    (for example a shared pool or an in-process stand-in for tests).
+
+    Each tag is a Redis set of keys, written in the same pipeline as the
+    value, and each tagged key keeps the list of its tags, so a tagged
+    write drops its old memberships.  A tag set expires once its
+    longest-lived member has.  Untagged writes and deletes cost a single
+    command and leave tag sets alone, so an untagged overwrite or delete of
+    a tagged key stays in its old tag sets (and ``invalidate_tags`` may
+    delete a newer value) until they expire.  Pass *tagging* where the same
+    keys are written both with and without tags: every write and delete
+    then drops old memberships, for about two extra commands each.
+
+    Key iteration, prefix deletes and dumps walk the keyspace with
+    incremental ``SCAN MATCH``; *scan_count* is the ``COUNT`` hint, i.e.
+    roughly how many keys the server inspects per call.
+
+    With *key_filter*, an in-process counting Bloom filter of the keys
+    (sized by *filter_capacity* and *filter_error_rate*, see
+    :class:`~dd_cache.filters.KeyFilter`) is built with ``SCAN`` on startup
+    and maintained by this client's writes, so lookups of absent keys skip
+    the round trip.  Keys written by other clients read as misses until
+    :meth:`rebuild_filter` runs; enable it where this client owns its keys.
     """
 
-    def __init__(self, host: str = "localhost", port: int = 6379, db: int = 0, **kwargs: Any) -> None:
-        try:
-            import redis
-        except ImportError as exc:
-            raise CacheError(
-                "RedisCache requires the 'redis' package. "
-                "Install it with: pip install dd-cache[redis]"
-            ) from exc
-        self._client: redis_lib.Redis = redis.Redis(host=host, port=port, db=db, **kwargs)
+    def __init__(
+        self,
+        host: str = "localhost",
+        port: int = 6379,
+        db: int = 0,
+        *,
+        client: Optional["redis_lib.Redis"] = None,
+        codec: Codec = DEFAULT_CODEC,
+        key_filter: bool = False,
+        filter_capacity: Optional[int] = None,
+        filter_error_rate: float = 0.01,
+        scan_count: int = _BATCH,
+        tagging: bool = False,
+        **kwargs: Any,
+    ) -> None:
+        self._codec = codec
+        self._scan_count = scan_count
+        self._tagging = tagging
+        self._lock_token = uuid.uuid4().hex.encode()
+        if client is None:
+            try:
+                import redis
+            except ImportError as exc:
+                raise CacheError(
+                    "RedisCache requires the 'redis' package. "
+                    "Install it with: pip install dd-cache[redis]"
+                ) from exc
+            client = redis.Redis(host=host, port=port, db=db, **kwargs)
+        self._client: redis_lib.Redis = client
+        self._filter: Optional[KeyFilter] = None
+        if key_filter:
+            self._filter = KeyFilter(filter_capacity, filter_error_rate)
+            self.rebuild_filter()
+
+    def _write_tagged(
+        self, keys: list[tuple[str, Optional[int]]], tags: tuple[str, ...], queue: Callable[[Any], Any],
+    ) -> list[Any]:
+        """Run the commands *queue* adds to a pipeline, then, for a tagged
+        write or with *tagging*, retag *keys* (see :func:`_queue_retag`) in
+        the same round trip, plus one more when old memberships must go.
+        Returns *queue*'s replies."""
+        pipe = self._client.pipeline(transaction=False)
+        queue(pipe)
+        if not tags and not self._tagging:
+            return pipe.execute()
+        written = len(pipe)
+        _queue_retag(pipe, keys, tags)
+        replies = pipe.execute()
+        fixups = self._client.pipeline(transaction=False)
+        if _queue_retag_fixups(fixups, keys, tags, replies[written:]):
+            fixups.execute()
+        return replies[:written]
+
+    def _unlink_tagged(self, keys: list[str]) -> int:
+        if not self._tagging:
+            return self._client.unlink(*keys)
+        return self._write_tagged([(key, None) for key in keys], (), lambda pipe: pipe.unlink(*keys))[0]
+
+    @staticmethod
+    def _chunks(keys: list[str]) -> Iterable[list[str]]:
+        for i in range(0, len(keys), _BATCH):
+            yield keys[i:i + _BATCH]
+
+    def _absent(self, key: str) -> bool:
+        """True if the key filter rules *key* out."""
+        return self._filter is not None and not self._filter.might_contain(key)
+
+    def _filter_stale(self, count: int) -> None:
+        if self._filter is not None and count:
+            self._filter.mark_stale(count)
+            if self._filter.due:
+                self.rebuild_filter()
+
+    def rebuild_filter(self) -> None:
+        """Rebuild the key filter from an incremental ``SCAN`` of the
+        database (skipping dd-cache bookkeeping keys)."""
+        if self._filter is None:
+            raise CacheError("this RedisCache was created without key_filter=True")
+
+        def keys() -> Iterator[str]:
+            for key in self._client.scan_iter(count=self._scan_count):
+                key = key.decode() if isinstance(key, bytes) else key
+                if not key.startswith(_INTERNAL_PREFIX):
+                    yield key
+
+        self._filter.rebuild(keys(), self._client.dbsize())
+
+    # ------------------------------------------------------------------
+    # Stampede protection internals
+    # ------------------------------------------------------------------
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        if self._absent(key):
+            return MISSING
+        if with_expiry:
+            pipe = self._client.pipeline(transaction=False)
+            pipe.get(key)
+            pipe.pttl(key)
+            data, pttl = pipe.execute()
+        else:
+            data, pttl = self._client.get(key), -1
+        if data is None:
+            if self._filter is not None:
+                self._filter.missed()
+            return MISSING
+        self.metrics.incr("bytes_out", len(data))
+        expires_at = time.time() + pttl / 1000 if pttl is not None and pttl > 0 else None
+        return self._codec.decode(data), expires_at
+
+    def _lookup_many(self, keys: list[str]) -> dict[str, tuple[Any, Optional[float]]]:
+        if self._filter is not None:
+            keys = [key for key in keys if self._filter.might_contain(key)]
+        found: dict[str, tuple[Any, Optional[float]]] = {}
+        for chunk in self._chunks(keys):
+            found.update((key, (value, expires_at)) for key, value, expires_at in self._fetch_entries(chunk))
+        if self._filter is not None:
+            self._filter.missed(len(keys) - len(found))
+        return found
+
+    def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        acquired = bool(self._client.set(
+            _LOCK_PREFIX + key, self._lock_token, nx=True, px=max(int(timeout * 1000), 1)
+        ))
+        if not acquired and self._filter is not None:
+            self._filter.add(key)  # another client is filling it; let the polls through
+        return acquired
+
+    def _release_fill_lock(self, key: str) -> None:
+        from redis.exceptions import WatchError
+
+        lock_key = _LOCK_PREFIX + key
+        with self._client.pipeline() as pipe:
+            try:
+                pipe.watch(lock_key)
+                if pipe.get(lock_key) == self._lock_token:  # never drop another owner's lock
+                    pipe.multi()
+                    pipe.delete(lock_key)
+                    pipe.execute()
+            except WatchError:
+                pass  # lock expired and was re-taken meanwhile; it is not ours
+
+    # ------------------------------------------------------------------
+    # Namespace internals
+    # ------------------------------------------------------------------
+
+    def _ns_generation(self, name: str, *, bump: bool = False) -> int:
+        if bump:
+            return int(self._client.incr(_NS_PREFIX + name))
+        return int(self._client.get(_NS_PREFIX + name) or 0)
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        for removed in self._unlink_matching(prefix, batch, internal=False):
+            self._filter_stale(removed)
+            yield removed
+        # The removed keys' tag lists, and tag sets named under the prefix
+        # (a namespace's tags carry its prefix).
+        for internal in (_KEYTAGS_PREFIX, _TAG_PREFIX):
+            for _ in self._unlink_matching(internal + prefix, batch, internal=True):
+                yield 0
+
+    def _unlink_matching(self, prefix: str, batch: int, *, internal: bool) -> Iterator[int]:
+        # SCAN walks the keyspace incrementally, so the server is never
+        # blocked for long; UNLINK frees memory off the main thread.
+        chunk = []
+        for key in self._client.scan_iter(match=_scan_pattern(prefix), count=self._scan_count):
+            if not internal and (key.decode() if isinstance(key, bytes) else key).startswith(_INTERNAL_PREFIX):
+                continue  # fill locks, namespace generations, tag sets
+            chunk.append(key)
+            if len(chunk) >= batch:
+                yield self._client.unlink(*chunk)
+                chunk = []
+        if chunk:
+            yield self._client.unlink(*chunk)
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        chunk = []
+        for key in self._client.scan_iter(match=_scan_pattern(prefix), count=self._scan_count):
+            key = key.decode() if isinstance(key, bytes) else key
+            if key.startswith(_INTERNAL_PREFIX):
+                continue  # fill locks, namespace generations, tag sets
+            chunk.append(key)
+            if len(chunk) >= batch:
+                yield self._fetch_entries(chunk)
+                chunk = []
+        if chunk:
+            yield self._fetch_entries(chunk)
+
+    def _scan_keys(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        chunk = []
+        for key in self._client.scan_iter(match=_scan_pattern(prefix), count=self._scan_count):
+            key = key.decode() if isinstance(key, bytes) else key
+            if key.startswith(_INTERNAL_PREFIX):
+                continue
+            chunk.append(key)
+            if len(chunk) >= batch:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def _fetch_entries(self, keys: list[str]) -> list[Entry]:
+        pipe = self._client.pipeline(transaction=False)
+        for key in keys:
+            pipe.get(key)
+            pipe.pttl(key)
+        replies = pipe.execute()
+        now = time.time()
+        return [
+            (key, self._codec.decode(data), now + pttl / 1000 if pttl > 0 else None)
+            for key, data, pttl in zip(keys, replies[::2], replies[1::2])
+            if data is not None
+        ]
 
     # ------------------------------------------------------------------
     # BaseCacheAdapter interface
     # ------------------------------------------------------------------
 
     def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        if self._absent(key):
+            self.metrics.lookup(False, time.perf_counter() - start)
+            return None
         data = self._client.get(key)
+        if data is None and self._filter is not None:
+            self._filter.missed()
+        self.metrics.lookup(data is not None, time.perf_counter() - start)
         if data is None:
             return None
-        return deserialize(data)
+        self.metrics.incr("bytes_out", len(data))
+        return self._codec.decode(data)
 
-    def set(self, key: str, value: Any, *, ttl: Optional[int] = None) -> None:
-        serialized = serialize(value)
-        if ttl is not None:
-            self._client.set(key, serialized, ex=ttl)
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        serialized = self._codec.encode(value)
+        tags = tuple(tags)
+        if self._filter is not None:
+            self._filter.add(key)
+        if tags or self._tagging:
+            self._write_tagged([(key, ttl)], tags, lambda pipe: pipe.set(key, serialized, ex=ttl))
         else:
-            self._client.set(key, serialized)
+            self._client.set(key, serialized, ex=ttl)
+        self.metrics.incr("sets")
+        self.metrics.incr("bytes_in", len(serialized))
+        self.metrics.observe("set", time.perf_counter() - start)
+        if self._filter is not None and self._filter.due:
+            self.rebuild_filter()
 
     def delete(self, key: str) -> bool:
-        return bool(self._client.delete(key))
+        start = time.perf_counter()
+        if self._tagging:
+            existed = bool(self._write_tagged([(key, None)], (), lambda pipe: pipe.delete(key))[0])
+        else:
+            existed = bool(self._client.delete(key))
+        if existed:
+            if self._filter is not None:
+                self._filter.remove(key)
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
+        return existed
 
     def exists(self, key: str) -> bool:
-        return bool(self._client.exists(key))
+        if self._absent(key):
+            return False
+        found = bool(self._client.exists(key))
+        if not found and self._filter is not None:
+            self._filter.missed()
+        return found
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        result: dict[str, Any] = {}
+        keys = list(dict.fromkeys(keys))
+        requested, read = len(keys), 0
+        if self._filter is not None:
+            keys = [key for key in keys if self._filter.might_contain(key)]
+        for chunk in self._chunks(keys):
+            for key, data in zip(chunk, self._client.mget(chunk)):
+                if data is not None:
+                    read += len(data)
+                    result[key] = self._codec.decode(data)
+        if self._filter is not None:
+            self._filter.missed(len(keys) - len(result))
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", requested - len(result))
+        self.metrics.incr("bytes_out", read)
+        self.metrics.observe("get_many", time.perf_counter() - start)
+        return result
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
+        written = 0
+        if self._filter is not None:
+            self._filter.add_many(items)
+        for chunk in self._chunks(list(items)):
+            encoded = [(key, self._codec.encode(items[key]), ttl_for(ttl, key)) for key in chunk]
+            written += sum(len(data) for _, data, _ in encoded)
+
+            def queue_sets(pipe: Any, encoded: list[tuple[str, bytes, Optional[int]]] = encoded) -> None:
+                for key, data, key_ttl in encoded:
+                    pipe.set(key, data, ex=key_ttl)
+
+            self._write_tagged([(key, key_ttl) for key, _, key_ttl in encoded], tags, queue_sets)
+        self.metrics.incr("sets", len(items))
+        self.metrics.incr("bytes_in", written)
+        self.metrics.observe("set_many", time.perf_counter() - start)
+        if self._filter is not None and self._filter.due:
+            self.rebuild_filter()
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        start = time.perf_counter()
+        deleted = sum(self._unlink_tagged(chunk) for chunk in self._chunks(list(dict.fromkeys(keys))))
+        self._filter_stale(deleted)
+        self.metrics.incr("deletes", deleted)
+        self.metrics.observe("delete_many", time.perf_counter() - start)
+        return deleted
+
+    def invalidate_tags(self, *tags: str) -> int:
+        from redis.exceptions import ResponseError
+
+        start = time.perf_counter()
+        removed = 0
+        for tag in dict.fromkeys(tags):
+            # Detach the set first: keys tagged from now on start a new one.
+            detached = f"{_TAG_PREFIX}{tag}:invalidating:{uuid.uuid4().hex}"
+            try:
+                self._client.rename(_TAG_PREFIX + tag, detached)
+            except ResponseError:
+                continue  # no such tag
+            chunk: list[str] = []
+            for key in self._client.sscan_iter(detached, count=_BATCH):
+                chunk.append(key.decode() if isinstance(key, bytes) else key)
+                if len(chunk) >= _BATCH:
+                    removed += self._unlink_tagged(chunk)
+                    chunk = []
+            if chunk:
+                removed += self._unlink_tagged(chunk)
+            self._client.unlink(detached)
+        self._filter_stale(removed)
+        self.metrics.incr("deletes", removed)
+        self.metrics.observe("invalidate_tags", time.perf_counter() - start)
+        return removed
 
     def clear(self) -> None:
         self._client.flushdb()
+        if self._filter is not None:
+            self._filter.clear()
 
     def stats(self) -> CacheStats:
-        info = self._client.info()
+        from redis.exceptions import ResponseError
+
+        try:
+            info = self._client.info()
+        except ResponseError:
+            info = {}  # INFO is disabled on some proxies and managed services
+        extra: dict[str, Any] = {
+            "codec": self._codec.name,
+            "redis_version": info.get("redis_version", "unknown"),
+            "used_memory_human": info.get("used_memory_human", "unknown"),
+        }
+        if self._filter is not None:
+            extra["filter"] = self._filter.stats()
         return CacheStats(
             backend="redis",
             total_keys=self._client.dbsize(),
             ttl_enabled=True,
-            extra={
-                "redis_version": info.get("redis_version", "unknown"),
-                "used_memory_human": info.get("used_memory_human", "unknown"),
-            },
+            extra=extra,
+            **self.metrics.snapshot(),
         )
 
     def close(self) -> None:
@@ -0,0 +1,296 @@
+from __future__ import annotations
+
+import bisect
+import hashlib
+import itertools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, Iterator, Mapping, Optional, Sequence, TypeVar, Union
+
+from dd_cache.base import MISSING, BaseCacheAdapter, TTLArg
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.snapshot import Entry
+
+T = TypeVar("T")
+
+Shards = Union[Mapping[str, BaseCacheAdapter], Sequence[BaseCacheAdapter]]
+
+
+def _point(label: str) -> int:
+    return int.from_bytes(hashlib.blake2b(label.encode(), digest_size=8).digest(), "big")
+
+
+class _Ring:
+    """Immutable consistent-hash ring; replaced wholesale on membership
+    changes so lookups never need a lock."""
+
+    __slots__ = ("points", "owners", "shards")
+
+    def __init__(self, shards: dict[str, BaseCacheAdapter], vnodes: int) -> None:
+        placed = sorted(
+            (_point(f"{name}#{i}"), name) for name in shards for i in range(vnodes)
+        )
+        self.points = [point for point, _ in placed]
+        self.owners = [name for _, name in placed]
+        self.shards = shards
+
+    def owner(self, key: str) -> str:
+        i = bisect.bisect(self.points, _point(key))
+        return self.owners[i % len(self.owners)]
+
+
+class ShardedCache(BaseCacheAdapter):
+    """Spread keys over several adapters with consistent hashing.
+
+    *shards* is a ``{name: adapter}`` mapping, or a sequence whose shards
+    are named ``"0"``, ``"1"``, ...  Each shard is placed on a hash ring at
+    *vnodes* points derived from its name, and a key belongs to the first
+    point at or after its hash, so :meth:`add_shard` and :meth:`remove_shard`
+    move only the keys in the affected arcs (about ``1/N`` of them) and
+    every process given the same names routes keys the same way.  Name
+    shards explicitly when membership will change; positional names shift
+    when a shard is removed.
+
+    Keys that move to another shard are simply misses there; their old
+    copies are not migrated and age out by TTL or eviction.  Batch
+    operations are split per shard and run in parallel on a pool of up to
+    *max_workers* threads, unless a shard must stay on one thread (a plain
+    :class:`~dd_cache.adapters.memory.InMemoryCache`), in which case they
+    run in turn.  ``clear``, :meth:`invalidate_tags` and ``purge_expired``
+    reach every shard; tags live with their key's shard.
+    """
+
+    def __init__(self, shards: Shards, *, vnodes: int = 160, max_workers: Optional[int] = None) -> None:
+        if not isinstance(shards, Mapping):
+            shards = {str(i): shard for i, shard in enumerate(shards)}
+        if not shards:
+            raise CacheError("ShardedCache needs at least one shard")
+        if vnodes < 1:
+            raise CacheError("vnodes must be at least 1")
+        self._vnodes = vnodes
+        self._ring = _Ring(dict(shards), vnodes)
+        self._lock = threading.Lock()
+        self._max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def shards(self) -> dict[str, BaseCacheAdapter]:
+        """The current ``{name: adapter}`` membership (a copy)."""
+        return dict(self._ring.shards)
+
+    def shard_for(self, key: str) -> str:
+        """Name of the shard that owns *key*."""
+        return self._ring.owner(key)
+
+    def add_shard(self, name: str, shard: BaseCacheAdapter) -> None:
+        """Add *shard* under *name*; only keys in its arcs change owner."""
+        with self._lock:
+            if name in self._ring.shards:
+                raise CacheError(f"shard {name!r} already exists")
+            self._ring = _Ring({**self._ring.shards, name: shard}, self._vnodes)
+
+    def remove_shard(self, name: str) -> BaseCacheAdapter:
+        """Remove the shard called *name* and return it, still open; its keys
+        fall to the neighbouring shards."""
+        with self._lock:
+            shards = dict(self._ring.shards)
+            if name not in shards:
+                raise CacheError(f"no shard named {name!r}")
+            if len(shards) == 1:
+                raise CacheError("cannot remove the last shard")
+            shard = shards.pop(name)
+            self._ring = _Ring(shards, self._vnodes)
+        return shard
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def _thread_safe(self) -> bool:  # type: ignore[override]
+        return all(shard._thread_safe for shard in self._ring.shards.values())
+
+    def _shard(self, key: str) -> BaseCacheAdapter:
+        ring = self._ring
+        return ring.shards[ring.owner(key)]
+
+    def _group(self, keys: Iterable[str]) -> dict[BaseCacheAdapter, list[str]]:
+        ring = self._ring
+        groups: dict[BaseCacheAdapter, list[str]] = {}
+        for key in keys:
+            groups.setdefault(ring.shards[ring.owner(key)], []).append(key)
+        return groups
+
+    def _fan_out(self, calls: Sequence[Callable[[], T]]) -> list[T]:
+        """Run *calls* (one per shard) in parallel and return their results.
+        The first failure is raised once all calls have finished."""
+        if len(calls) <= 1 or not self._thread_safe:
+            return [call() for call in calls]
+        pool = self._pool
+        if pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self._max_workers, thread_name_prefix="dd-cache-shard",
+                    )
+                pool = self._pool
+        futures = [pool.submit(call) for call in calls]
+        errors = [f.exception() for f in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return [f.result() for f in futures]
+
+    def _each_shard(self, fn: Callable[[BaseCacheAdapter], T]) -> list[T]:
+        return self._fan_out([
+            (lambda shard=shard: fn(shard)) for shard in self._ring.shards.values()
+        ])
+
+    # ------------------------------------------------------------------
+    # Stampede protection internals
+    # ------------------------------------------------------------------
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        return self._shard(key)._lookup(key, with_expiry=with_expiry)
+
+    def _lookup_many(self, keys: list[str]) -> dict[str, tuple[Any, Optional[float]]]:
+        found: dict[str, tuple[Any, Optional[float]]] = {}
+        for part in self._fan_out([
+            (lambda shard=shard, part=part: shard._lookup_many(part)) for shard, part in self._group(keys).items()
+        ]):
+            found.update(part)
+        return found
+
+    def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        return self._shard(key)._acquire_fill_lock(key, timeout)
+
+    def _release_fill_lock(self, key: str) -> None:
+        self._shard(key)._release_fill_lock(key)
+
+    # ------------------------------------------------------------------
+    # Namespace internals
+    # ------------------------------------------------------------------
+
+    def _ns_generation(self, name: str, *, bump: bool = False) -> int:
+        # Kept on every shard so membership changes cannot roll it back.
+        return max(self._each_shard(lambda shard: shard._ns_generation(name, bump=bump)))
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        return itertools.chain.from_iterable(
+            shard._delete_prefix(prefix, batch) for shard in list(self._ring.shards.values())
+        )
+
+    # ------------------------------------------------------------------
+    # Iteration internals
+    # ------------------------------------------------------------------
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        return itertools.chain.from_iterable(
+            shard._scan_entries(prefix, batch) for shard in list(self._ring.shards.values())
+        )
+
+    def _scan_keys(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        return itertools.chain.from_iterable(
+            shard._scan_keys(prefix, batch) for shard in list(self._ring.shards.values())
+        )
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        entry = self._lookup(key)
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        return None if entry is MISSING else entry[0]
+
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        self._shard(key).set(key, value, ttl=ttl, tags=tags)
+        self.metrics.incr("sets")
+        self.metrics.observe("set", time.perf_counter() - start)
+
+    def delete(self, key: str) -> bool:
+        start = time.perf_counter()
+        existed = self._shard(key).delete(key)
+        if existed:
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
+        return existed
+
+    def exists(self, key: str) -> bool:
+        return self._shard(key).exists(key)
+
+    def clear(self) -> None:
+        self._each_shard(lambda shard: shard.clear())
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        keys = list(dict.fromkeys(keys))
+        result: dict[str, Any] = {}
+        for found in self._fan_out([
+            (lambda shard=shard, part=part: shard.get_many(part)) for shard, part in self._group(keys).items()
+        ]):
+            result.update(found)
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", len(keys) - len(result))
+        self.metrics.observe("get_many", time.perf_counter() - start)
+        return result
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
+        groups = self._group(items)
+        self._fan_out([
+            (lambda shard=shard, part=part: shard.set_many({key: items[key] for key in part}, ttl=ttl, tags=tags))
+            for shard, part in groups.items()
+        ])
+        self.metrics.incr("sets", len(items))
+        self.metrics.observe("set_many", time.perf_counter() - start)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        start = time.perf_counter()
+        groups = self._group(dict.fromkeys(keys))
+        deleted = sum(self._fan_out([
+            (lambda shard=shard, part=part: shard.delete_many(part)) for shard, part in groups.items()
+        ]))
+        self.metrics.incr("deletes", deleted)
+        self.metrics.observe("delete_many", time.perf_counter() - start)
+        return deleted
+
+    def invalidate_tags(self, *tags: str) -> int:
+        return sum(self._each_shard(lambda shard: shard.invalidate_tags(*tags)))
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        return sum(self._each_shard(lambda shard: shard.purge_expired(limit)))
+
+    def stats(self) -> CacheStats:
+        names = list(self._ring.shards)
+        per_shard = dict(zip(names, self._each_shard(lambda shard: shard.stats())))
+        # Operations are counted here; evictions, expirations and serialised
+        # traffic happen inside the shards.
+        counters = self.metrics.snapshot()
+        for field in ("evictions", "expirations", "bytes_in", "bytes_out"):
+            counters[field] = sum(getattr(s, field) for s in per_shard.values())
+        return CacheStats(
+            backend="sharded",
+            total_keys=sum(s.total_keys for s in per_shard.values()),
+            ttl_enabled=any(s.ttl_enabled for s in per_shard.values()),
+            extra={
+                "shards": len(per_shard),
+                "vnodes": self._vnodes,
+                "per_shard": {
+                    name: {"backend": s.backend, "total_keys": s.total_keys, **s.extra}
+                    for name, s in per_shard.items()
+                },
+            },
+            **counters,
+        )
+
+    def close(self) -> None:
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        for shard in self._ring.shards.values():
+            shard.close()
@@ -0,0 +1,500 @@
+from __future__ import annotations
+
+import hashlib
+import os
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Iterable, Iterator, Optional
+
+from dd_cache.base import MISSING, BaseCacheAdapter
+from dd_cache.codecs import DEFAULT_CODEC, Codec
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.snapshot import Entry
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None  # type: ignore[assignment]
+
+_MAGIC = b"DDSHM002"
+_HEADER = struct.Struct("<8sQQQQ")  # magic, buckets, ways, arena bytes, lock stripes
+_HEAD = struct.Struct("<QQ")        # arena write position and oldest record, after the header
+_HEAD_OFFSET = _HEADER.size
+# Per lock stripe: occupied slots, their key + value bytes, and how many of
+# them carry a TTL.  Each cell is only written under its stripe's lock.
+_COUNTER = struct.Struct("<qqq")
+_COUNTERS_OFFSET = 64
+
+# Lock file bytes: the open lock, the arena lock, then one per stripe.
+_OPEN_LOCK = 0
+_ARENA_LOCK = 1
+_STRIPE_LOCKS = 2
+
+# One slot: seq, hash, pos, expires_at, key length, value length.  *seq* is
+# odd while a writer is rewriting the slot; *hash* 0 is empty, 1 a tombstone.
+_SLOT = struct.Struct("<QQQdII")
+_SEQ = struct.Struct("<Q")
+_BODY = struct.Struct("<QQdII")
+_TOMBSTONE = 1
+
+# Each arena record starts with its key hash and total size, so the writer
+# that laps it can find the slot still pointing at it.  Size 0 marks the
+# unused tail of a lap.
+_RECORD = struct.Struct("<QI")
+
+_READ_RETRIES = 4
+
+
+class _ProcessLocks:
+    """The lock file descriptor and thread locks of one segment, shared by
+    every instance in this process: ``fcntl`` locks belong to the process,
+    so two instances would not exclude each other, and closing any
+    descriptor of the file drops all of the process's locks on it."""
+
+    __slots__ = ("path", "fd", "threads", "users")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o600)
+        self.threads = [threading.Lock(), threading.Lock()]
+        self.users = 0
+
+
+_PROCESS_LOCKS: dict[str, _ProcessLocks] = {}
+_PROCESS_LOCKS_GUARD = threading.Lock()
+
+
+def _attach_locks(path: str) -> _ProcessLocks:
+    with _PROCESS_LOCKS_GUARD:
+        locks = _PROCESS_LOCKS.get(path)
+        if locks is None:
+            locks = _PROCESS_LOCKS[path] = _ProcessLocks(path)
+        locks.users += 1
+        return locks
+
+
+def _detach_locks(locks: _ProcessLocks) -> None:
+    with _PROCESS_LOCKS_GUARD:
+        locks.users -= 1
+        if not locks.users:
+            if _PROCESS_LOCKS.get(locks.path) is locks:
+                del _PROCESS_LOCKS[locks.path]
+            os.close(locks.fd)
+
+
+def _slots_offset(stripes: int) -> int:
+    return -(-(_COUNTERS_OFFSET + stripes * _COUNTER.size) // 64) * 64
+
+
+def _hash(data: bytes) -> int:
+    return max(int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "little"), 2)
+
+
+class SharedMemoryCache(BaseCacheAdapter):
+    """Cache in a named shared-memory segment, shared by every process on
+    the host that opens the same *name*.
+
+    The segment holds a set-associative hash table — *max_entries* slots in
+    buckets of *ways*, each key probing only its own bucket — and an arena
+    of *arena_bytes* that serialised keys and values are appended to as a
+    ring.  Memory use is fixed at creation.  Eviction is bounded and needs
+    no bookkeeping: a write reuses an empty, deleted, expired or overwritten
+    slot in its bucket, else the bucket's oldest entry, and an entry whose
+    arena bytes have been lapped by newer writes is gone.  So the cache
+    keeps roughly the most recently written *arena_bytes* of data.
+
+    Reads take no lock: each slot carries a sequence number that writers
+    make odd while they update it (a seqlock), and a read that raced a
+    writer or the arena wrapping retries.  Writers lock the key's bucket
+    stripe (one of *lock_stripes*) with a ``fcntl`` byte-range lock on a
+    lock file in the temp directory, plus a thread lock shared by every
+    instance of the segment in the process, so a crashed process never
+    leaves a lock held.  Each stripe keeps its share of the entry and
+    byte totals in the segment header, so ``stats()`` costs O(stripes).
+    A write that laps older records tombstones their slots, so the totals
+    stay exact except for expired entries, counted until read or reused.
+
+    The first process to open *name* creates the segment with the sizes
+    given; later ones attach and use the segment's sizes.  ``close()``
+    detaches; the segment outlives every process until :meth:`unlink`.
+    Values larger than a quarter of the arena are rejected, tags are not
+    supported, and namespace generations are per process.  POSIX only.
+    """
+
+    def __init__(
+        self,
+        name: str = "dd-cache",
+        *,
+        max_entries: int = 65_536,
+        ways: int = 8,
+        arena_bytes: int = 64 * 1024 * 1024,
+        lock_stripes: int = 64,
+        codec: Codec = DEFAULT_CODEC,
+    ) -> None:
+        if fcntl is None:
+            raise CacheError("SharedMemoryCache needs POSIX file locks (fcntl)")
+        if ways < 1 or max_entries < ways or arena_bytes < 4096:
+            raise CacheError("SharedMemoryCache is too small: check max_entries, ways and arena_bytes")
+        self._name = name
+        self._codec = codec
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._locks = _attach_locks(self._lock_path)
+        self._lock_fd = self._locks.fd
+        self._thread_locks = self._locks.threads
+        with self._locked(_OPEN_LOCK):
+            buckets = -(-max_entries // ways)
+            self._shm = self._open(name, buckets, ways, arena_bytes, lock_stripes)
+        self._buf = self._shm.buf
+        magic, self._buckets, self._ways, self._arena_bytes, self._stripes = _HEADER.unpack_from(self._buf, 0)
+        if magic != _MAGIC:
+            raise CacheError(f"shared memory segment {name!r} is not a dd-cache segment")
+        with _PROCESS_LOCKS_GUARD:
+            missing = _STRIPE_LOCKS + self._stripes - len(self._thread_locks)
+            self._thread_locks.extend(threading.Lock() for _ in range(missing))
+        self._bucket = struct.Struct("<" + "QQQdII" * self._ways)
+        self._bucket_size = self._bucket.size
+        self._slots = _slots_offset(self._stripes)
+        self._arena = self._slots + self._buckets * self._bucket_size
+
+    @staticmethod
+    def _open(name: str, buckets: int, ways: int, arena_bytes: int, stripes: int) -> shared_memory.SharedMemory:
+        size = _slots_offset(stripes) + buckets * ways * _SLOT.size + arena_bytes
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+        else:
+            _HEADER.pack_into(shm.buf, 0, _MAGIC, buckets, ways, arena_bytes, stripes)
+        # The segment's lifetime is unlink()'s business, not that of
+        # whichever process happens to exit first.
+        resource_tracker.unregister(shm._name, "shared_memory")  # type: ignore[attr-defined]
+        return shm
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @contextmanager
+    def _locked(self, index: int, count: int = 1) -> Iterator[None]:
+        """Hold locks *index* .. *index + count - 1* across threads and
+        processes."""
+        locks = self._thread_locks[index:index + count]
+        for lock in locks:
+            lock.acquire()
+        try:
+            fcntl.lockf(self._lock_fd, fcntl.LOCK_EX, count, index)
+            try:
+                yield
+            finally:
+                fcntl.lockf(self._lock_fd, fcntl.LOCK_UN, count, index)
+        finally:
+            for lock in reversed(locks):
+                lock.release()
+
+    def _floor(self) -> int:
+        """Oldest arena position whose bytes have not been overwritten."""
+        return _HEAD.unpack_from(self._buf, _HEAD_OFFSET)[0] - self._arena_bytes
+
+    def _reserve(self, h: int, size: int) -> int:
+        """Claim *size* contiguous arena bytes for a record of key hash *h*
+        and return their position, first retiring the records they lap."""
+        arena_bytes = self._arena_bytes
+        with self._locked(_ARENA_LOCK):
+            pos, tail = _HEAD.unpack_from(self._buf, _HEAD_OFFSET)
+            offset = pos % arena_bytes
+            skip = arena_bytes - offset if offset + size > arena_bytes else 0  # records never wrap
+            # Publish the new floor before retiring, so a writer whose record
+            # is lapped before its slot is published sees it (see _store).
+            _HEAD.pack_into(self._buf, _HEAD_OFFSET, pos + skip + size, tail)
+            tail = self._retire(tail, pos + skip + size - arena_bytes)
+            if skip >= _RECORD.size:
+                _RECORD.pack_into(self._buf, self._arena + offset, 0, 0)
+            pos += skip
+            _RECORD.pack_into(self._buf, self._arena + pos % arena_bytes, h, size)
+            _HEAD.pack_into(self._buf, _HEAD_OFFSET, pos + size, tail)
+        return pos
+
+    def _retire(self, tail: int, until: int) -> int:
+        """Tombstone the slots of the records from *tail* up to *until*,
+        which are about to be overwritten; returns the new tail.  The caller
+        holds the arena lock."""
+        arena_bytes = self._arena_bytes
+        while tail < until:
+            offset = tail % arena_bytes
+            if arena_bytes - offset < _RECORD.size:
+                tail += arena_bytes - offset
+                continue
+            h, size = _RECORD.unpack_from(self._buf, self._arena + offset)
+            if not size:
+                tail += arena_bytes - offset
+                continue
+            bucket = h % self._buckets
+            base = self._slots + bucket * self._bucket_size
+            with self._locked(_STRIPE_LOCKS + bucket % self._stripes):
+                fields = self._bucket.unpack_from(self._buf, base)
+                for way in range(self._ways):
+                    _, slot_hash, pos, expires_at, _, _ = fields[way * 6:way * 6 + 6]
+                    if slot_hash == h and pos == tail:
+                        self._publish(base + way * _SLOT.size, _TOMBSTONE, 0, 0.0, 0, 0)
+                        if not expires_at or time.time() <= expires_at:
+                            self.metrics.incr("evictions")
+                        break
+            tail += size
+        return tail
+
+    def _locate(self, key: str) -> tuple[bytes, int, int, int]:
+        """Return ``(key bytes, hash, bucket offset, stripe lock)``."""
+        kb = key.encode()
+        h = _hash(kb)
+        bucket = h % self._buckets
+        return kb, h, self._slots + bucket * self._bucket_size, _STRIPE_LOCKS + bucket % self._stripes
+
+    def _scan(self, kb: bytes, h: int, base: int) -> Any:
+        """Find *kb* in the bucket at *base*.  Returns ``(slot offset, seq,
+        expires_at, value bytes)``, None if absent, or MISSING if a writer
+        got in the way and the caller should retry."""
+        buf = self._buf
+        fields = self._bucket.unpack_from(buf, base)
+        hashes = fields[1::6]
+        if h not in hashes:
+            return None
+        for way, slot_hash in enumerate(hashes):
+            if slot_hash != h:
+                continue
+            seq, _, pos, expires_at, klen, vlen = fields[way * 6:way * 6 + 6]
+            if klen != len(kb):
+                continue
+            if seq & 1:
+                return MISSING
+            start = self._arena + pos % self._arena_bytes + _RECORD.size
+            data = bytes(buf[start:start + klen + vlen])
+            slot = base + way * _SLOT.size
+            if _SEQ.unpack_from(buf, slot)[0] != seq:
+                return MISSING
+            if pos < self._floor() or data[:klen] != kb:
+                continue  # lapped by the arena, or a hash collision
+            return slot, seq, expires_at, data[klen:]
+        return None
+
+    def _find(self, key: str) -> Optional[tuple[int, int, float, bytes]]:
+        kb, h, base, stripe = self._locate(key)
+        for _ in range(_READ_RETRIES):
+            found = self._scan(kb, h, base)
+            if found is not MISSING:
+                return found
+        with self._locked(stripe):  # persistent contention: read under the lock
+            return self._scan(kb, h, base)
+
+    def _publish(self, slot: int, *body: Any) -> None:
+        """Rewrite *slot* with *body* and adjust its stripe's totals; the
+        caller holds the stripe lock."""
+        seq, old_hash, _, old_expiry, old_klen, old_vlen = _SLOT.unpack_from(self._buf, slot)
+        new_hash, _, new_expiry, new_klen, new_vlen = body
+        _SEQ.pack_into(self._buf, slot, seq + 1)
+        _BODY.pack_into(self._buf, slot + _SEQ.size, *body)
+        _SEQ.pack_into(self._buf, slot, seq + 2)
+        was, now = old_hash >= 2, new_hash >= 2
+        if was or now:
+            cell = _COUNTERS_OFFSET + (slot - self._slots) // self._bucket_size % self._stripes * _COUNTER.size
+            entries, nbytes, with_ttl = _COUNTER.unpack_from(self._buf, cell)
+            _COUNTER.pack_into(
+                self._buf, cell,
+                entries + now - was,
+                nbytes + (new_klen + new_vlen) * now - (old_klen + old_vlen) * was,
+                with_ttl + (now and bool(new_expiry)) - (was and bool(old_expiry)),
+            )
+
+    def _drop(self, key: str, seq: Optional[int] = None) -> bool:
+        """Tombstone *key*'s slot (only if still at *seq*, when given);
+        returns True if a live entry was removed."""
+        kb, h, base, stripe = self._locate(key)
+        with self._locked(stripe):
+            found = self._scan(kb, h, base)
+            if found is None or (seq is not None and found[1] != seq):
+                return False
+            slot, _, expires_at, _ = found
+            self._publish(slot, _TOMBSTONE, 0, 0.0, 0, 0)
+            return not expires_at or time.time() <= expires_at
+
+    def _victim(self, kb: bytes, h: int, base: int, now: float) -> tuple[int, bool]:
+        """Slot for writing *kb*: its current slot, else a free one, else the
+        bucket's oldest.  Returns ``(slot offset, evicts a live entry)``."""
+        fields = self._bucket.unpack_from(self._buf, base)
+        floor = self._floor()
+        free = oldest = None
+        oldest_pos = -1
+        for way in range(self._ways):
+            _, slot_hash, pos, expires_at, klen, vlen = fields[way * 6:way * 6 + 6]
+            slot = base + way * _SLOT.size
+            dead = slot_hash < 2 or pos < floor or (expires_at and expires_at < now)
+            if slot_hash == h and klen == len(kb) and pos >= floor:
+                start = self._arena + pos % self._arena_bytes + _RECORD.size
+                if bytes(self._buf[start:start + klen]) == kb:
+                    return slot, False
+            if dead:
+                if free is None:
+                    free = slot
+            elif oldest is None or pos < oldest_pos:
+                oldest, oldest_pos = slot, pos
+        if free is not None:
+            return free, False
+        return oldest, True  # type: ignore[return-value]
+
+    def _store(self, key: str, blob: bytes, expires_at: Optional[float]) -> None:
+        kb, h, base, stripe = self._locate(key)
+        size = _RECORD.size + len(kb) + len(blob)
+        if size > self._arena_bytes // 4:
+            raise CacheError(f"entry of {size} bytes does not fit the {self._arena_bytes}-byte arena")
+        pos = self._reserve(h, size)
+        start = self._arena + pos % self._arena_bytes + _RECORD.size
+        self._buf[start:start + len(kb)] = kb
+        self._buf[start + len(kb):start + len(kb) + len(blob)] = blob
+        with self._locked(stripe):
+            slot, evicted = self._victim(kb, h, base, time.time())
+            self._publish(slot, h, pos, expires_at or 0.0, len(kb), len(blob))
+            if pos < self._floor():  # lapped before it was published
+                self._publish(slot, _TOMBSTONE, 0, 0.0, 0, 0)
+        if evicted:
+            self.metrics.incr("evictions")
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        found = self._find(key)
+        if found is None:
+            return MISSING
+        _, seq, expires_at, blob = found
+        if expires_at and time.time() > expires_at:
+            if self._drop(key, seq):
+                self.metrics.incr("expirations")
+            return MISSING
+        self.metrics.incr("bytes_out", len(blob))
+        return self._codec.decode(blob), expires_at or None
+
+    # ------------------------------------------------------------------
+    # Iteration internals
+    # ------------------------------------------------------------------
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        kp = prefix.encode()
+        entries: list[Entry] = []
+        for bucket in range(self._buckets):
+            base = self._slots + bucket * self._bucket_size
+            fields = self._bucket.unpack_from(self._buf, base)
+            now = time.time()
+            for way in range(self._ways):
+                seq, slot_hash, pos, expires_at, klen, vlen = fields[way * 6:way * 6 + 6]
+                if slot_hash < 2 or seq & 1 or (expires_at and expires_at <= now):
+                    continue
+                start = self._arena + pos % self._arena_bytes + _RECORD.size
+                data = bytes(self._buf[start:start + klen + vlen])
+                if _SEQ.unpack_from(self._buf, base + way * _SLOT.size)[0] != seq or pos < self._floor():
+                    continue  # rewritten or lapped while copying
+                if klen >= len(kp) and data.startswith(kp):
+                    entries.append((data[:klen].decode(), self._codec.decode(data[klen:]), expires_at or None))
+            if len(entries) >= batch:
+                yield entries
+                entries = []
+        if entries:
+            yield entries
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        entry = self._lookup(key)
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        return None if entry is MISSING else entry[0]
+
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        if tuple(tags):
+            raise CacheError("SharedMemoryCache does not support tags")
+        start = time.perf_counter()
+        blob = self._codec.encode(value)
+        self._store(key, blob, time.time() + ttl if ttl is not None else None)
+        self.metrics.incr("sets")
+        self.metrics.incr("bytes_in", len(blob))
+        self.metrics.observe("set", time.perf_counter() - start)
+
+    def delete(self, key: str) -> bool:
+        start = time.perf_counter()
+        existed = self._drop(key)
+        if existed:
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
+        return existed
+
+    def exists(self, key: str) -> bool:
+        found = self._find(key)
+        return found is not None and (not found[2] or time.time() <= found[2])
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        result: dict[str, Any] = {}
+        requested = 0
+        for key in dict.fromkeys(keys):
+            requested += 1
+            entry = self._lookup(key)
+            if entry is not MISSING:
+                result[key] = entry[0]
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", requested - len(result))
+        self.metrics.observe("get_many", time.perf_counter() - start)
+        return result
+
+    def clear(self) -> None:
+        with self._locked(_STRIPE_LOCKS, self._stripes):
+            self._buf[_COUNTERS_OFFSET:self._arena] = bytes(self._arena - _COUNTERS_OFFSET)
+
+    def stats(self) -> CacheStats:
+        entries = nbytes = with_ttl = 0
+        for cell in range(self._stripes):
+            counts = _COUNTER.unpack_from(self._buf, _COUNTERS_OFFSET + cell * _COUNTER.size)
+            entries, nbytes, with_ttl = entries + counts[0], nbytes + counts[1], with_ttl + counts[2]
+        floor = self._floor()
+        return CacheStats(
+            backend="shared_memory",
+            total_keys=entries,
+            ttl_enabled=with_ttl > 0,
+            extra={
+                "name": self._name,
+                "bytes": nbytes,
+                "slots": self._buckets * self._ways,
+                "ways": self._ways,
+                "arena_bytes": self._arena_bytes,
+                "arena_written": floor + self._arena_bytes,
+                "codec": self._codec.name,
+            },
+            **self.metrics.snapshot(),
+        )
+
+    def close(self) -> None:
+        if self._lock_fd < 0:
+            return
+        self._buf = None  # type: ignore[assignment]
+        self._shm.close()
+        _detach_locks(self._locks)
+        self._lock_fd = -1
+
+    def unlink(self) -> None:
+        """Destroy the segment and its lock file.  Processes still attached
+        keep their mapping; new opens of *name* start empty."""
+        # unlink() tells the resource tracker to forget the segment, which
+        # _open already did: register it again so the tracker stays quiet.
+        resource_tracker.register(self._shm._name, "shared_memory")  # type: ignore[attr-defined]
+        try:
+            self._shm.unlink()
+        except FileNotFoundError:
+            pass
+        with _PROCESS_LOCKS_GUARD:
+            # Later opens of *name* lock the new file, not this one.
+            if _PROCESS_LOCKS.get(self._lock_path) is self._locks:
+                del _PROCESS_LOCKS[self._lock_path]
+        try:
+            os.remove(self._lock_path)
+        except FileNotFoundError:
+            pass
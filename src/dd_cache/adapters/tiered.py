@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import Any, Iterable, Iterator, Mapping, Optional
+
+from dd_cache.adapters.memory import ConcurrentInMemoryCache
+from dd_cache.base import MISSING, BaseCacheAdapter, TTLArg, ttl_for
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.snapshot import Entry
+
+_NOT_BUFFERED: Any = object()
+
+
+class TieredCache(BaseCacheAdapter):
+    """Near-cache: a bounded in-process L1 in front of any adapter as L2.
+
+    Reads try L1 first and fall through to *l2*; L2 hits are promoted into
+    L1, so hot keys are served without touching the backend.  L1 defaults
+    to a :class:`ConcurrentInMemoryCache` holding *l1_max_entries* entries;
+    pass *l1* to supply your own.  L1 copies never outlive the L2 entry's
+    TTL, and *l1_ttl* (seconds) additionally bounds how stale they can get
+    when other processes write to the same backend.  ``get_many`` promotes
+    L2 hits only when *l1_ttl* is set, reading their expiry in the same
+    bulk read.
+
+    Writes are write-through by default: L2 first, then L1.  With
+    *write_back* they land in L1 and a buffer that is flushed to L2 every
+    *flush_interval* seconds or once *flush_ops* writes are pending;
+    ``close()`` and :meth:`flush` drain it, and unflushed writes are lost if
+    the process dies.  ``delete`` and ``clear`` always reach both tiers
+    immediately, and so do tagged writes.  Fill locks for ``get_or_set``
+    are L2's.  Tags live in L2; :meth:`invalidate_tags` also empties L1,
+    whose copies carry no tags.
+    """
+
+    def __init__(
+        self,
+        l2: BaseCacheAdapter,
+        *,
+        l1: Optional[BaseCacheAdapter] = None,
+        l1_max_entries: int = 10_000,
+        l1_ttl: Optional[float] = None,
+        write_back: bool = False,
+        flush_interval: float = 0.05,
+        flush_ops: int = 1000,
+    ) -> None:
+        if l1_ttl is not None and l1_ttl <= 0:
+            raise CacheError("l1_ttl must be positive")
+        self._l2 = l2
+        self._l1 = l1 if l1 is not None else ConcurrentInMemoryCache(max_entries=l1_max_entries)
+        self._l1_ttl = l1_ttl
+        self._l1_hits = 0
+        self._l2_hits = 0
+        self._misses = 0
+
+        # Write-back buffer: key -> (value, expires_at).
+        self._write_back = write_back
+        self._flush_ops = flush_ops
+        self._pending: dict[str, tuple[Any, Optional[float]]] = {}
+        self._flushing: dict[str, tuple[Any, Optional[float]]] = {}
+        self._buffer_lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flusher_stop = threading.Event()
+        self._flusher: Optional[threading.Thread] = None
+        if write_back:
+            self._flusher = threading.Thread(
+                target=self._flush_loop, args=(flush_interval,),
+                name="dd-cache-tier-flush", daemon=True,
+            )
+            self._flusher.start()
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    @property
+    def _thread_safe(self) -> bool:  # type: ignore[override]
+        return self._l1._thread_safe and self._l2._thread_safe
+
+    def _promote(self, key: str, value: Any, expires_at: Optional[float]) -> None:
+        """Copy an entry into L1 for at most its remaining TTL and *l1_ttl*.
+        L1 stores ``(value, expires_at)`` so lookups report L2's expiry."""
+        ttl = self._l1_ttl
+        if expires_at is not None:
+            remaining = expires_at - time.time()
+            if remaining <= 0:
+                return
+            ttl = remaining if ttl is None else min(ttl, remaining)
+        self._l1.set(key, (value, expires_at), ttl=ttl)
+
+    def _buffered(self, key: str) -> Any:
+        with self._buffer_lock:
+            if key in self._pending:
+                return self._pending[key]
+            return self._flushing.get(key, _NOT_BUFFERED)
+
+    def _buffer(self, items: Mapping[str, tuple[Any, Optional[float]]]) -> None:
+        with self._buffer_lock:
+            self._pending.update(items)
+            full = len(self._pending) >= self._flush_ops
+        if full:
+            self._flush()
+
+    def _flush(self) -> int:
+        with self._flush_lock:
+            with self._buffer_lock:
+                if not self._pending:
+                    return 0
+                batch = self._flushing = self._pending
+                self._pending = {}
+            now = time.time()
+            items: dict[str, Any] = {}
+            ttls: dict[str, int] = {}
+            expired: list[str] = []
+            for key, (value, expires_at) in batch.items():
+                if expires_at is not None:
+                    if expires_at <= now:
+                        # Expired while buffered: whatever L2 holds for the
+                        # key is older than this write, so it must go too.
+                        expired.append(key)
+                        continue
+                    ttls[key] = max(math.ceil(expires_at - now), 1)
+                items[key] = value
+            try:
+                if items:
+                    self._l2.set_many(items, ttl=ttls)
+                if expired:
+                    self._l2.delete_many(expired)
+            except Exception:
+                with self._buffer_lock:
+                    # Requeue the batch; writes buffered meanwhile are newer.
+                    self._pending = {**batch, **self._pending}
+                    self._flushing = {}
+                raise
+            with self._buffer_lock:
+                self._flushing = {}
+            return len(batch)
+
+    def _flush_loop(self, interval: float) -> None:
+        while not self._flusher_stop.wait(interval):
+            try:
+                self._flush()
+            except Exception:
+                pass  # backend unavailable; the batch is retried next tick
+
+    def _drop_buffered(self, keys: Iterable[str]) -> bool:
+        """Discard buffered writes for *keys*; True if any was still live.
+        Callers hold ``_flush_lock`` so no flush can resurrect them."""
+        now = time.time()
+        live = False
+        with self._buffer_lock:
+            for key in keys:
+                entry = self._pending.pop(key, None)
+                if entry is not None and (entry[1] is None or entry[1] > now):
+                    live = True
+        return live
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        entry = self._l1._lookup(key)
+        if entry is not MISSING:
+            self._l1_hits += 1
+            return entry[0]
+        if self._write_back:
+            buffered = self._buffered(key)
+            if buffered is not _NOT_BUFFERED:
+                if buffered[1] is None or buffered[1] > time.time():
+                    self._l1_hits += 1
+                    return buffered
+                self._misses += 1
+                return MISSING  # the buffered write supersedes whatever L2 holds
+        entry = self._l2._lookup(key, with_expiry=True)
+        if entry is MISSING:
+            self._misses += 1
+            return MISSING
+        self._l2_hits += 1
+        self._promote(key, *entry)
+        return entry
+
+    def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        return self._l2._acquire_fill_lock(key, timeout)
+
+    def _release_fill_lock(self, key: str) -> None:
+        self._flush()  # publish a buffered fill before other processes stop waiting
+        self._l2._release_fill_lock(key)
+
+    # ------------------------------------------------------------------
+    # Namespace internals
+    # ------------------------------------------------------------------
+
+    def _ns_generation(self, name: str, *, bump: bool = False) -> int:
+        return self._l2._ns_generation(name, bump=bump)
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        self._flush()
+        for _ in self._l1._delete_prefix(prefix, batch):
+            pass  # L1 is bounded and holds copies; count what L2 removes
+        yield from self._l2._delete_prefix(prefix, batch)
+
+    # ------------------------------------------------------------------
+    # Iteration internals
+    # ------------------------------------------------------------------
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list[Entry]]:
+        self._flush()  # L2 holds every entry once the buffer is drained
+        yield from self._l2._scan_entries(prefix, batch)
+
+    def _scan_keys(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        self._flush()
+        yield from self._l2._scan_keys(prefix, batch)
+
+    # ------------------------------------------------------------------
+    # BaseCacheAdapter interface
+    # ------------------------------------------------------------------
+
+    def get(self, key: str) -> Any:
+        start = time.perf_counter()
+        entry = self._lookup(key)
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        return None if entry is MISSING else entry[0]
+
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
+        expires_at = time.time() + ttl if ttl is not None else None
+        if self._write_back and not tags:
+            self._buffer({key: (value, expires_at)})
+        elif self._write_back:
+            with self._flush_lock:
+                self._drop_buffered([key])  # an older buffered write must not land on top
+                self._l2.set(key, value, ttl=ttl, tags=tags)
+        else:
+            self._l2.set(key, value, ttl=ttl, tags=tags)
+        self._promote(key, value, expires_at)
+        self.metrics.incr("sets")
+        self.metrics.observe("set", time.perf_counter() - start)
+
+    def delete(self, key: str) -> bool:
+        start = time.perf_counter()
+        with self._flush_lock:
+            buffered = self._drop_buffered([key])
+            self._l1.delete(key)
+            existed = self._l2.delete(key) or buffered
+        if existed:
+            self.metrics.incr("deletes")
+        self.metrics.observe("delete", time.perf_counter() - start)
+        return existed
+
+    def exists(self, key: str) -> bool:
+        if self._l1.exists(key):
+            return True
+        if self._write_back:
+            buffered = self._buffered(key)
+            if buffered is not _NOT_BUFFERED:
+                return buffered[1] is None or buffered[1] > time.time()
+        return self._l2.exists(key)
+
+    def clear(self) -> None:
+        with self._flush_lock:
+            with self._buffer_lock:
+                self._pending = {}
+            self._l1.clear()
+            self._l2.clear()
+
+    def flush(self) -> int:
+        """Write buffered writes through to L2 now; returns how many were
+        flushed.  A no-op unless *write_back* is enabled."""
+        return self._flush()
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        start = time.perf_counter()
+        keys = list(dict.fromkeys(keys))
+        result = {key: entry[0] for key, entry in self._l1.get_many(keys).items()}
+        self._l1_hits += len(result)
+        remaining = [key for key in keys if key not in result]
+        if self._write_back and remaining:
+            now = time.time()
+            unbuffered = []
+            for key in remaining:
+                buffered = self._buffered(key)
+                if buffered is _NOT_BUFFERED:
+                    unbuffered.append(key)
+                elif buffered[1] is None or buffered[1] > now:
+                    result[key] = buffered[0]
+                    self._l1_hits += 1
+                else:
+                    self._misses += 1
+            remaining = unbuffered
+        if remaining:
+            if self._l1_ttl is not None:
+                entries = self._l2._lookup_many(remaining)
+                for key, (value, expires_at) in entries.items():
+                    self._promote(key, value, expires_at)
+                found = {key: entry[0] for key, entry in entries.items()}
+            else:
+                found = self._l2.get_many(remaining)
+            self._l2_hits += len(found)
+            self._misses += len(remaining) - len(found)
+            result.update(found)
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", len(keys) - len(result))
+        self.metrics.observe("get_many", time.perf_counter() - start)
+        return result
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        start = time.perf_counter()
+        tags = tuple(tags)
+        now = time.time()
+        entries: dict[str, tuple[Any, Optional[float]]] = {}
+        for key, value in items.items():
+            key_ttl = ttl_for(ttl, key)
+            entries[key] = (value, now + key_ttl if key_ttl is not None else None)
+        if self._write_back and not tags:
+            self._buffer(entries)
+        elif self._write_back:
+            with self._flush_lock:
+                self._drop_buffered(entries)
+                self._l2.set_many(items, ttl=ttl, tags=tags)
+        else:
+            self._l2.set_many(items, ttl=ttl, tags=tags)
+        for key, (value, expires_at) in entries.items():
+            self._promote(key, value, expires_at)
+        self.metrics.incr("sets", len(entries))
+        self.metrics.observe("set_many", time.perf_counter() - start)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        start = time.perf_counter()
+        keys = list(keys)
+        self._flush()
+        with self._flush_lock:
+            self._drop_buffered(keys)  # writes buffered since the flush above
+            self._l1.delete_many(keys)
+            deleted = self._l2.delete_many(keys)
+        self.metrics.incr("deletes", deleted)
+        self.metrics.observe("delete_many", time.perf_counter() - start)
+        return deleted
+
+    def invalidate_tags(self, *tags: str) -> int:
+        with self._flush_lock:
+            removed = self._l2.invalidate_tags(*tags)
+            self._l1.clear()
+        return removed
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        self._l1.purge_expired(limit)
+        return self._l2.purge_expired(limit)
+
+    def stats(self) -> CacheStats:
+        self._flush()
+        l2 = self._l2.stats()
+        l1_hits, l2_hits, misses = self._l1_hits, self._l2_hits, self._misses
+        lookups = l1_hits + l2_hits + misses
+        return CacheStats(
+            backend="tiered",
+            total_keys=l2.total_keys,
+            ttl_enabled=l2.ttl_enabled,
+            extra={
+                "l1_keys": self._l1.stats().total_keys,
+                "l1_hits": l1_hits,
+                "l2_hits": l2_hits,
+                "misses": misses,
+                "l1_hit_ratio": l1_hits / lookups if lookups else 0.0,
+                "l2_hit_ratio": l2_hits / (l2_hits + misses) if l2_hits + misses else 0.0,
+                "hit_ratio": (l1_hits + l2_hits) / lookups if lookups else 0.0,
+                "write_back": self._write_back,
+                "l2_backend": l2.backend,
+                "l2": l2.extra,
+            },
+            # Lookups are counted here; serialised traffic only happens in L2.
+            **{**self.metrics.snapshot(), "bytes_in": l2.bytes_in, "bytes_out": l2.bytes_out},
+        )
+
+    def close(self) -> None:
+        if self._flusher is not None:
+            self._flusher_stop.set()
+            self._flusher.join()
+            self._flusher = None
+        self._flush()
+        self._l1.close()
+        self._l2.close()
@@ -0,0 +1,235 @@
+from __future__ import annotations
+
+import asyncio
+import inspect
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Iterable, Mapping, Optional, Union
+
+from dd_cache.base import MISSING, TTLArg, ttl_for
+from dd_cache.metrics import Metrics
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.stampede import AsyncRefreshPool, AsyncSingleFlight, poll_delays, should_refresh_early
+
+
+class AsyncBaseCacheAdapter(ABC):
+    """Asyncio counterpart of :class:`~dd_cache.base.BaseCacheAdapter`.
+
+    Same contract, with every operation a coroutine so backend I/O never
+    blocks the event loop.
+    """
+
+    refresh_workers = 4
+    """Concurrent stale refreshes for ``get_or_set(stale_ttl=...)``."""
+
+    refresh_backlog = 256
+    """Stale refreshes that may wait for a slot."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Any:
+        """Return the cached value or None on a cache miss."""
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        """Store *value* under *key*.  *ttl* is seconds; None means no expiry.
+        *tags* replace any the key had, for :meth:`invalidate_tags`."""
+
+    @abstractmethod
+    async def delete(self, key: str) -> bool:
+        """Remove *key*.  Returns True if the key existed, False otherwise."""
+
+    @abstractmethod
+    async def exists(self, key: str) -> bool:
+        """Return True if *key* is present (and not expired)."""
+
+    @abstractmethod
+    async def clear(self) -> None:
+        """Remove all entries from the cache."""
+
+    @abstractmethod
+    async def stats(self) -> CacheStats:
+        """Return a snapshot of cache statistics."""
+
+    @abstractmethod
+    async def close(self) -> None:
+        """Flush buffers and release resources (disconnect, close file handles)."""
+
+    # ------------------------------------------------------------------
+    # Concrete helpers
+    # ------------------------------------------------------------------
+
+    async def get_or_set(
+        self,
+        key: str,
+        fn: Callable[[], Union[Any, Awaitable[Any]]],
+        *,
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+        early_refresh: float = 0.0,
+        lock_timeout: float = 30.0,
+        stale_ttl: Optional[int] = None,
+    ) -> Any:
+        """Return the cached value for *key*; if missing, call *fn()* (awaiting
+        it when it returns an awaitable), store the result, and return it.
+
+        Same stampede protection as
+        :meth:`BaseCacheAdapter.get_or_set <dd_cache.base.BaseCacheAdapter.get_or_set>`:
+        one lookup per hit, concurrent misses collapsed onto one task (and one
+        process, where the backend supports a fill lock), and optional XFetch
+        early refresh controlled by *early_refresh*.  Computed values are
+        stored with *tags*.  *stale_ttl* serves stale values while a
+        background task refreshes them, as in the sync version.
+        """
+        tags = tuple(tags)
+        if stale_ttl:
+            if ttl is None:
+                raise CacheError("stale_ttl needs a ttl")
+            ttl += stale_ttl
+        start = time.perf_counter()
+        entry = await self._lookup(key, with_expiry=early_refresh > 0 or bool(stale_ttl))
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        if entry is not MISSING:
+            value, expires_at = entry
+            if expires_at is None:
+                return value
+            if stale_ttl:
+                expires_at -= stale_ttl  # the soft deadline
+                if time.time() >= expires_at:
+                    self.metrics.incr("stale_hits")
+                    self._refresh_pool().submit(key, lambda: self._refresh(key, fn, ttl, tags, lock_timeout))
+                    return value
+            if early_refresh <= 0:
+                return value
+            flight = self._single_flight()
+            delta = flight.durations.get(key)
+            if delta is None or not should_refresh_early(expires_at, delta, early_refresh):
+                return value
+            if flight.in_flight(key) or not await self._acquire_fill_lock(key, lock_timeout):
+                return value  # someone else is already refreshing it
+            try:
+                return await flight.do(key, lambda: self._compute(key, fn, ttl, tags))
+            finally:
+                await self._release_fill_lock(key)
+        return await self._single_flight().do(
+            key, lambda: self._fill(key, fn, ttl, tags, lock_timeout)
+        )
+
+    async def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Return ``{key: value}`` for every key in *keys* that is present;
+        the fallback awaits one :meth:`_lookup` per key."""
+        result: dict[str, Any] = {}
+        requested = 0
+        for key in dict.fromkeys(keys):
+            requested += 1
+            entry = await self._lookup(key)
+            if entry is not MISSING:
+                result[key] = entry[0]
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", requested - len(result))
+        return result
+
+    async def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        """Store every ``key -> value`` pair; *ttl* is shared or per-key and
+        *tags* apply to every key."""
+        tags = tuple(tags)
+        for key, value in items.items():
+            await self.set(key, value, ttl=ttl_for(ttl, key), tags=tags)
+
+    async def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove every key in *keys*; returns how many existed."""
+        deleted = 0
+        for key in keys:
+            deleted += await self.delete(key)
+        return deleted
+
+    async def invalidate_tags(self, *tags: str) -> int:
+        """Remove every entry stored with any of *tags*; returns how many."""
+        raise CacheError(f"{type(self).__name__} does not support tags")
+
+    @property
+    def metrics(self) -> Metrics:
+        """Live counters and latency histograms; register sinks here."""
+        metrics = self.__dict__.get("_metrics")
+        if metrics is None:
+            metrics = self.__dict__["_metrics"] = Metrics()
+        return metrics
+
+    # ------------------------------------------------------------------
+    # Stampede protection internals
+    # ------------------------------------------------------------------
+
+    async def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        """Return ``(value, expires_at)`` for *key*, or :data:`~dd_cache.base.MISSING`."""
+        if not await self.exists(key):
+            return MISSING
+        return await self.get(key), None
+
+    async def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        """Try to take the cross-process fill lock for *key*."""
+        return True
+
+    async def _release_fill_lock(self, key: str) -> None:
+        """Release a lock taken by :meth:`_acquire_fill_lock`."""
+
+    def _single_flight(self) -> AsyncSingleFlight:
+        # Only ever touched from the event loop thread, so no init lock.
+        flight = self.__dict__.get("_flight")
+        if flight is None:
+            flight = self.__dict__["_flight"] = AsyncSingleFlight()
+        return flight
+
+    def _refresh_pool(self) -> AsyncRefreshPool:
+        pool = self.__dict__.get("_refreshes")
+        if pool is None:
+            pool = self.__dict__["_refreshes"] = AsyncRefreshPool(self.refresh_workers, self.refresh_backlog)
+        return pool
+
+    async def _refresh(
+        self, key: str, fn: Callable[[], Any], ttl: Optional[int], tags: tuple[str, ...], lock_timeout: float
+    ) -> None:
+        flight = self._single_flight()
+        if flight.in_flight(key) or not await self._acquire_fill_lock(key, lock_timeout):
+            return
+        try:
+            await flight.do(key, lambda: self._compute(key, fn, ttl, tags))
+        except Exception:
+            self.metrics.incr("refresh_failures")
+        finally:
+            await self._release_fill_lock(key)
+
+    async def _compute(self, key: str, fn: Callable[[], Any], ttl: Optional[int], tags: tuple[str, ...]) -> Any:
+        start = time.perf_counter()
+        value = fn()
+        if inspect.isawaitable(value):
+            value = await value
+        self._single_flight().durations.record(key, time.perf_counter() - start)
+        await self.set(key, value, ttl=ttl, tags=tags)
+        return value
+
+    async def _fill(
+        self, key: str, fn: Callable[[], Any], ttl: Optional[int], tags: tuple[str, ...], lock_timeout: float
+    ) -> Any:
+        if await self._acquire_fill_lock(key, lock_timeout):
+            try:
+                entry = await self._lookup(key)  # filled while we were taking the lock?
+                if entry is not MISSING:
+                    return entry[0]
+                return await self._compute(key, fn, ttl, tags)
+            finally:
+                await self._release_fill_lock(key)
+        for delay in poll_delays(lock_timeout):
+            await asyncio.sleep(delay)
+            entry = await self._lookup(key)
+            if entry is not MISSING:
+                return entry[0]
+        return await self._compute(key, fn, ttl, tags)  # lock holder died or is too slow
+
+    # ------------------------------------------------------------------
+    # Async context manager
+    # ------------------------------------------------------------------
+
+    async def __aenter__(self) -> "AsyncBaseCacheAdapter":
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.close()
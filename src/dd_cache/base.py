@@ -1,20 +1,59 @@
 from __future__ import annotations
 
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Callable, Optional
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Iterator, Mapping, Optional, Union
 
-from dd_cache.models import CacheStats
+from dd_cache.metrics import Metrics
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.stampede import RefreshPool, SingleFlight, poll_delays, should_refresh_early
+
+if TYPE_CHECKING:
+    from dd_cache.adapters.namespaced import NamespacedCache
+    from dd_cache.codecs import Codec
+    from dd_cache.snapshot import Entry, Target
+
+MISSING: Any = object()
+"""Sentinel returned by ``_lookup`` on a miss (None is a valid cached value)."""
+
+_LAZY_INIT_LOCK = threading.Lock()
+
+# Most expired entries one stats() call reclaims, so it stays cheap however
+# many are due; the rest are left to the sweeper and lazy expiry.
+_STATS_PURGE_LIMIT = 1000
+
+TTLArg = Union[Optional[int], Mapping[str, Optional[int]]]
+
+
+def ttl_for(ttl: TTLArg, key: str) -> Optional[int]:
+    """Resolve a shared or per-key *ttl* argument for *key*."""
+    if isinstance(ttl, Mapping):
+        return ttl.get(key)
+    return ttl
 
 
 class BaseCacheAdapter(ABC):
 
+    _thread_safe = True
+    """False for adapters that must stay on one thread: namespaces then
+    reclaim cleared generations inline rather than on a background thread."""
+
+    refresh_workers = 4
+    """Threads refreshing stale entries for ``get_or_set(stale_ttl=...)``."""
+
+    refresh_backlog = 256
+    """Stale refreshes that may wait for a thread; further ones are skipped
+    until a later hit."""
+
     @abstractmethod
     def get(self, key: str) -> Any:
         """Return the cached value or None on a cache miss."""
 
     @abstractmethod
-    def set(self, key: str, value: Any, *, ttl: Optional[int] = None) -> None:
-        """Store *value* under *key*.  *ttl* is seconds; None means no expiry."""
+    def set(self, key: str, value: Any, *, ttl: Optional[int] = None, tags: Iterable[str] = ()) -> None:
+        """Store *value* under *key*.  *ttl* is seconds; None means no expiry.
+        *tags* replace any the key had, for :meth:`invalidate_tags`."""
 
     @abstractmethod
     def delete(self, key: str) -> bool:
@@ -40,16 +79,319 @@ class BaseCacheAdapter(ABC):
     # Concrete helpers
     # ------------------------------------------------------------------
 
-    def get_or_set(self, key: str, fn: Callable[[], Any], *, ttl: Optional[int] = None) -> Any:
+    def get_or_set(
+        self,
+        key: str,
+        fn: Callable[[], Any],
+        *,
+        ttl: Optional[int] = None,
+        tags: Iterable[str] = (),
+        early_refresh: float = 0.0,
+        lock_timeout: float = 30.0,
+        stale_ttl: Optional[int] = None,
+    ) -> Any:
         """Return the cached value for *key*; if missing, call *fn()*, store the
-        result, and return it.  Handles None values correctly by using exists()
-        before get()."""
-        if self.exists(key):
-            return self.get(key)
+        result, and return it.  A hit costs a single lookup, and None values
+        are handled correctly.
+
+        Concurrent misses on the same key are collapsed: within the process
+        only one thread calls *fn* while the rest wait for its result, and
+        adapters with a shared backend also take a cross-process fill lock
+        (held for at most *lock_timeout* seconds) so other processes wait for
+        the value instead of recomputing it.
+
+        With *early_refresh* > 0 (the XFetch beta; 1.0 is a good default) a
+        hit on a TTL'd key may recompute ahead of expiry, with a probability
+        that rises as expiry nears and with the key's observed compute time,
+        so hot keys are refreshed by one caller instead of all at once.
+        Computed values are stored with *tags*.
+
+        With *stale_ttl* (stale-while-revalidate) values are stored for
+        ``ttl + stale_ttl`` seconds but are fresh only for *ttl*.  A hit in
+        the stale window returns the old value at once and queues one
+        background refresh of the key on a pool of :attr:`refresh_workers`
+        threads, so callers never wait on *fn* at the expiry boundary.
+        Stale hits and failed refreshes are counted in ``stats()``; a
+        failed refresh leaves the stale value in place until the hard TTL.
+        Plain ``get()`` returns the value until the hard TTL as well.
+        Adapters confined to one thread (a plain ``InMemoryCache``) refresh
+        inline on the stale hit instead.
+        """
+        tags = tuple(tags)
+        if stale_ttl:
+            if ttl is None:
+                raise CacheError("stale_ttl needs a ttl")
+            ttl += stale_ttl
+        start = time.perf_counter()
+        entry = self._lookup(key, with_expiry=early_refresh > 0 or bool(stale_ttl))
+        self.metrics.lookup(entry is not MISSING, time.perf_counter() - start)
+        if entry is not MISSING:
+            value, expires_at = entry
+            if expires_at is None:
+                return value
+            if stale_ttl:
+                expires_at -= stale_ttl  # the soft deadline
+                if time.time() >= expires_at:
+                    self.metrics.incr("stale_hits")
+                    if not self._thread_safe:  # confined to this thread: refresh inline
+                        fresh = self._refresh(key, fn, ttl, tags, lock_timeout)
+                        return value if fresh is MISSING else fresh
+                    self._refresh_pool().submit(key, lambda: self._refresh(key, fn, ttl, tags, lock_timeout))
+                    return value
+            if early_refresh <= 0:
+                return value
+            flight = self._single_flight()
+            delta = flight.durations.get(key)
+            if delta is None or not should_refresh_early(expires_at, delta, early_refresh):
+                return value
+            if flight.in_flight(key) or not self._acquire_fill_lock(key, lock_timeout):
+                return value  # someone else is already refreshing it
+            try:
+                return flight.do(key, lambda: self._compute(key, fn, ttl, tags))
+            finally:
+                self._release_fill_lock(key)
+        return self._single_flight().do(
+            key, lambda: self._fill(key, fn, ttl, tags, lock_timeout)
+        )
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, Any]:
+        """Return ``{key: value}`` for every key in *keys* that is present.
+        Misses are omitted.  Adapters override this with a native bulk read;
+        the fallback issues one :meth:`_lookup` per key."""
+        result: dict[str, Any] = {}
+        requested = 0
+        for key in dict.fromkeys(keys):
+            requested += 1
+            entry = self._lookup(key)
+            if entry is not MISSING:
+                result[key] = entry[0]
+        self.metrics.incr("hits", len(result))
+        self.metrics.incr("misses", requested - len(result))
+        return result
+
+    def set_many(self, items: Mapping[str, Any], *, ttl: TTLArg = None, tags: Iterable[str] = ()) -> None:
+        """Store every ``key -> value`` pair in *items*.  *ttl* is either one
+        TTL shared by all keys or a mapping of per-key TTLs (keys absent from
+        the mapping never expire); *tags* apply to every key."""
+        tags = tuple(tags)
+        for key, value in items.items():
+            self.set(key, value, ttl=ttl_for(ttl, key), tags=tags)
+
+    def delete_many(self, keys: Iterable[str]) -> int:
+        """Remove every key in *keys*; returns how many existed."""
+        return sum(1 for key in keys if self.delete(key))
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """Remove every entry stored with any of *tags* and return how many
+        were removed.  Cost scales with the number of tagged entries, not
+        with the size of the cache."""
+        raise CacheError(f"{type(self).__name__} does not support tags")
+
+    def purge_expired(self, limit: Optional[int] = None) -> int:
+        """Actively remove up to *limit* expired entries and return how many
+        were removed.  Adapters whose backend expires keys itself (or that
+        only expire lazily) return 0."""
+        return 0
+
+    def namespace(self, name: str, **kwargs: Any) -> "NamespacedCache":
+        """Return a view of this cache whose keys live in namespace *name*.
+
+        Clearing the view is O(1): it bumps the namespace's generation and
+        reclaims the old entries in the background.  See
+        :class:`~dd_cache.adapters.namespaced.NamespacedCache` for options.
+        """
+        from dd_cache.adapters.namespaced import NamespacedCache
+
+        return NamespacedCache(self, name, **kwargs)
+
+    def dump(
+        self, target: "Target", *, prefix: str = "", batch: int = 1000,
+        codec: Optional["Codec"] = None, compress: bool = True,
+    ) -> int:
+        """Stream every live entry (optionally only keys starting with
+        *prefix*) to *target*, a path or binary file, in the chunked format
+        of :mod:`dd_cache.snapshot`, and return how many were written.
+        Entries are read *batch* at a time, so memory use does not grow with
+        the cache.  Expiry times are kept."""
+        from dd_cache.codecs import DEFAULT_CODEC
+        from dd_cache.snapshot import write_snapshot
+
+        return write_snapshot(
+            self._scan_entries(prefix, batch), target, codec=codec or DEFAULT_CODEC, compress=compress,
+        )
+
+    def iter_keys(self, prefix: str = "", *, batch: int = 1000) -> Iterator[str]:
+        """Yield every live key starting with *prefix*, reading the backend
+        *batch* keys at a time (a primary-key range in SQLite, ``SCAN MATCH``
+        in Redis), so memory use does not grow with the cache and other
+        clients are never blocked for long.  Keys written or deleted during
+        the iteration may or may not be seen."""
+        for keys in self._scan_keys(prefix, batch):
+            yield from keys
+
+    def iter_items(self, prefix: str = "", *, batch: int = 1000) -> Iterator[tuple[str, Any]]:
+        """Like :meth:`iter_keys`, but yield ``(key, value)`` pairs."""
+        for entries in self._scan_entries(prefix, batch):
+            for key, value, _ in entries:
+                yield key, value
+
+    def delete_prefix(self, prefix: str, *, batch: int = 1000) -> int:
+        """Remove every key starting with *prefix*, *batch* keys per step
+        (one short transaction or ``UNLINK`` each), and return how many
+        were removed."""
+        return sum(self._delete_prefix(prefix, batch))
+
+    def load(self, source: "Target") -> int:
+        """Restore a snapshot written by :meth:`dump`, one ``set_many`` per
+        chunk, and return how many entries were stored.  Entries keep their
+        remaining TTL; those that expired since the dump are skipped."""
+        from dd_cache.snapshot import read_snapshot, restore
+
+        return restore(self, read_snapshot(source))
+
+    @property
+    def metrics(self) -> Metrics:
+        """Live counters and latency histograms; register sinks here."""
+        metrics = self.__dict__.get("_metrics")
+        if metrics is None:
+            with _LAZY_INIT_LOCK:
+                metrics = self.__dict__.setdefault("_metrics", Metrics())
+        return metrics
+
+    # ------------------------------------------------------------------
+    # Stampede protection internals
+    # ------------------------------------------------------------------
+
+    def _lookup(self, key: str, *, with_expiry: bool = False) -> Any:
+        """Return ``(value, expires_at)`` for *key*, or :data:`MISSING`.
+
+        *expires_at* is a unix timestamp or None; adapters may skip fetching
+        it unless *with_expiry* is set.  The fallback costs two lookups;
+        adapters override it with a single native read.
+        """
+        if not self.exists(key):
+            return MISSING
+        return self.get(key), None
+
+    def _lookup_many(self, keys: list[str]) -> dict[str, tuple[Any, Optional[float]]]:
+        """Return ``{key: (value, expires_at)}`` for the present keys among
+        the distinct *keys*, as :meth:`_lookup` with *with_expiry* would.
+        The fallback looks keys up one at a time; adapters override it with
+        a bulk read."""
+        found = {}
+        for key in keys:
+            entry = self._lookup(key, with_expiry=True)
+            if entry is not MISSING:
+                found[key] = entry
+        return found
+
+    def _acquire_fill_lock(self, key: str, timeout: float) -> bool:
+        """Try to take the cross-process lock for filling *key*, expiring on
+        its own after *timeout* seconds.  Process-local adapters need no such
+        lock and always succeed."""
+        return True
+
+    def _release_fill_lock(self, key: str) -> None:
+        """Release a lock taken by :meth:`_acquire_fill_lock`."""
+
+    def _single_flight(self) -> SingleFlight:
+        flight = self.__dict__.get("_flight")
+        if flight is None:
+            with _LAZY_INIT_LOCK:
+                flight = self.__dict__.setdefault("_flight", SingleFlight())
+        return flight
+
+    def _refresh_pool(self) -> RefreshPool:
+        pool = self.__dict__.get("_refreshes")
+        if pool is None:
+            with _LAZY_INIT_LOCK:
+                pool = self.__dict__.setdefault(
+                    "_refreshes", RefreshPool(self.refresh_workers, self.refresh_backlog)
+                )
+        return pool
+
+    def _refresh(
+        self, key: str, fn: Callable[[], Any], ttl: Optional[int], tags: tuple[str, ...], lock_timeout: float
+    ) -> Any:
+        """Recompute a stale *key* and return the new value, or MISSING if
+        the loader failed or this or another process is already doing so."""
+        flight = self._single_flight()
+        if flight.in_flight(key) or not self._acquire_fill_lock(key, lock_timeout):
+            return MISSING
+        try:
+            return flight.do(key, lambda: self._compute(key, fn, ttl, tags))
+        except Exception:
+            self.metrics.incr("refresh_failures")
+            return MISSING
+        finally:
+            self._release_fill_lock(key)
+
+    def _compute(self, key: str, fn: Callable[[], Any], ttl: Optional[int], tags: tuple[str, ...]) -> Any:
+        start = time.perf_counter()
         value = fn()
-        self.set(key, value, ttl=ttl)
+        self._single_flight().durations.record(key, time.perf_counter() - start)
+        self.set(key, value, ttl=ttl, tags=tags)
         return value
 
+    def _fill(
+        self, key: str, fn: Callable[[], Any], ttl: Optional[int], tags: tuple[str, ...], lock_timeout: float
+    ) -> Any:
+        if self._acquire_fill_lock(key, lock_timeout):
+            try:
+                entry = self._lookup(key)  # filled while we were taking the lock?
+                if entry is not MISSING:
+                    return entry[0]
+                return self._compute(key, fn, ttl, tags)
+            finally:
+                self._release_fill_lock(key)
+        # Another process is computing the value: wait for it to land.
+        for delay in poll_delays(lock_timeout):
+            time.sleep(delay)
+            entry = self._lookup(key)
+            if entry is not MISSING:
+                return entry[0]
+        return self._compute(key, fn, ttl, tags)  # lock holder died or is too slow
+
+    # ------------------------------------------------------------------
+    # Namespace internals
+    # ------------------------------------------------------------------
+
+    def _ns_generation(self, name: str, *, bump: bool = False) -> int:
+        """Return the generation of namespace *name*, first advancing it if
+        *bump* is set.  The fallback counts in process; adapters with a
+        shared backend store generations there so every process agrees."""
+        with _LAZY_INIT_LOCK:
+            generations = self.__dict__.setdefault("_generations", {})
+            if bump:
+                generations[name] = generations.get(name, 0) + 1
+            return generations.get(name, 0)
+
+    def _delete_prefix(self, prefix: str, batch: int) -> Iterator[int]:
+        """Delete every key starting with *prefix*, at most *batch* per step,
+        yielding how many each step removed so callers can pause in between.
+        The fallback deletes what :meth:`_scan_keys` lists, one
+        ``delete_many`` per batch."""
+        for keys in self._scan_keys(prefix, batch):
+            yield self.delete_many(keys)
+
+    # ------------------------------------------------------------------
+    # Iteration internals
+    # ------------------------------------------------------------------
+
+    def _scan_entries(self, prefix: str, batch: int) -> Iterator[list["Entry"]]:
+        """Yield lists of up to about *batch* live ``(key, value,
+        expires_at)`` entries whose key starts with *prefix*, reading the
+        backend incrementally.  Entries written or deleted during the scan
+        may or may not be seen."""
+        raise CacheError(f"{type(self).__name__} cannot enumerate its entries")
+        yield  # pragma: no cover
+
+    def _scan_keys(self, prefix: str, batch: int) -> Iterator[list[str]]:
+        """Like :meth:`_scan_entries`, but yield only the keys.  Adapters
+        override it to skip reading values; the fallback drops them."""
+        for entries in self._scan_entries(prefix, batch):
+            yield [key for key, _, _ in entries]
+
     # ------------------------------------------------------------------
     # Context manager
     # ------------------------------------------------------------------
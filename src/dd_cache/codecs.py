@@ -0,0 +1,175 @@
+"""Value codecs: serializer + optional compression + a 2-byte header.
+
+Every blob written by a non-default codec starts with ``0xDD`` followed by
+one format byte (serializer id in the high nibble, compression id in the
+low nibble), so a cache holding blobs from several codecs — or from older
+dd-cache versions, which wrote bare pickles — can always be decoded.  The
+default codec (plain pickle, no compression) still writes bare pickles,
+keeping files readable by older releases.
+"""
+from __future__ import annotations
+
+import bz2
+import json
+import lzma
+import marshal
+import pickle
+import struct
+import zlib
+from typing import Any, Callable, Optional
+
+from dd_cache.models import CacheError
+
+_MAGIC = 0xDD
+
+# Serializer ids (high nibble of the format byte).
+_PICKLE = 1
+_PICKLE5 = 2
+_MARSHAL = 3
+_JSON = 4
+
+_SERIALIZERS = {"pickle": _PICKLE, "pickle5": _PICKLE5, "marshal": _MARSHAL, "json": _JSON}
+
+# Compression ids (low nibble); each entry is (compress(data, level), decompress).
+_NONE = 0
+_COMPRESSORS: dict[int, tuple[Callable[[bytes, Optional[int]], bytes], Callable[[bytes], bytes]]] = {
+    1: (lambda d, lvl: zlib.compress(d, 6 if lvl is None else lvl), zlib.decompress),
+    2: (lambda d, lvl: lzma.compress(d, preset=6 if lvl is None else lvl), lzma.decompress),
+    3: (lambda d, lvl: bz2.compress(d, 9 if lvl is None else lvl), bz2.decompress),
+}
+_COMPRESSION = {None: _NONE, "none": _NONE, "zlib": 1, "lzma": 2, "bz2": 3}
+
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+
+def _dumps_pickle5(value: Any) -> bytes:
+    """Protocol-5 pickle with large buffers (e.g. NumPy arrays) kept out of
+    band: ``[n][len_1..len_n][pickle][buf_1..buf_n]``.  Buffers are copied
+    exactly once, into the final blob."""
+    buffers: list[pickle.PickleBuffer] = []
+    body = pickle.dumps(value, protocol=5, buffer_callback=buffers.append)
+    raws = [buf.raw() for buf in buffers]
+    parts: list[Any] = [_U32.pack(len(raws))]
+    parts.extend(_U64.pack(raw.nbytes) for raw in raws)
+    parts.append(_U64.pack(len(body)))
+    parts.append(body)
+    parts.extend(raws)
+    return b"".join(parts)
+
+
+def _loads_pickle5(data: memoryview) -> Any:
+    """Inverse of :func:`_dumps_pickle5`.  Buffers are handed to pickle as
+    read-only slices of *data*, so arrays are rebuilt without copying."""
+    (count,) = _U32.unpack_from(data, 0)
+    offset = 4
+    sizes = []
+    for _ in range(count):
+        sizes.append(_U64.unpack_from(data, offset)[0])
+        offset += 8
+    (body_len,) = _U64.unpack_from(data, offset)
+    offset += 8
+    body = data[offset:offset + body_len]
+    offset += body_len
+    buffers = []
+    for size in sizes:
+        buffers.append(data[offset:offset + size])
+        offset += size
+    return pickle.loads(body, buffers=buffers)
+
+
+class Codec:
+    """Serializer plus optional compression for adapters that store bytes.
+
+    *serializer*: ``"pickle"`` (default, any object), ``"pickle5"``
+    (protocol 5 with out-of-band buffers; decoded arrays are read-only
+    views over the stored blob), ``"marshal"`` or ``"json"`` (plain data
+    only, but fast and, for JSON, language-neutral).
+
+    *compression*: ``None``, ``"zlib"``, ``"lzma"`` or ``"bz2"``; applied only
+    to payloads of at least *threshold* bytes, and only kept when it
+    actually shrinks them.  *level* overrides the compressor's default.
+    """
+
+    def __init__(
+        self,
+        serializer: str = "pickle",
+        compression: Optional[str] = None,
+        *,
+        threshold: int = 1024,
+        level: Optional[int] = None,
+    ) -> None:
+        try:
+            self._serializer = _SERIALIZERS[serializer]
+        except KeyError:
+            raise CacheError(
+                f"Unknown serializer {serializer!r}; expected one of {sorted(_SERIALIZERS)}"
+            ) from None
+        try:
+            self._compression = _COMPRESSION[compression]
+        except KeyError:
+            raise CacheError(
+                f"Unknown compression {compression!r}; expected zlib, lzma, bz2 or None"
+            ) from None
+        self.name = serializer if compression in (None, "none") else f"{serializer}+{compression}"
+        self._threshold = threshold
+        self._level = level
+        self._bare = self._serializer == _PICKLE and self._compression == _NONE
+
+    def __repr__(self) -> str:
+        return f"Codec({self.name!r}, threshold={self._threshold})"
+
+    def _dumps(self, value: Any) -> bytes:
+        kind = self._serializer
+        try:
+            if kind == _PICKLE:
+                return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            if kind == _PICKLE5:
+                return _dumps_pickle5(value)
+            if kind == _MARSHAL:
+                return marshal.dumps(value)
+            return json.dumps(value, separators=(",", ":")).encode()
+        except (TypeError, ValueError) as exc:
+            raise CacheError(f"Value cannot be encoded with the {self.name} codec: {exc}") from exc
+
+    def encode(self, value: Any) -> bytes:
+        """Serialise (and maybe compress) *value* into a self-describing blob."""
+        if self._bare:
+            return pickle.dumps(value)
+        payload = self._dumps(value)
+        compression = _NONE
+        if self._compression != _NONE and len(payload) >= self._threshold:
+            compressed = _COMPRESSORS[self._compression][0](payload, self._level)
+            if len(compressed) < len(payload):
+                payload, compression = compressed, self._compression
+        return bytes((_MAGIC, self._serializer << 4 | compression)) + payload
+
+    def decode(self, data: bytes) -> Any:
+        """Decode a blob written by any codec (or a bare legacy pickle)."""
+        return decode(data)
+
+
+def decode(data: bytes) -> Any:
+    """Decode *data* according to its header; bare pickles decode as-is."""
+    if not data or data[0] != _MAGIC:
+        return pickle.loads(data)
+    fmt = data[1]
+    kind, compression = fmt >> 4, fmt & 0x0F
+    view = memoryview(data)[2:]
+    if compression != _NONE:
+        try:
+            view = memoryview(_COMPRESSORS[compression][1](view))
+        except KeyError:
+            raise CacheError(f"Unknown compression id {compression} in cached blob") from None
+    if kind == _PICKLE:
+        return pickle.loads(view)
+    if kind == _PICKLE5:
+        return _loads_pickle5(view)
+    if kind == _MARSHAL:
+        return marshal.loads(view)
+    if kind == _JSON:
+        return json.loads(bytes(view))
+    raise CacheError(f"Unknown serializer id {kind} in cached blob")
+
+
+DEFAULT_CODEC = Codec()
@@ -0,0 +1,156 @@
+"""``@cached``: memoise sync or async functions over any adapter."""
+from __future__ import annotations
+
+import functools
+import inspect
+import time
+from typing import Any, Callable, Optional, Union
+
+from dd_cache.async_base import AsyncBaseCacheAdapter
+from dd_cache.base import BaseCacheAdapter
+from dd_cache.models import CacheError, CallStats
+from dd_cache.utils import make_key, stable_hash
+
+
+class _Counters:
+    __slots__ = ("hits", "misses", "hit_seconds", "miss_seconds")
+
+    def __init__(self) -> None:
+        self.hits = self.misses = 0
+        self.hit_seconds = self.miss_seconds = 0.0
+
+    def record(self, missed: bool, seconds: float) -> None:
+        if missed:
+            self.misses += 1
+            self.miss_seconds += seconds
+        else:
+            self.hits += 1
+            self.hit_seconds += seconds
+
+    def snapshot(self) -> CallStats:
+        calls = self.hits + self.misses
+        return CallStats(
+            hits=self.hits,
+            misses=self.misses,
+            hit_ratio=self.hits / calls if calls else 0.0,
+            avg_hit_ms=self.hit_seconds * 1000 / self.hits if self.hits else 0.0,
+            avg_miss_ms=self.miss_seconds * 1000 / self.misses if self.misses else 0.0,
+        )
+
+
+def cached(
+    adapter: Union[BaseCacheAdapter, AsyncBaseCacheAdapter],
+    *,
+    ttl: Optional[int] = None,
+    key: Optional[Callable[..., str]] = None,
+    prefix: Optional[str] = None,
+    early_refresh: float = 0.0,
+    stale_ttl: Optional[int] = None,
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a function so its results are cached in *adapter*.
+
+    Plain functions need a :class:`BaseCacheAdapter`, coroutine functions an
+    :class:`AsyncBaseCacheAdapter`.  Calls go through ``get_or_set``, so
+    concurrent misses on the same arguments compute once.
+
+    Each wrapper keeps its entries in a namespace named *prefix*, which
+    defaults to the function's ``module.qualname`` and must not contain
+    ``:``.  Keys in it are ``<prefix>:<digest>``, where the digest is
+    :func:`~dd_cache.utils.stable_hash` of the bound arguments (defaults
+    applied, so ``f(1)`` and ``f(x=1)`` share an entry); pass *key* to build
+    them yourself from the call's arguments.  *early_refresh* and
+    *stale_ttl* are passed on to ``get_or_set``.
+
+    The wrapper gains ``cache_key(*args, **kwargs)``,
+    ``invalidate(*args, **kwargs)``, ``cache_clear()`` and ``cache_info()``
+    returning :class:`~dd_cache.models.CallStats`.  For plain functions the
+    namespace is ``adapter.namespace(prefix)``, so ``cache_clear()`` is
+    O(1) and seen by every process.  Async adapters have no namespaces: the
+    wrapper stores keys under a per-process generation that
+    ``cache_clear()`` advances, and the retired entries age out by TTL or
+    eviction.  For coroutine functions ``invalidate`` and ``cache_clear``
+    are coroutines too.
+    """
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        is_async = inspect.iscoroutinefunction(fn)
+        expected = AsyncBaseCacheAdapter if is_async else BaseCacheAdapter
+        if not isinstance(adapter, expected):
+            kind = "coroutine functions" if is_async else "plain functions"
+            raise CacheError(f"@cached on {kind} needs a {expected.__name__}")
+        signature = inspect.signature(fn)
+        namespace = prefix or f"{fn.__module__}.{fn.__qualname__}"
+        if ":" in namespace:
+            raise CacheError(f"@cached prefix must contain no ':': {namespace!r}")
+        counters = _Counters()
+
+        def cache_key(*args: Any, **kwargs: Any) -> str:
+            if key is not None:
+                return key(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return make_key(namespace, stable_hash(bound.args, bound.kwargs))
+
+        if is_async:
+            generation = 0
+
+            def stored_key(*args: Any, **kwargs: Any) -> str:
+                return make_key("ns", namespace, str(generation), cache_key(*args, **kwargs))
+
+            @functools.wraps(fn)
+            async def wrapper(*args: Any, **kwargs: Any) -> Any:
+                missed = False
+
+                async def compute() -> Any:
+                    nonlocal missed
+                    missed = True
+                    return await fn(*args, **kwargs)
+
+                start = time.perf_counter()
+                value = await adapter.get_or_set(
+                    stored_key(*args, **kwargs), compute,
+                    ttl=ttl, early_refresh=early_refresh, stale_ttl=stale_ttl,
+                )
+                counters.record(missed, time.perf_counter() - start)
+                return value
+
+            async def invalidate(*args: Any, **kwargs: Any) -> bool:
+                return await adapter.delete(stored_key(*args, **kwargs))
+
+            async def cache_clear() -> None:
+                nonlocal generation
+                generation += 1
+        else:
+            # Created on first use, so decorating never touches the backend.
+            space = functools.lru_cache(maxsize=None)(lambda: adapter.namespace(namespace))
+
+            @functools.wraps(fn)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                missed = False
+
+                def compute() -> Any:
+                    nonlocal missed
+                    missed = True
+                    return fn(*args, **kwargs)
+
+                start = time.perf_counter()
+                value = space().get_or_set(
+                    cache_key(*args, **kwargs), compute,
+                    ttl=ttl, early_refresh=early_refresh, stale_ttl=stale_ttl,
+                )
+                counters.record(missed, time.perf_counter() - start)
+                return value
+
+            def invalidate(*args: Any, **kwargs: Any) -> bool:
+                return space().delete(cache_key(*args, **kwargs))
+
+            def cache_clear() -> None:
+                space().clear()
+
+        wrapper.cache_key = cache_key  # type: ignore[attr-defined]
+        wrapper.invalidate = invalidate  # type: ignore[attr-defined]
+        wrapper.cache_clear = cache_clear  # type: ignore[attr-defined]
+        wrapper.cache_info = counters.snapshot  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorate
@@ -0,0 +1,293 @@
+"""Eviction policies for bounded in-process caches.
+
+A policy only tracks keys; the owning cache keeps the values.  The cache
+reports every insert, hit and removal, and asks the policy for a victim
+whenever it is over its entry or byte budget.  All operations are O(1).
+"""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional
+
+from dd_cache.models import CacheError
+
+
+class EvictionPolicy(ABC):
+
+    @abstractmethod
+    def record_insert(self, key: str) -> None:
+        """Start tracking a newly inserted *key*."""
+
+    @abstractmethod
+    def record_access(self, key: str) -> None:
+        """Note a hit (or an overwrite) on an already tracked *key*."""
+
+    @abstractmethod
+    def remove(self, key: str) -> None:
+        """Stop tracking *key* (deleted or expired).  Unknown keys are ignored."""
+
+    @abstractmethod
+    def pop_victim(self) -> Optional[str]:
+        """Choose a key to evict, stop tracking it and return it.
+
+        Returns None when nothing is tracked.
+        """
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Forget every tracked key."""
+
+
+class LRUPolicy(EvictionPolicy):
+    """Least-recently-used, backed by an ``OrderedDict``."""
+
+    def __init__(self) -> None:
+        self._order: OrderedDict[str, None] = OrderedDict()
+
+    def record_insert(self, key: str) -> None:
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+    def record_access(self, key: str) -> None:
+        if key in self._order:
+            self._order.move_to_end(key)
+
+    def remove(self, key: str) -> None:
+        self._order.pop(key, None)
+
+    def pop_victim(self) -> Optional[str]:
+        if not self._order:
+            return None
+        key, _ = self._order.popitem(last=False)
+        return key
+
+    def clear(self) -> None:
+        self._order.clear()
+
+
+class LFUPolicy(EvictionPolicy):
+    """Least-frequently-used with O(1) frequency buckets.
+
+    The non-empty buckets form a linked list in frequency order, headed by
+    a sentinel at 0, so the least frequent bucket is always the head's
+    successor and removing any key never scans for a new minimum.  Ties
+    inside a frequency bucket are broken by recency (oldest first).
+    """
+
+    def __init__(self) -> None:
+        self._freq: dict[str, int] = {}
+        self._buckets: dict[int, OrderedDict[str, None]] = {}
+        self._higher: dict[int, int] = {}
+        self._lower: dict[int, int] = {}
+
+    def _link(self, key: str, freq: int, after: int) -> None:
+        """Append *key* to bucket *freq*, creating it right after bucket
+        *after* (0 for the head) if needed."""
+        bucket = self._buckets.get(freq)
+        if bucket is None:
+            bucket = self._buckets[freq] = OrderedDict()
+            following = self._higher.get(after)
+            self._higher[after], self._lower[freq] = freq, after
+            if following is not None:
+                self._higher[freq], self._lower[following] = following, freq
+        bucket[key] = None
+
+    def _unlink(self, key: str, freq: int) -> None:
+        bucket = self._buckets[freq]
+        del bucket[key]
+        if not bucket:
+            del self._buckets[freq]
+            before = self._lower.pop(freq)
+            following = self._higher.pop(freq, None)
+            if following is None:
+                del self._higher[before]
+            else:
+                self._higher[before], self._lower[following] = following, before
+
+    def record_insert(self, key: str) -> None:
+        if key in self._freq:
+            self.record_access(key)
+            return
+        self._freq[key] = 1
+        self._link(key, 1, 0)
+
+    def record_access(self, key: str) -> None:
+        freq = self._freq.get(key)
+        if freq is None:
+            return
+        # Bucket freq + 1, if it exists, is freq's successor: link first.
+        self._link(key, freq + 1, freq)
+        self._unlink(key, freq)
+        self._freq[key] = freq + 1
+
+    def remove(self, key: str) -> None:
+        freq = self._freq.pop(key, None)
+        if freq is not None:
+            self._unlink(key, freq)
+
+    def pop_victim(self) -> Optional[str]:
+        freq = self._higher.get(0)
+        if freq is None:
+            return None
+        key = next(iter(self._buckets[freq]))
+        del self._freq[key]
+        self._unlink(key, freq)
+        return key
+
+    def clear(self) -> None:
+        self._freq.clear()
+        self._buckets.clear()
+        self._higher.clear()
+        self._lower.clear()
+
+
+class CountMinSketch:
+    """4-bit-style frequency sketch with periodic halving ("aging").
+
+    Sized at roughly eight counters per tracked entry and row, so collisions
+    stay rare.  Counters saturate at 15 and are all halved once
+    ``10 * capacity`` increments have been recorded, so the sketch favours
+    recent popularity.
+    """
+
+    _DEPTH = 4
+    _MAX = 15
+    _MASK64 = (1 << 64) - 1
+
+    def __init__(self, capacity: int) -> None:
+        capacity = max(int(capacity), 1)
+        bits = max(6, (capacity * 8 - 1).bit_length())
+        self._shift = 64 - bits
+        self._rows = [[0] * (1 << bits) for _ in range(self._DEPTH)]
+        self._seeds = (0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F,
+                       0x165667B19E3779F9, 0x85EBCA77C2B2AE63)
+        self._sample_size = 10 * capacity
+        self._additions = 0
+
+    def _indexes(self, key: str) -> list[int]:
+        h = hash(key) & self._MASK64
+        return [(((h ^ seed) * 0x9E3779B97F4A7C15) & self._MASK64) >> self._shift
+                for seed in self._seeds]
+
+    def increment(self, key: str) -> None:
+        added = False
+        for row, idx in zip(self._rows, self._indexes(key)):
+            if row[idx] < self._MAX:
+                row[idx] += 1
+                added = True
+        if added:
+            self._additions += 1
+            if self._additions >= self._sample_size:
+                self._age()
+
+    def frequency(self, key: str) -> int:
+        return min(row[idx] for row, idx in zip(self._rows, self._indexes(key)))
+
+    def _age(self) -> None:
+        for row in self._rows:
+            for i, count in enumerate(row):
+                row[i] = count >> 1
+        self._additions //= 2
+
+    def clear(self) -> None:
+        for row in self._rows:
+            for i in range(len(row)):
+                row[i] = 0
+        self._additions = 0
+
+
+class WTinyLFUPolicy(EvictionPolicy):
+    """Window TinyLFU: a small LRU window in front of a segmented-LRU main
+    area, with a frequency sketch deciding admission into the main area.
+
+    New keys land in the window.  When the window overflows, its oldest key
+    moves to the main probation segment as an admission *candidate*; on
+    eviction the candidate only survives if the sketch has seen it more
+    often than the probation segment's LRU victim.  Keys hit while in
+    probation are promoted to the protected segment.
+    """
+
+    def __init__(self, capacity: int = 10_000, window_ratio: float = 0.01,
+                 protected_ratio: float = 0.8) -> None:
+        capacity = max(int(capacity), 1)
+        self._window_cap = max(1, int(capacity * window_ratio))
+        self._protected_cap = max(1, int((capacity - self._window_cap) * protected_ratio))
+        self._window: OrderedDict[str, None] = OrderedDict()
+        self._probation: OrderedDict[str, None] = OrderedDict()
+        self._protected: OrderedDict[str, None] = OrderedDict()
+        self._sketch = CountMinSketch(capacity)
+
+    def record_insert(self, key: str) -> None:
+        if key in self._window or key in self._probation or key in self._protected:
+            self.record_access(key)
+            return
+        self._sketch.increment(key)
+        self._window[key] = None
+        if len(self._window) > self._window_cap:
+            candidate, _ = self._window.popitem(last=False)
+            self._probation[candidate] = None
+
+    def record_access(self, key: str) -> None:
+        self._sketch.increment(key)
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._probation:
+            del self._probation[key]
+            self._protected[key] = None
+            if len(self._protected) > self._protected_cap:
+                demoted, _ = self._protected.popitem(last=False)
+                self._probation[demoted] = None
+        elif key in self._protected:
+            self._protected.move_to_end(key)
+
+    def remove(self, key: str) -> None:
+        for segment in (self._window, self._probation, self._protected):
+            if key in segment:
+                del segment[key]
+                return
+
+    def pop_victim(self) -> Optional[str]:
+        if len(self._probation) >= 2:
+            victim = next(iter(self._probation))
+            candidate = next(reversed(self._probation))
+            if self._sketch.frequency(candidate) > self._sketch.frequency(victim):
+                del self._probation[victim]
+                return victim
+            del self._probation[candidate]
+            return candidate
+        for segment in (self._probation, self._protected, self._window):
+            if segment:
+                key, _ = segment.popitem(last=False)
+                return key
+        return None
+
+    def clear(self) -> None:
+        self._window.clear()
+        self._probation.clear()
+        self._protected.clear()
+        self._sketch.clear()
+
+
+_POLICIES = {
+    "lru": LRUPolicy,
+    "lfu": LFUPolicy,
+    "tinylfu": WTinyLFUPolicy,
+    "w-tinylfu": WTinyLFUPolicy,
+}
+
+
+def make_policy(name: str | EvictionPolicy, capacity: Optional[int] = None) -> EvictionPolicy:
+    """Return an eviction policy instance for *name* (``"lru"``, ``"lfu"`` or
+    ``"tinylfu"``).  Policy instances are passed through unchanged."""
+    if isinstance(name, EvictionPolicy):
+        return name
+    try:
+        cls = _POLICIES[name.lower()]
+    except KeyError:
+        raise CacheError(
+            f"Unknown eviction policy {name!r}; expected one of {sorted(_POLICIES)}"
+        ) from None
+    if cls is WTinyLFUPolicy and capacity is not None:
+        return WTinyLFUPolicy(capacity=capacity)
+    return cls()
@@ -0,0 +1,85 @@
+"""Active TTL expiry: a deadline heap and a background sweeper thread.
+
+Adapters normally expire entries lazily, when a key is touched.  With
+active expiry enabled, an :class:`ExpirySweeper` thread periodically calls
+the adapter's purge function, which removes at most *batch* due entries
+per tick so a large backlog never holds the cache for long.
+"""
+from __future__ import annotations
+
+import heapq
+import threading
+from typing import Callable, Optional
+
+
+class ExpiryHeap:
+    """Min-heap of ``(expires_at, key)`` deadlines with lazy invalidation.
+
+    Overwritten or deleted keys leave stale heap entries behind; callers
+    pass the authoritative expiry map to :meth:`pop_due` so stale entries
+    are skipped.  The heap is rebuilt when stale entries dominate.
+    """
+
+    def __init__(self) -> None:
+        self._heap: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    def push(self, key: str, expires_at: float) -> None:
+        heapq.heappush(self._heap, (expires_at, key))
+
+    def pop_due(self, now: float, expiry: dict[str, float], limit: Optional[int] = None) -> list[str]:
+        """Pop and return up to *limit* keys whose current deadline is <= *now*."""
+        due: list[str] = []
+        heap = self._heap
+        while heap and heap[0][0] <= now and (limit is None or len(due) < limit):
+            exp, key = heapq.heappop(heap)
+            if expiry.get(key) == exp:
+                due.append(key)
+        if len(heap) > 2 * len(expiry) + 64:
+            self.rebuild(expiry)
+        return due
+
+    def rebuild(self, expiry: dict[str, float]) -> None:
+        self._heap = [(exp, key) for key, exp in expiry.items()]
+        heapq.heapify(self._heap)
+
+    def clear(self) -> None:
+        self._heap.clear()
+
+
+class ExpirySweeper:
+    """Daemon thread calling ``purge(batch)`` every *interval* seconds.
+
+    *purge* must be thread-safe and return the number of entries removed.
+    When a tick removes a full batch there is probably more backlog, so the
+    next tick follows almost immediately.
+    """
+
+    def __init__(self, purge: Callable[[int], int], *, interval: float = 1.0, batch: int = 1000) -> None:
+        self._purge = purge
+        self._interval = interval
+        self._batch = batch
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="dd-cache-expiry", daemon=True)
+        self.swept = 0
+
+    def start(self) -> "ExpirySweeper":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join()
+
+    def _run(self) -> None:
+        wait = self._interval
+        while not self._stop.wait(wait):
+            try:
+                removed = self._purge(self._batch)
+            except Exception:
+                removed = 0  # backend hiccup; retry next tick
+            self.swept += removed
+            wait = min(self._interval, 0.01) if removed >= self._batch else self._interval
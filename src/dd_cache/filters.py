@@ -0,0 +1,185 @@
+"""In-process key filters that answer definite misses without a backend trip.
+
+:class:`CountingBloomFilter` is a Bloom filter with one byte per counter, so
+keys can be removed as well as added.  :class:`KeyFilter` is the state an
+adapter keeps around it: counters for the statistics in ``stats()`` and the
+bookkeeping that decides when to rebuild it from the backend's key set.
+
+A filter only ever errs towards "maybe present": a key that may be in the
+backend is always reported as such, provided every write goes through the
+adapter holding the filter.
+"""
+from __future__ import annotations
+
+import math
+import threading
+from typing import Any, Iterable, Optional
+
+from dd_cache.models import CacheError
+
+_MASK64 = (1 << 64) - 1
+_GOLDEN = 0x9E3779B97F4A7C15
+_MIN_CAPACITY = 1024
+
+
+class CountingBloomFilter:
+    """Counting Bloom filter sized for *capacity* keys at *error_rate*.
+
+    Uses ``-capacity * ln(error_rate) / ln(2)**2`` one-byte counters and the
+    matching number of probes, derived from ``hash(key)`` by double hashing
+    (so the filter is only meaningful within one process).  Counters
+    saturate at 255 and are then never decremented, which can only add
+    false positives.  Writers must be serialised by the caller.
+    """
+
+    _MAX = 255
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        if capacity < 1:
+            raise CacheError("filter capacity must be at least 1")
+        if not 0 < error_rate < 1:
+            raise CacheError("filter error_rate must be between 0 and 1")
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self._probes = max(1, round(self._size / capacity * math.log(2)))
+        self._counters = bytearray(self._size)
+
+    @property
+    def nbytes(self) -> int:
+        return self._size
+
+    def _indexes(self, key: str) -> list[int]:
+        h1 = hash(key) & _MASK64
+        h2 = ((h1 * _GOLDEN) & _MASK64) | 1
+        size = self._size
+        return [(h1 + i * h2) % size for i in range(self._probes)]
+
+    def __contains__(self, key: str) -> bool:
+        counters = self._counters
+        return all(counters[i] for i in self._indexes(key))
+
+    def add(self, key: str) -> None:
+        counters = self._counters
+        for i in self._indexes(key):
+            if counters[i] < self._MAX:
+                counters[i] += 1
+
+    def remove(self, key: str) -> None:
+        """Undo one :meth:`add` of *key*; only call it for keys added before."""
+        counters = self._counters
+        for i in self._indexes(key):
+            if 0 < counters[i] < self._MAX:
+                counters[i] -= 1
+
+    def clear(self) -> None:
+        self._counters = bytearray(self._size)
+
+
+class KeyFilter:
+    """Membership filter an adapter consults before a backend lookup.
+
+    *capacity* (at least the backend's key count at the last rebuild,
+    doubled) and *error_rate* size the :class:`CountingBloomFilter`.  The
+    adapter adds every key it writes and removes every key a single delete
+    confirmed; bulk removals it cannot attribute to keys (batch deletes,
+    tag invalidation, expiry, eviction) are only counted as stale entries.
+    :attr:`due` turns true once inserts since the last rebuild exceed the
+    capacity or stale entries exceed half of it, and the adapter then
+    rebuilds from its key set.
+    """
+
+    def __init__(self, capacity: Optional[int] = None, error_rate: float = 0.01) -> None:
+        self._min_capacity = capacity
+        self._error_rate = error_rate
+        self._lock = threading.Lock()
+        self._filter = CountingBloomFilter(capacity or _MIN_CAPACITY, error_rate)
+        self._inserts = 0
+        self._stale = 0
+        self._recent: Optional[list[str]] = None  # keys added during a rebuild
+        self.rebuilds = 0
+        self.checks = 0
+        self.skipped = 0
+        self.false_positives = 0
+
+    def rebuild(self, keys: Iterable[str], count: int) -> None:
+        """Replace the filter with one holding *keys* (about *count* of them).
+        Keys added while *keys* is being read are carried over."""
+        capacity = max(self._min_capacity or 0, 2 * count, _MIN_CAPACITY)
+        fresh = CountingBloomFilter(capacity, self._error_rate)
+        with self._lock:
+            self._recent = []
+        try:
+            for key in keys:
+                fresh.add(key)
+        except BaseException:
+            with self._lock:
+                self._recent = None
+            raise
+        with self._lock:
+            for key in self._recent:
+                fresh.add(key)
+            self._recent = None
+            self._filter = fresh
+            self._inserts = 0
+            self._stale = 0
+            self.rebuilds += 1
+
+    def might_contain(self, key: str) -> bool:
+        """False if *key* is definitely absent; counts the check."""
+        self.checks += 1
+        if key in self._filter:
+            return True
+        self.skipped += 1
+        return False
+
+    def missed(self, count: int = 1) -> None:
+        """Record backend misses for keys the filter let through."""
+        self.false_positives += count
+
+    def add(self, key: str) -> None:
+        with self._lock:
+            self._filter.add(key)
+            self._inserts += 1
+            if self._recent is not None:
+                self._recent.append(key)
+
+    def add_many(self, keys: Iterable[str]) -> None:
+        with self._lock:
+            for key in keys:
+                self._filter.add(key)
+                self._inserts += 1
+                if self._recent is not None:
+                    self._recent.append(key)
+
+    def remove(self, key: str) -> None:
+        with self._lock:
+            self._filter.remove(key)
+
+    def mark_stale(self, count: int) -> None:
+        self._stale += count
+
+    def clear(self) -> None:
+        with self._lock:
+            self._filter.clear()
+            self._inserts = 0
+            self._stale = 0
+
+    @property
+    def due(self) -> bool:
+        capacity = self._filter.capacity
+        return self._inserts > capacity or self._stale > capacity // 2
+
+    def stats(self) -> dict[str, Any]:
+        negatives = self.skipped + self.false_positives
+        return {
+            "capacity": self._filter.capacity,
+            "error_rate": self._error_rate,
+            "bytes": self._filter.nbytes,
+            "checks": self.checks,
+            "skipped": self.skipped,
+            "false_positives": self.false_positives,
+            "false_positive_rate": self.false_positives / negatives if negatives else 0.0,
+            "stale": self._stale,
+            "rebuilds": self.rebuilds,
+        }
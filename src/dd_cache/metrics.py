@@ -0,0 +1,172 @@
+"""Always-on operational metrics for cache adapters.
+
+Every adapter owns a :class:`Metrics` (``cache.metrics``) holding plain
+integer counters and one :class:`LatencyHistogram` per operation.  Updates
+are a few dict operations with no locking, so counts may drift slightly
+under heavy multi-threaded contention; ``stats()`` reads them in O(1).
+
+Push-style exporters subclass :class:`MetricsSink` and register it with
+``cache.metrics.add_sink()``; pull-style ones read :meth:`Metrics.snapshot`
+or render :func:`prometheus_text`.  :class:`StatsDSink` speaks the StatsD
+line protocol over UDP using only the standard library.
+"""
+from __future__ import annotations
+
+import math
+import socket
+from typing import Any, Optional
+
+COUNTERS = (
+    "hits", "misses", "sets", "deletes", "evictions", "expirations", "bytes_in", "bytes_out",
+    "stale_hits", "refresh_failures",
+)
+
+_BUCKETS = 32  # bucket i holds latencies below 2**i microseconds (~36 min max)
+
+
+class LatencyHistogram:
+    """Log2-bucketed latency histogram with O(1) updates."""
+
+    __slots__ = ("counts", "count", "total")
+
+    def __init__(self) -> None:
+        self.counts = [0] * _BUCKETS
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, seconds: float) -> None:
+        micros = seconds * 1e6
+        i = math.frexp(micros)[1] if micros >= 1 else 0
+        self.counts[i if i < _BUCKETS else _BUCKETS - 1] += 1
+        self.count += 1
+        self.total += seconds
+
+    def quantile(self, q: float) -> float:
+        """Upper bound, in seconds, of the bucket holding quantile *q*."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return 2.0 ** i / 1e6
+        return 2.0 ** (_BUCKETS - 1) / 1e6
+
+    def summary(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": self.total * 1000 / self.count if self.count else 0.0,
+            "p50_ms": self.quantile(0.5) * 1000,
+            "p90_ms": self.quantile(0.9) * 1000,
+            "p99_ms": self.quantile(0.99) * 1000,
+        }
+
+
+class MetricsSink:
+    """Receives metric events as they happen; override what you export.
+
+    Sinks are called inline on the cache's hot path, so they should only
+    buffer or fire-and-forget.
+    """
+
+    def count(self, name: str, value: int) -> None:
+        """Counter *name* (one of :data:`COUNTERS`) grew by *value*."""
+
+    def timing(self, op: str, seconds: float) -> None:
+        """Operation *op* (``"get"``, ``"set"``, ...) took *seconds*."""
+
+
+class StatsDSink(MetricsSink):
+    """Send counters and timings to a StatsD daemon over UDP."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 8125, *, prefix: str = "dd_cache") -> None:
+        self._addr = (host, port)
+        self._prefix = prefix
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def _send(self, line: str) -> None:
+        try:
+            self._sock.sendto(line.encode(), self._addr)
+        except OSError:
+            pass  # metrics must never break the cache
+
+    def count(self, name: str, value: int) -> None:
+        self._send(f"{self._prefix}.{name}:{value}|c")
+
+    def timing(self, op: str, seconds: float) -> None:
+        self._send(f"{self._prefix}.{op}:{seconds * 1000:.3f}|ms")
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+class Metrics:
+    """Counters and per-operation latency histograms for one adapter."""
+
+    def __init__(self) -> None:
+        self.counters: dict[str, int] = dict.fromkeys(COUNTERS, 0)
+        self.latency: dict[str, LatencyHistogram] = {}
+        self._sinks: list[MetricsSink] = []
+
+    def add_sink(self, sink: MetricsSink) -> None:
+        self._sinks.append(sink)
+
+    def remove_sink(self, sink: MetricsSink) -> None:
+        self._sinks.remove(sink)
+
+    def incr(self, name: str, value: int = 1) -> None:
+        self.counters[name] += value
+        for sink in self._sinks:
+            sink.count(name, value)
+
+    def observe(self, op: str, seconds: float) -> None:
+        hist = self.latency.get(op)
+        if hist is None:
+            hist = self.latency.setdefault(op, LatencyHistogram())
+        hist.observe(seconds)
+        for sink in self._sinks:
+            sink.timing(op, seconds)
+
+    def lookup(self, hit: bool, seconds: float, op: str = "get") -> None:
+        """Record one read: a hit or miss plus its latency."""
+        self.incr("hits" if hit else "misses")
+        self.observe(op, seconds)
+
+    def reset(self) -> None:
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        self.latency = {}
+
+    def snapshot(self) -> dict[str, Any]:
+        """Counters plus a latency summary per operation, as ``CacheStats``
+        keyword arguments."""
+        return {**self.counters, "latency": {op: h.summary() for op, h in self.latency.items()}}
+
+
+def prometheus_text(metrics: Metrics, *, prefix: str = "dd_cache", labels: Optional[dict[str, str]] = None) -> str:
+    """Render *metrics* in the Prometheus text exposition format."""
+    base = dict(labels or {})
+
+    def fmt(**extra: str) -> str:
+        pairs = {**base, **extra}
+        if not pairs:
+            return ""
+        return "{" + ",".join(f'{k}="{v}"' for k, v in pairs.items()) + "}"
+
+    lines = []
+    for name, value in metrics.counters.items():
+        lines.append(f"# TYPE {prefix}_{name}_total counter")
+        lines.append(f"{prefix}_{name}_total{fmt()} {value}")
+    if metrics.latency:
+        lines.append(f"# TYPE {prefix}_op_seconds histogram")
+    for op, hist in metrics.latency.items():
+        cumulative = 0
+        for i, n in enumerate(hist.counts):
+            cumulative += n
+            if n:
+                lines.append(f"{prefix}_op_seconds_bucket{fmt(op=op, le=f'{2.0 ** i / 1e6:g}')} {cumulative}")
+        lines.append(f"{prefix}_op_seconds_bucket{fmt(op=op, le='+Inf')} {hist.count}")
+        lines.append(f"{prefix}_op_seconds_sum{fmt(op=op)} {hist.total}")
+        lines.append(f"{prefix}_op_seconds_count{fmt(op=op)} {hist.count}")
+    return "\n".join(lines) + "\n"
@@ -10,7 +10,33 @@ class CacheStats(BaseModel):
     total_keys: int
     ttl_enabled: bool
     extra: dict[str, Any] = {}
+    # Operational counters since the adapter was created (see dd_cache.metrics).
+    hits: int = 0
+    misses: int = 0
+    sets: int = 0
+    deletes: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    bytes_in: int = 0           # serialised bytes written
+    bytes_out: int = 0          # serialised bytes read
+    stale_hits: int = 0         # get_or_set hits served stale while refreshing
+    refresh_failures: int = 0   # background refreshes whose loader raised
+    latency: dict[str, dict[str, float]] = {}
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
 
 
 class CacheError(Exception):
     """Raised for cache configuration or operation errors."""
+
+
+class CallStats(BaseModel):
+    """Per-function counters reported by ``@cached`` wrappers."""
+    hits: int
+    misses: int
+    hit_ratio: float
+    avg_hit_ms: float
+    avg_miss_ms: float
@@ -0,0 +1,430 @@
+"""Semantic (nearest-neighbour) caching over any adapter.
+
+:class:`SemanticCache` answers a lookup with the value stored for the most
+similar earlier query, so a reworded prompt can hit where an exact key
+would miss.
+"""
+from __future__ import annotations
+
+import math
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Callable, Iterable, Optional
+
+from dd_cache.base import BaseCacheAdapter
+from dd_cache.metrics import Metrics
+from dd_cache.models import CacheError, CacheStats
+from dd_cache.stampede import SingleFlight
+from dd_cache.utils import stable_hash
+
+if TYPE_CHECKING:
+    import numpy as np
+
+_DEAD = -math.inf   # deadline of a free or deleted row
+_ASSIGN_CHUNK = 16_384  # rows scored against the centroids at a time
+_KMEANS_ITERATIONS = 8
+
+
+class SemanticCache:
+    """Cache keyed by embedding similarity, layered over *cache*.
+
+    Requires NumPy (``pip install dd-cache[numpy]``).  ``set(query, value)``
+    stores ``(embedding, value)`` in *cache* under ``<prefix><hash of the
+    embedding>`` and adds the unit-normalised embedding to a contiguous
+    ``float32`` matrix.  ``get(query)`` scores the query against every live
+    row with one matrix-vector product and returns the value of the best
+    match whose cosine similarity is at least *threshold*, or None.
+    Queries are embeddings (any 1-D array-like of length *dim*) or, when
+    *embed* is given, strings passed through it.  :meth:`get_many` scores a
+    whole batch of queries in one matrix product.
+
+    TTLs and evictions stay with *cache*: each row remembers its expiry and
+    is skipped once due, and a best match whose value *cache* no longer has
+    (evicted, deleted elsewhere) is dropped from the matrix and the next
+    candidate is tried.  The matrix is per process; :meth:`rebuild` reloads
+    it from the entries under *prefix* (for example after a restart on a
+    persistent backend).
+
+    With ``index="ivf"`` the rows are also partitioned by a spherical
+    k-means into *nlist* lists (default ``sqrt(n)``) once *train_size* live
+    rows exist, retrained whenever the row count doubles, and a query only
+    scores the rows of its *nprobe* nearest lists.  That trades a little
+    recall for lookups that stay well under a millisecond at 100k rows.
+    """
+
+    def __init__(
+        self,
+        cache: BaseCacheAdapter,
+        *,
+        dim: int,
+        threshold: float = 0.92,
+        embed: Optional[Callable[[str], Any]] = None,
+        prefix: str = "semantic:",
+        index: str = "flat",
+        nlist: Optional[int] = None,
+        nprobe: int = 8,
+        train_size: int = 10_000,
+        candidates: int = 4,
+    ) -> None:
+        try:
+            import numpy
+        except ImportError as exc:
+            raise CacheError(
+                "SemanticCache requires the 'numpy' package. "
+                "Install it with: pip install dd-cache[numpy]"
+            ) from exc
+        if index not in ("flat", "ivf"):
+            raise CacheError(f"Unknown index {index!r}; expected 'flat' or 'ivf'")
+        self._np = numpy
+        self._cache = cache
+        self._dim = dim
+        self._threshold = threshold
+        self._embed = embed
+        self._prefix = prefix
+        self._index = index
+        self._nlist = nlist
+        self._nprobe = nprobe
+        self._train_size = train_size
+        self._candidates = candidates
+        self._metrics = Metrics()
+        self._flight = SingleFlight()
+        self._lock = threading.Lock()
+
+        # Row storage: vectors, deadlines (inf = no expiry) and keys.
+        self._vectors = numpy.zeros((0, dim), dtype=numpy.float32)
+        self._deadlines = numpy.zeros(0, dtype=numpy.float64)
+        self._keys: list[Optional[str]] = []
+        self._rows: dict[str, int] = {}
+        self._free: list[int] = []
+
+        # IVF state.  Training sorts the rows by list, so list j is the
+        # slice spans[j] plus the rows appended to it since (its extras).
+        self._centroids: Optional[np.ndarray] = None
+        self._spans: list[tuple[int, int]] = []
+        self._extras: list[list[int]] = []
+        self._list_rows: list[Optional[np.ndarray]] = []
+        self._trained_at = 0
+
+    @property
+    def metrics(self) -> Metrics:
+        return self._metrics
+
+    # ------------------------------------------------------------------
+    # Internal helpers
+    # ------------------------------------------------------------------
+
+    def _vector(self, query: Any) -> "np.ndarray":
+        if isinstance(query, str):
+            if self._embed is None:
+                raise CacheError("pass embed= to query SemanticCache with strings")
+            query = self._embed(query)
+        vec = self._np.asarray(query, dtype=self._np.float32).reshape(-1)
+        if vec.shape[0] != self._dim:
+            raise CacheError(f"expected a {self._dim}-dimensional embedding, got {vec.shape[0]}")
+        norm = float(self._np.linalg.norm(vec))
+        if norm == 0.0:
+            raise CacheError("cannot index a zero embedding")
+        return vec / norm
+
+    def _key(self, vec: "np.ndarray") -> str:
+        return self._prefix + stable_hash(vec)
+
+    def _reset(self) -> None:
+        """Forget every row.  Caller holds ``_lock``."""
+        self._rows.clear()
+        self._keys = []
+        self._free = []
+        self._deadlines[:] = _DEAD
+        self._centroids = None
+        self._trained_at = 0
+
+    def _grow(self, size: int) -> None:
+        """Make room for *size* rows, doubling capacity.  Caller holds ``_lock``."""
+        np = self._np
+        n = len(self._keys)
+        capacity = len(self._deadlines)
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity = max(64, 2 * capacity)
+        vectors = np.zeros((capacity, self._dim), dtype=np.float32)
+        vectors[:n] = self._vectors[:n]
+        deadlines = np.full(capacity, _DEAD)
+        deadlines[:n] = self._deadlines[:n]
+        self._vectors, self._deadlines = vectors, deadlines
+
+    def _add_row(self, key: str, vec: "np.ndarray", deadline: float) -> None:
+        """Insert *key*'s row or refresh its deadline.  Keys are derived
+        from the vector, so an existing row never changes list.  Caller
+        holds ``_lock``."""
+        row = self._rows.get(key)
+        if row is None:
+            if self._free and self._centroids is None:
+                row = self._free.pop()
+                self._keys[row] = key
+            else:
+                # Once trained, rows are only appended so the spans stay
+                # intact; freed rows are reclaimed by the next training.
+                row = len(self._keys)
+                self._grow(row + 1)
+                self._keys.append(key)
+                if self._centroids is not None:
+                    j = int(self._np.argmax(self._centroids @ vec))
+                    self._extras[j].append(row)
+                    self._list_rows[j] = None
+            self._rows[key] = row
+            self._vectors[row] = vec
+        self._deadlines[row] = deadline
+
+    def _drop_row(self, key: str) -> None:
+        with self._lock:
+            row = self._rows.pop(key, None)
+            if row is not None:
+                self._deadlines[row] = _DEAD
+                self._keys[row] = None
+                self._free.append(row)
+
+    def _maybe_train(self) -> None:
+        if self._index != "ivf":
+            return
+        if self._centroids is None:
+            due = len(self._rows) >= self._train_size
+        else:
+            # Retrain (and compact) once the rows have doubled, whether by
+            # growth or by churn leaving dead rows behind.
+            due = len(self._keys) >= 2 * self._trained_at
+        if due:
+            self.train()
+
+    def _probe(self, q: "np.ndarray") -> tuple["np.ndarray", "np.ndarray"]:
+        """Rows of the *nprobe* lists nearest to *q* and their scores.
+        Caller holds ``_lock``."""
+        np = self._np
+        centroid_scores = self._centroids @ q  # type: ignore[operator]
+        nprobe = min(self._nprobe, len(centroid_scores))
+        rows, scores = [], []
+        for j in np.argpartition(-centroid_scores, nprobe - 1)[:nprobe]:
+            lo, hi = self._spans[j]
+            extras = self._extras[j]
+            list_rows = self._list_rows[j]
+            if list_rows is None:
+                list_rows = np.concatenate([np.arange(lo, hi), np.asarray(extras, dtype=np.int64)])
+                self._list_rows[j] = list_rows
+            rows.append(list_rows)
+            scores.append(self._vectors[lo:hi] @ q)  # a view; no gather
+            if extras:
+                scores.append(self._vectors[extras] @ q)
+        return np.concatenate(rows), np.concatenate(scores)
+
+    def _candidates_for(self, queries: "np.ndarray") -> list[list[tuple[str, float]]]:
+        """Best ``(key, score)`` pairs at or above the threshold for each
+        query row, best first."""
+        np = self._np
+        now = time.time()
+        results: list[list[tuple[str, float]]] = []
+        with self._lock:
+            n = len(self._keys)
+            if not self._rows:
+                return [[] for _ in range(len(queries))]
+            if self._centroids is None:
+                # One BLAS call scores the whole batch against every row.
+                scores = queries @ self._vectors[:n].T
+                scores[:, self._deadlines[:n] <= now] = -np.inf
+                row_sets = [None] * len(queries)
+            else:
+                row_sets, scores = [], []
+                for q in queries:
+                    rows, s = self._probe(q)
+                    s[self._deadlines[rows] <= now] = -np.inf
+                    row_sets.append(rows)
+                    scores.append(s)
+            for rows, s in zip(row_sets, scores):
+                k = min(self._candidates, len(s))
+                if k == 0:
+                    results.append([])
+                    continue
+                top = np.argpartition(-s, k - 1)[:k]
+                top = top[np.argsort(-s[top])]
+                found = []
+                for i in top:
+                    if s[i] < self._threshold:
+                        break
+                    row = int(i if rows is None else rows[i])
+                    found.append((self._keys[row], float(s[i])))
+                results.append(found)
+        return results  # type: ignore[return-value]
+
+    def _resolve(self, candidates: list[tuple[str, float]], values: dict[str, Any]) -> Any:
+        """First candidate whose entry *cache* still holds, as
+        ``(value, score)``; candidates it lost are dropped from the index."""
+        for key, score in candidates:
+            if key in values:
+                return values[key][1], score
+            self._drop_row(key)
+        return None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+
+    def lookup(self, query: Any) -> Optional[tuple[Any, float]]:
+        """Return ``(value, similarity)`` for the closest stored query at or
+        above the threshold, or None."""
+        start = time.perf_counter()
+        candidates = self._candidates_for(self._vector(query)[None, :])[0]
+        found = self._resolve(candidates, self._cache.get_many(key for key, _ in candidates))
+        self._metrics.lookup(found is not None, time.perf_counter() - start)
+        return found
+
+    def get(self, query: Any) -> Any:
+        """Return the value cached for the most similar query, or None."""
+        found = self.lookup(query)
+        return None if found is None else found[0]
+
+    def get_many(self, queries: Iterable[Any]) -> list[Any]:
+        """Answer a batch of queries with one matrix product (flat index)
+        and one bulk read; returns a value or None per query, in order."""
+        start = time.perf_counter()
+        vectors = [self._vector(q) for q in queries]
+        if not vectors:
+            return []
+        per_query = self._candidates_for(self._np.stack(vectors))
+        values = self._cache.get_many({key for found in per_query for key, _ in found})
+        results = []
+        for candidates in per_query:
+            found = self._resolve(candidates, values)
+            results.append(None if found is None else found[0])
+        hits = sum(r is not None for r in results)
+        self._metrics.incr("hits", hits)
+        self._metrics.incr("misses", len(results) - hits)
+        self._metrics.observe("get_many", time.perf_counter() - start)
+        return results
+
+    def set(self, query: Any, value: Any, *, ttl: Optional[int] = None) -> str:
+        """Cache *value* for *query* and return the key it is stored under
+        in the underlying cache."""
+        start = time.perf_counter()
+        vec = self._vector(query)
+        key = self._key(vec)
+        self._cache.set(key, (vec, value), ttl=ttl)
+        with self._lock:
+            self._add_row(key, vec, time.time() + ttl if ttl is not None else math.inf)
+        self._maybe_train()
+        self._metrics.incr("sets")
+        self._metrics.observe("set", time.perf_counter() - start)
+        return key
+
+    def get_or_set(self, query: Any, fn: Callable[[], Any], *, ttl: Optional[int] = None) -> Any:
+        """Return the value for a similar enough query, else call *fn()*,
+        cache its result for *query* and return it.  Concurrent misses on
+        the same query call *fn* once."""
+        found = self.lookup(query)
+        if found is not None:
+            return found[0]
+        vec = self._vector(query)
+
+        def fill() -> Any:
+            value = fn()
+            self.set(vec, value, ttl=ttl)
+            return value
+
+        return self._flight.do(self._key(vec), fill)
+
+    def delete(self, query: Any) -> bool:
+        """Remove the entry stored for exactly *query* (not similar ones)."""
+        key = self._key(self._vector(query))
+        self._drop_row(key)
+        existed = self._cache.delete(key)
+        if existed:
+            self._metrics.incr("deletes")
+        return existed
+
+    def clear(self) -> None:
+        """Remove every entry of this semantic cache from the index and from
+        the underlying cache."""
+        with self._lock:
+            keys = list(self._rows)
+            self._reset()
+        self._cache.delete_many(keys)
+
+    def rebuild(self, batch: int = 1000) -> int:
+        """Reload the index from the entries under *prefix* in the
+        underlying cache and return how many rows it now holds."""
+        with self._lock:
+            self._reset()
+        for entries in self._cache._scan_entries(self._prefix, batch):
+            with self._lock:
+                for key, (vec, _), expires_at in entries:
+                    self._add_row(key, vec, expires_at if expires_at is not None else math.inf)
+        self._maybe_train()
+        return len(self._rows)
+
+    def train(self) -> None:
+        """(Re)build the IVF partition from the current rows with a
+        spherical k-means over a sample of them."""
+        np = self._np
+        with self._lock:
+            n = len(self._keys)
+            live = np.flatnonzero(self._deadlines[:n] > _DEAD)
+            if len(live) == 0:
+                return
+            nlist = min(self._nlist or max(1, int(math.sqrt(len(live)))), len(live))
+            rng = np.random.default_rng(0)
+            sample = self._vectors[rng.choice(live, min(len(live), nlist * 32), replace=False)]
+            centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+            for _ in range(_KMEANS_ITERATIONS):
+                nearest = np.argmax(sample @ centroids.T, axis=1)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, nearest, sample)
+                norms = np.linalg.norm(sums, axis=1)
+                filled = norms > 0  # empty lists keep their old centroid
+                centroids[filled] = sums[filled] / norms[filled, None]
+            assign = np.empty(len(live), dtype=np.int64)
+            for i in range(0, len(live), _ASSIGN_CHUNK):
+                rows = live[i:i + _ASSIGN_CHUNK]
+                assign[i:i + _ASSIGN_CHUNK] = np.argmax(self._vectors[rows] @ centroids.T, axis=1)
+            # Compact the live rows into one contiguous span per list.
+            order = np.argsort(assign, kind="stable")
+            moved = live[order]
+            vectors = np.zeros_like(self._vectors)
+            vectors[:len(moved)] = self._vectors[moved]
+            deadlines = np.full(len(self._deadlines), _DEAD)
+            deadlines[:len(moved)] = self._deadlines[moved]
+            self._vectors, self._deadlines = vectors, deadlines
+            self._keys = [self._keys[row] for row in moved.tolist()]
+            self._rows = {key: row for row, key in enumerate(self._keys)}  # type: ignore[misc]
+            self._free = []
+            bounds = np.searchsorted(assign[order], np.arange(nlist + 1)).tolist()
+            self._spans = [(bounds[j], bounds[j + 1]) for j in range(nlist)]
+            self._extras = [[] for _ in range(nlist)]
+            self._list_rows = [None] * nlist
+            self._centroids = centroids
+            self._trained_at = len(live)
+
+    def stats(self) -> CacheStats:
+        now = time.time()
+        with self._lock:
+            n = len(self._keys)
+            deadlines = self._deadlines[:n]
+            live = int((deadlines > now).sum())
+            ttl_enabled = bool(((deadlines > now) & (deadlines < math.inf)).any())
+            nlist = 0 if self._centroids is None else len(self._centroids)
+        return CacheStats(
+            backend="semantic",
+            total_keys=live,
+            ttl_enabled=ttl_enabled,
+            extra={
+                "dim": self._dim,
+                "threshold": self._threshold,
+                "index": self._index,
+                "nlist": nlist,
+                "nprobe": self._nprobe,
+                "rows": n,
+            },
+            **self._metrics.snapshot(),
+        )
+
+    def close(self) -> None:
+        """Drop the in-process index; the underlying cache stays open."""
+        with self._lock:
+            self._reset()
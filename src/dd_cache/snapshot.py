@@ -0,0 +1,138 @@
+"""Streaming snapshots of cache contents and adapter-to-adapter migration.
+
+A snapshot is a magic header followed by chunks of entries.  Each chunk is
+``flags:u8 count:u32 length:u32`` and *length* payload bytes (zlib
+compressed when flag bit 0 is set), holding *count* records of
+``key_len:u32 value_len:u32 expires_at:f64`` plus the UTF-8 key and the
+encoded value.  *expires_at* is a unix timestamp (0 for no expiry), so a
+snapshot restored later keeps each entry's remaining lifetime rather than
+restarting it.  A zero-count chunk ends the stream.
+
+Values are encoded with a :class:`~dd_cache.codecs.Codec`; every codec's
+blobs are self-describing, so loading needs no codec argument.
+"""
+from __future__ import annotations
+
+import math
+import struct
+import time
+import zlib
+from pathlib import Path
+from typing import IO, TYPE_CHECKING, Any, Iterable, Iterator, Optional, Union
+
+from dd_cache.codecs import DEFAULT_CODEC, Codec, decode
+from dd_cache.models import CacheError
+
+if TYPE_CHECKING:
+    from dd_cache.base import BaseCacheAdapter
+
+Entry = tuple[str, Any, Optional[float]]  # (key, value, expires_at)
+Target = Union[str, Path, IO[bytes]]
+
+_MAGIC = b"DDCSNAP1"
+_CHUNK = struct.Struct("<BII")
+_RECORD = struct.Struct("<IId")
+_COMPRESSED = 1
+
+
+def _open(target: Target, mode: str) -> tuple[IO[bytes], bool]:
+    if isinstance(target, (str, Path)):
+        return open(target, mode), True
+    return target, False
+
+
+def write_snapshot(
+    batches: Iterable[list[Entry]], target: Target, *, codec: Codec = DEFAULT_CODEC, compress: bool = True
+) -> int:
+    """Write *batches* of entries to *target* (a path or binary file), one
+    chunk per batch, and return how many entries were written."""
+    fp, owned = _open(target, "wb")
+    written = 0
+    try:
+        fp.write(_MAGIC)
+        for batch in batches:
+            parts = []
+            for key, value, expires_at in batch:
+                kb = key.encode()
+                blob = codec.encode(value)
+                parts += (_RECORD.pack(len(kb), len(blob), expires_at or 0.0), kb, blob)
+            if not batch:
+                continue
+            payload = b"".join(parts)
+            flags = 0
+            if compress:
+                payload, flags = zlib.compress(payload, 1), _COMPRESSED
+            fp.write(_CHUNK.pack(flags, len(batch), len(payload)))
+            fp.write(payload)
+            written += len(batch)
+        fp.write(_CHUNK.pack(0, 0, 0))
+    finally:
+        if owned:
+            fp.close()
+    return written
+
+
+def read_snapshot(source: Target) -> Iterator[list[Entry]]:
+    """Yield the entries of a snapshot, one list per chunk, decoding values
+    as they are read."""
+    fp, owned = _open(source, "rb")
+    try:
+        if fp.read(len(_MAGIC)) != _MAGIC:
+            raise CacheError("not a dd-cache snapshot")
+        while True:
+            header = fp.read(_CHUNK.size)
+            if len(header) < _CHUNK.size:
+                raise CacheError("truncated dd-cache snapshot")
+            flags, count, length = _CHUNK.unpack(header)
+            if not count:
+                return
+            payload = fp.read(length)
+            if len(payload) < length:
+                raise CacheError("truncated dd-cache snapshot")
+            if flags & _COMPRESSED:
+                payload = zlib.decompress(payload)
+            view = memoryview(payload)
+            batch: list[Entry] = []
+            offset = 0
+            for _ in range(count):
+                klen, vlen, expires_at = _RECORD.unpack_from(view, offset)
+                offset += _RECORD.size
+                key = bytes(view[offset:offset + klen]).decode()
+                offset += klen
+                value = decode(bytes(view[offset:offset + vlen]))
+                offset += vlen
+                batch.append((key, value, expires_at or None))
+            yield batch
+    finally:
+        if owned:
+            fp.close()
+
+
+def restore(cache: "BaseCacheAdapter", batches: Iterable[list[Entry]]) -> int:
+    """Write *batches* into *cache* with one ``set_many`` each, giving every
+    entry its remaining TTL; entries already expired are skipped.  Returns
+    how many entries were written."""
+    restored = 0
+    for batch in batches:
+        now = time.time()
+        items: dict[str, Any] = {}
+        ttls: dict[str, int] = {}
+        for key, value, expires_at in batch:
+            if expires_at is not None:
+                if expires_at <= now:
+                    continue
+                ttls[key] = max(math.ceil(expires_at - now), 1)
+            items[key] = value
+        if items:
+            cache.set_many(items, ttl=ttls)
+            restored += len(items)
+    return restored
+
+
+def migrate(source: "BaseCacheAdapter", target: "BaseCacheAdapter", *, prefix: str = "", batch: int = 1000) -> int:
+    """Copy every live entry of *source* (optionally only keys starting
+    with *prefix*) into *target*, *batch* entries at a time with their
+    remaining TTLs, and return how many were copied.  Nothing is buffered
+    beyond one batch, so any two adapters can be bridged, e.g. to prewarm
+    an :class:`~dd_cache.adapters.memory.InMemoryCache` from disk."""
+    return restore(target, source._scan_entries(prefix, batch))
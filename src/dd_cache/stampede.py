@@ -0,0 +1,220 @@
+"""Cache-stampede protection used by ``get_or_set``.
+
+* :class:`SingleFlight` / :class:`AsyncSingleFlight` collapse concurrent
+  in-process fills of the same key onto one call of the loader; everyone
+  else waits on a per-key future.
+* :func:`should_refresh_early` implements XFetch probabilistic early
+  recomputation (Vattani et al., "Optimal Probabilistic Cache Stampede
+  Prevention"): a hit is treated as a miss with a probability that grows
+  as expiry approaches, scaled by how long the value took to compute.
+* :class:`RefreshPool` / :class:`AsyncRefreshPool` run stale-while-
+  revalidate refreshes off the request path, once per key, with bounded
+  concurrency and backlog.
+
+Cross-process coordination (a lock row in SQLite, ``SET NX`` in Redis) is
+provided by each adapter's ``_acquire_fill_lock`` / ``_release_fill_lock``.
+"""
+from __future__ import annotations
+
+import asyncio
+import collections
+import math
+import random
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Awaitable, Callable, Optional
+
+from dd_cache.models import CacheError
+
+_MAX_DURATIONS = 10_000  # recompute times remembered for early refresh
+
+
+def should_refresh_early(expires_at: float, delta: float, beta: float) -> bool:
+    """XFetch test: True if this hit should recompute ahead of *expires_at*.
+
+    *delta* is the observed recompute time in seconds and *beta* (> 0)
+    tunes eagerness; 1.0 is the paper's recommended default.
+    """
+    # -log(U) for U in (0, 1] is an Exp(1) sample.
+    return time.time() - delta * beta * math.log(1.0 - random.random()) >= expires_at
+
+
+class _Durations:
+    """Bounded map of key -> last observed recompute time."""
+
+    def __init__(self) -> None:
+        self._values: dict[str, float] = {}
+
+    def get(self, key: str) -> Optional[float]:
+        return self._values.get(key)
+
+    def record(self, key: str, seconds: float) -> None:
+        if len(self._values) >= _MAX_DURATIONS and key not in self._values:
+            self._values.pop(next(iter(self._values)))
+        self._values[key] = seconds
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls per key across threads."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: dict[str, Future] = {}
+        self.durations = _Durations()
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        """Run *fn* unless a call for *key* is already in flight, in which
+        case wait for and return (or raise) that call's outcome."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result()
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+
+class AsyncSingleFlight:
+    """Deduplicate concurrent calls per key across tasks on one event loop."""
+
+    def __init__(self) -> None:
+        self._calls: dict[str, asyncio.Future] = {}
+        self.durations = _Durations()
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._calls
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._calls.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+        future = self._calls[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            future.exception()  # mark retrieved when nobody was waiting
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._calls[key]
+
+
+class RefreshPool:
+    """Run background refreshes on at most *max_workers* daemon threads.
+
+    A key already queued or running is not queued again, and once
+    *max_backlog* refreshes are waiting new ones are dropped: the caller
+    keeps serving the stale value and a later hit resubmits.  Workers are
+    started on demand and exit when the queue is empty, so an idle pool
+    holds no threads and needs no shutdown.  *fn* must handle its own
+    errors; anything it raises is discarded.
+    """
+
+    def __init__(self, max_workers: int = 4, max_backlog: int = 256) -> None:
+        if max_workers < 1:
+            raise CacheError("max_workers must be at least 1")
+        self._max_workers = max_workers
+        self._max_backlog = max_backlog
+        self._lock = threading.Lock()
+        self._queue: collections.deque[tuple[str, Callable[[], Any]]] = collections.deque()
+        self._keys: set[str] = set()
+        self._workers = 0
+
+    @property
+    def pending(self) -> int:
+        """Refreshes queued or running."""
+        return len(self._keys)
+
+    def submit(self, key: str, fn: Callable[[], Any]) -> bool:
+        """Queue *fn* as the refresh of *key*; False if it was already
+        pending or the backlog is full."""
+        with self._lock:
+            if key in self._keys or len(self._queue) >= self._max_backlog:
+                return False
+            self._keys.add(key)
+            self._queue.append((key, fn))
+            if self._workers >= self._max_workers:
+                return True
+            self._workers += 1
+        threading.Thread(target=self._work, name="dd-cache-refresh", daemon=True).start()
+        return True
+
+    def _work(self) -> None:
+        while True:
+            with self._lock:
+                if not self._queue:
+                    self._workers -= 1
+                    return
+                key, fn = self._queue.popleft()
+            try:
+                fn()
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._keys.discard(key)
+
+
+class AsyncRefreshPool:
+    """Event-loop counterpart of :class:`RefreshPool`: each refresh is a
+    task, at most *max_workers* run at once and at most *max_backlog* more
+    wait for a slot."""
+
+    def __init__(self, max_workers: int = 4, max_backlog: int = 256) -> None:
+        if max_workers < 1:
+            raise CacheError("max_workers must be at least 1")
+        self._max_workers = max_workers
+        self._max_backlog = max_backlog
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._tasks: dict[str, asyncio.Task] = {}  # also keeps the tasks alive
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    def submit(self, key: str, fn: Callable[[], Awaitable[Any]]) -> bool:
+        if key in self._tasks or len(self._tasks) >= self._max_workers + self._max_backlog:
+            return False
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self._max_workers)
+        self._tasks[key] = asyncio.get_running_loop().create_task(self._run(key, fn))
+        return True
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            async with self._slots:  # type: ignore[union-attr]
+                await fn()
+        except Exception:
+            pass
+        finally:
+            del self._tasks[key]
+
+
+def poll_delays(timeout: float) -> Any:
+    """Yield sleep intervals (10 ms doubling to 200 ms) until *timeout*
+    seconds have elapsed; used while another process holds a fill lock."""
+    if timeout <= 0:
+        raise CacheError("lock_timeout must be positive")
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+    while time.monotonic() < deadline:
+        yield min(delay, max(deadline - time.monotonic(), 0.0))
+        delay = min(delay * 2, 0.2)
@@ -1,4 +1,8 @@
+import hashlib
 import pickle
+import struct
+import sys
+from typing import Any
 
 
 def serialize(value: object) -> bytes:
@@ -11,3 +15,98 @@ def deserialize(data: bytes) -> object:
 
 def make_key(*parts: str) -> str:
     return ":".join(parts)
+
+
+def prefix_end(prefix: str) -> str:
+    """Smallest string greater than every string starting with *prefix*, for
+    indexed ``key >= prefix AND key < prefix_end(prefix)`` range scans."""
+    stripped = prefix.rstrip(chr(sys.maxunicode))
+    if not stripped:
+        raise ValueError(f"no finite upper bound for prefix {prefix!r}")
+    return stripped[:-1] + chr(ord(stripped[-1]) + 1)
+
+
+_LEN = struct.Struct("<Q")
+
+
+def _feed(h: Any, value: Any) -> None:
+    """Feed a canonical, type-tagged encoding of *value* into hasher *h*."""
+    if value is None or value is True or value is False:
+        h.update(b"N" if value is None else b"T" if value else b"F")
+    elif isinstance(value, str):
+        data = value.encode("utf-8", "surrogatepass")
+        h.update(b"s" + _LEN.pack(len(data)))
+        h.update(data)
+    elif isinstance(value, (bytes, bytearray, memoryview)):
+        data = memoryview(value).cast("B")
+        h.update(b"b" + _LEN.pack(data.nbytes))
+        h.update(data)
+    elif isinstance(value, int):
+        h.update(b"i" + repr(value).encode() + b";")
+    elif isinstance(value, float):
+        h.update(b"f" + value.hex().encode() + b";")
+    elif isinstance(value, (list, tuple)):
+        h.update((b"l" if isinstance(value, list) else b"t") + _LEN.pack(len(value)))
+        for item in value:
+            _feed(h, item)
+    elif isinstance(value, (dict, set, frozenset)):
+        # Unordered: hash members separately and feed their sorted digests.
+        if isinstance(value, dict):
+            members = [stable_hash(k, v, digest_size=16) for k, v in value.items()]
+            h.update(b"d")
+        else:
+            members = [stable_hash(item, digest_size=16) for item in value]
+            h.update(b"S")
+        h.update(_LEN.pack(len(members)))
+        for digest in sorted(members):
+            h.update(digest.encode())
+    elif hasattr(value, "__array_interface__") and hasattr(value, "dtype"):
+        # NumPy (and friends): hash the buffer in place when contiguous.
+        h.update(b"a" + f"{value.dtype.str}{value.shape}".encode())
+        if value.dtype.hasobject:
+            h.update(pickle.dumps(value, protocol=5))
+        elif value.ndim and value.flags.c_contiguous and value.dtype.kind not in "mM":
+            h.update(memoryview(value).cast("B"))
+        else:
+            h.update(value.tobytes())  # scalars and strided views: one C-order copy
+    else:
+        h.update(b"p")
+        h.update(pickle.dumps(value, protocol=5))
+
+
+def stable_hash(*values: Any, digest_size: int = 16) -> str:
+    """Hex BLAKE2b digest of *values* that is stable across processes and
+    runs (unlike ``hash()``).
+
+    Builtin scalars and containers are encoded canonically (dict and set
+    order does not matter, ``1`` and ``1.0`` differ); bytes-like objects and
+    contiguous NumPy arrays are hashed straight from their buffers without
+    copying.  Anything else is hashed by its pickle.
+    """
+    h = hashlib.blake2b(digest_size=digest_size)
+    for value in values:
+        _feed(h, value)
+    return h.hexdigest()
+
+
+def estimate_size(value: object, _depth: int = 3) -> int:
+    """Cheap estimate of the in-memory footprint of *value* in bytes.
+
+    Recurses into lists, tuples, sets and dicts up to a small depth;
+    anything deeper (or any other object) is counted with its shallow
+    ``sys.getsizeof``.  Objects exposing ``nbytes`` (NumPy arrays) report
+    at least their buffer size.
+    """
+    size = sys.getsizeof(value)
+    nbytes = getattr(value, "nbytes", None)
+    if isinstance(nbytes, int):
+        return max(size, nbytes)
+    if _depth <= 0:
+        return size
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += estimate_size(k, _depth - 1) + estimate_size(v, _depth - 1)
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        for item in value:
+            size += estimate_size(item, _depth - 1)
+    return size
@@ -1,10 +1,14 @@
 """Shared fixtures and an abstract contract mixin for testing cache adapters."""
 from __future__ import annotations
 
+import asyncio
+import io
+import threading
 import time
 
 import pytest
 
+from dd_cache.async_base import AsyncBaseCacheAdapter
 from dd_cache.base import BaseCacheAdapter
 
 
@@ -85,6 +89,19 @@ class CacheContractMixin:
         assert s.total_keys >= 2
         cache.close()
 
+    def test_stats_operation_counters(self):
+        cache = self.make_cache()
+        cache.set("m", "v")
+        cache.get("m")
+        cache.get("missing")
+        cache.get_many(["m", "missing"])
+        cache.delete("m")
+        s = cache.stats()
+        assert (s.hits, s.misses, s.sets, s.deletes) == (2, 2, 1, 1)
+        assert s.hit_ratio == 0.5
+        assert s.latency["get"]["count"] == 2
+        cache.close()
+
     def test_get_or_set_miss_calls_fn(self):
         cache = self.make_cache()
         called = []
@@ -117,6 +134,60 @@ class CacheContractMixin:
         assert calls == []
         cache.close()
 
+    def test_get_or_set_hit_is_single_lookup(self):
+        cache = self.make_cache()
+        cache.set("one", 1)
+        cache.exists = lambda key: pytest.fail("get_or_set must not call exists()")
+        assert cache.get_or_set("one", lambda: 2) == 1
+        del cache.exists
+        cache.close()
+
+    def test_get_or_set_collapses_concurrent_misses(self):
+        cache = self.make_cache()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return "v"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_set("hot", slow)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == ["v"] * 8
+        assert calls == [1]
+        cache.close()
+
+    def test_get_or_set_propagates_errors_and_retries(self):
+        cache = self.make_cache()
+
+        def boom():
+            raise ValueError("loader failed")
+
+        with pytest.raises(ValueError):
+            cache.get_or_set("err", boom)
+        assert cache.get_or_set("err", lambda: "ok") == "ok"
+        cache.close()
+
+    def test_get_or_set_serves_stale_while_revalidating(self):
+        cache = self.make_cache()
+        cache.set("swr", "old", ttl=60)  # soft deadline already passed for stale_ttl=60
+        first = cache.get_or_set("swr", lambda: "new", ttl=5, stale_ttl=60)
+        # One-thread adapters refresh inline; the rest serve stale meanwhile.
+        assert first == ("old" if cache._thread_safe else "new")
+        deadline = time.monotonic() + 5
+        while cache.get("swr") != "new" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get_or_set("swr", lambda: "newer", ttl=5, stale_ttl=60) == "new"
+        assert cache.stats().stale_hits == 1
+        cache.close()
+
     def test_context_manager_calls_close(self):
         cache = self.make_cache()
         with cache:
@@ -138,6 +209,200 @@ class CacheContractMixin:
         assert cache.get("complex") == val
         cache.close()
 
+    def test_get_many_returns_hits_only(self):
+        cache = self.make_cache()
+        cache.set_many({"b1": 1, "b2": None, "b3": [3]})
+        assert cache.get_many(["b1", "b2", "b3", "b_missing"]) == {
+            "b1": 1, "b2": None, "b3": [3],
+        }
+        cache.close()
+
+    def test_set_many_per_key_ttl(self):
+        cache = self.make_cache()
+        cache.set_many({"t1": "a", "t2": "b"}, ttl={"t1": 60})
+        assert cache.get_many(["t1", "t2"]) == {"t1": "a", "t2": "b"}
+        cache.close()
+
+    def test_delete_many_counts_existing(self):
+        cache = self.make_cache()
+        cache.set_many({"d1": 1, "d2": 2})
+        assert cache.delete_many(["d1", "d2", "d3"]) == 2
+        assert cache.get_many(["d1", "d2"]) == {}
+        cache.close()
+
+    def test_invalidate_tags(self):
+        cache = self.make_cache()
+        cache.set("a", 1, tags=["users", "orders"])
+        cache.set("b", 2, tags=["orders"])
+        cache.set_many({"c": 3, "d": 4}, tags=["products"])
+        cache.get_or_set("e", lambda: 5, tags=["orders"])
+        cache.set("f", 6)
+        assert cache.invalidate_tags("orders") == 3
+        assert cache.get_many(["a", "b", "c", "d", "e", "f"]) == {"c": 3, "d": 4, "f": 6}
+        assert cache.invalidate_tags("users", "missing") == 0
+        assert cache.invalidate_tags("products") == 2
+        assert cache.get("f") == 6
+        cache.close()
+
+    def test_dump_and_load_round_trip(self):
+        cache = self.make_cache()
+        cache.set_many({f"d:{i}": {"i": i} for i in range(25)})
+        cache.set("e:1", "expiring", ttl=60)
+        snapshot = io.BytesIO()
+        assert cache.dump(snapshot, batch=10) == 26
+        cache.clear()
+        snapshot.seek(0)
+        assert cache.load(snapshot) == 26
+        assert cache.get("d:7") == {"i": 7} and cache.get("e:1") == "expiring"
+        prefixed = io.BytesIO()
+        assert cache.dump(prefixed, prefix="e:") == 1
+        cache.close()
+
+    def test_iter_keys_items_and_delete_prefix(self):
+        cache = self.make_cache()
+        cache.set_many({f"results:{i}": i for i in range(25)})
+        cache.set_many({"results_x": "sibling", "other:1": 1, "results:*": "glob"})
+        expected = sorted([f"results:{i}" for i in range(25)] + ["results:*"])
+        assert sorted(cache.iter_keys("results:", batch=7)) == expected
+        assert dict(cache.iter_items("results:1", batch=3)) == {f"results:{i}": i for i in [1] + list(range(10, 20))}
+        assert len(list(cache.iter_keys())) == 28
+        assert cache.delete_prefix("results:", batch=10) == 26
+        assert list(cache.iter_keys("results:")) == []
+        assert cache.get_many(["results_x", "other:1"]) == {"results_x": "sibling", "other:1": 1}
+        assert cache.delete_prefix("") == 2
+        assert list(cache.iter_keys()) == []
+        cache.close()
+
+
+class AsyncCacheContractMixin:
+    """Async counterpart of :class:`CacheContractMixin`.
+
+    Subclasses must implement ``make_cache()`` returning a fresh
+    :class:`AsyncBaseCacheAdapter`; each test drives it with ``asyncio.run``.
+    """
+
+    def make_cache(self) -> AsyncBaseCacheAdapter:  # pragma: no cover
+        raise NotImplementedError
+
+    def run(self, scenario):
+        async def main():
+            cache = self.make_cache()
+            try:
+                await scenario(cache)
+            finally:
+                await cache.close()
+
+        asyncio.run(main())
+
+    def test_set_get_delete(self):
+        async def scenario(cache):
+            await cache.set("k", "hello")
+            assert await cache.get("k") == "hello"
+            assert await cache.exists("k") is True
+            assert await cache.delete("k") is True
+            assert await cache.delete("k") is False
+            assert await cache.get("k") is None
+
+        self.run(scenario)
+
+    def test_clear_and_stats(self):
+        async def scenario(cache):
+            await cache.set("a", 1)
+            await cache.set("b", 2)
+            assert (await cache.stats()).total_keys >= 2
+            await cache.clear()
+            assert await cache.get("a") is None
+
+        self.run(scenario)
+
+    def test_invalidate_tags(self):
+        async def scenario(cache):
+            await cache.set("a", 1, tags=["t1"])
+            await cache.set_many({"b": 2, "c": 3}, tags=["t2"])
+            await cache.get_or_set("d", lambda: 4, tags=["t1"])
+            assert await cache.invalidate_tags("t1") == 2
+            assert await cache.get_many(["a", "b", "c", "d"]) == {"b": 2, "c": 3}
+            assert await cache.invalidate_tags("t2", "t3") == 2
+
+        self.run(scenario)
+
+    def test_stats_operation_counters(self):
+        async def scenario(cache):
+            await cache.set("m", "v")
+            await cache.get("m")
+            await cache.get("missing")
+            await cache.delete("m")
+            s = await cache.stats()
+            assert (s.hits, s.misses, s.sets, s.deletes) == (1, 1, 1, 1)
+
+        self.run(scenario)
+
+    def test_get_or_set_awaits_coroutine_fn(self):
+        async def scenario(cache):
+            calls = []
+
+            async def compute():
+                calls.append(1)
+                return "computed"
+
+            assert await cache.get_or_set("lazy", compute) == "computed"
+            assert await cache.get_or_set("lazy", compute) == "computed"
+            assert calls == [1]
+
+        self.run(scenario)
+
+    def test_get_or_set_sync_fn_and_none_value(self):
+        async def scenario(cache):
+            await cache.set("null_val", None)
+            calls = []
+            assert await cache.get_or_set("null_val", lambda: calls.append(1) or "x") is None
+            assert calls == []
+
+        self.run(scenario)
+
+    def test_get_or_set_collapses_concurrent_misses(self):
+        async def scenario(cache):
+            calls = []
+
+            async def slow():
+                calls.append(1)
+                await asyncio.sleep(0.05)
+                return "v"
+
+            results = await asyncio.gather(*(cache.get_or_set("hot", slow) for _ in range(10)))
+            assert results == ["v"] * 10
+            assert calls == [1]
+
+        self.run(scenario)
+
+    def test_get_or_set_serves_stale_while_revalidating(self):
+        async def scenario(cache):
+            await cache.set("swr", "old", ttl=60)
+            assert await cache.get_or_set("swr", lambda: "new", ttl=5, stale_ttl=60) == "old"
+            for _ in range(100):
+                if await cache.get("swr") == "new":
+                    break
+                await asyncio.sleep(0.01)
+            assert await cache.get_or_set("swr", lambda: "newer", ttl=5, stale_ttl=60) == "new"
+            assert (await cache.stats()).stale_hits == 1
+
+        self.run(scenario)
+
+    def test_batch_operations(self):
+        async def scenario(cache):
+            await cache.set_many({"b1": 1, "b2": None}, ttl={"b1": 60})
+            assert await cache.get_many(["b1", "b2", "b3"]) == {"b1": 1, "b2": None}
+            assert await cache.delete_many(["b1", "b2", "b3"]) == 2
+
+        self.run(scenario)
+
+    def test_async_context_manager(self):
+        async def scenario():
+            async with self.make_cache() as cache:
+                await cache.set("cm", True)
+
+        asyncio.run(scenario())
+
 
 # ------------------------------------------------------------------
 # TTL helpers used by concrete test files
@@ -150,3 +415,12 @@ def assert_ttl_expiry(cache: BaseCacheAdapter, key: str, ttl_seconds: int = 1) -
     time.sleep(ttl_seconds + 0.1)
     assert cache.get(key) is None
     assert cache.exists(key) is False
+
+
+def assert_batch_ttl_expiry(cache: BaseCacheAdapter, ttl_seconds: int = 1) -> None:
+    """set_many with a shared TTL; all keys vanish from get_many afterwards."""
+    cache.set_many({"bt1": 1, "bt2": 2}, ttl=ttl_seconds)
+    assert cache.get_many(["bt1", "bt2"]) == {"bt1": 1, "bt2": 2}
+    time.sleep(ttl_seconds + 0.1)
+    assert cache.get_many(["bt1", "bt2"]) == {}
+    assert cache.delete_many(["bt1", "bt2"]) == 0
@@ -0,0 +1,198 @@
+"""Tests for the memory-mapped ArrayCache."""
+import multiprocessing
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dd_cache.adapters.array import ArrayCache  # noqa: E402
+from dd_cache.models import CacheError  # noqa: E402
+
+
+def _read_in_child(directory, results) -> None:
+    cache = ArrayCache(directory)
+    arr = cache.get("emb")
+    results.put((type(arr).__name__, float(arr.sum())))
+    cache.close()
+
+
+class TestArrayCache:
+    @pytest.fixture(autouse=True)
+    def _tmp_dir(self, tmp_path):
+        self._dir = tmp_path / "arrays"
+
+    def make_cache(self, **kwargs) -> ArrayCache:
+        return ArrayCache(self._dir, **kwargs)
+
+    def test_roundtrip_returns_readonly_memmap(self):
+        cache = self.make_cache()
+        emb = np.random.default_rng(0).random((100, 16), dtype=np.float32)
+        cache.set("emb", emb)
+        out = cache.get("emb")
+        assert isinstance(out, np.memmap)
+        assert out.dtype == np.float32 and out.shape == (100, 16)
+        assert np.array_equal(out, emb)
+        with pytest.raises(ValueError):
+            out[0, 0] = 1.0
+        cache.close()
+
+    def test_invalidate_tags(self):
+        cache = self.make_cache()
+        cache.set("a", np.zeros(4), tags=["model-v1"])
+        cache.set("b", np.ones(4), tags=["model-v2"])
+        assert cache.invalidate_tags("model-v1") == 1
+        assert cache.get("a") is None
+        assert cache.get("b") is not None
+        cache.close()
+
+    def test_repeated_get_reuses_mapping(self):
+        cache = self.make_cache()
+        cache.set("a", np.arange(10))
+        assert cache.get("a") is cache.get("a")
+        cache.close()
+
+    def test_get_many_reads_each_key_once(self, monkeypatch):
+        cache = self.make_cache()
+        cache.set("a", np.arange(3))
+        monkeypatch.setattr(cache, "exists", lambda key: pytest.fail("get_many called exists()"))
+        found = cache.get_many(["a", "missing", "a"])
+        assert list(found) == ["a"] and np.array_equal(found["a"], np.arange(3))
+        stats = cache.stats()
+        assert (stats.hits, stats.misses) == (1, 1)
+        cache.close()
+
+    def test_miss_exists_delete_clear(self):
+        cache = self.make_cache()
+        assert cache.get("nope") is None
+        assert cache.exists("nope") is False
+        assert cache.delete("nope") is False
+        cache.set("a", np.zeros(3))
+        cache.set("b", np.ones(3))
+        assert cache.exists("a") is True
+        assert cache.delete("a") is True
+        assert cache.get("a") is None
+        cache.clear()
+        assert cache.get("b") is None
+        assert list(self._dir.glob("*/*.npy")) == []
+        cache.close()
+
+    def test_overwrite_keeps_old_view_valid(self):
+        cache = self.make_cache()
+        cache.set("a", np.full(4, 1.0))
+        old = cache.get("a")
+        cache.set("a", np.full(4, 2.0))
+        assert np.array_equal(cache.get("a"), np.full(4, 2.0))
+        assert np.array_equal(old, np.full(4, 1.0))
+        assert len(list(self._dir.glob("*/*.npy"))) == 1
+        cache.close()
+
+    def test_ttl_expires(self):
+        cache = self.make_cache()
+        cache.set("t", np.arange(3), ttl=1)
+        assert cache.get("t") is not None
+        time.sleep(1.1)
+        assert cache.get("t") is None
+        assert cache.exists("t") is False
+        cache.close()
+
+    def test_expiry_spares_entry_replaced_by_another_process(self):
+        cache = self.make_cache()
+        other = self.make_cache()
+        cache.set("t", np.arange(3), ttl=-1)
+        # Another process replaces the row after this one saw it expired.
+        other.set("t", np.ones(4))
+        cache._expire("t")
+        assert np.array_equal(cache.get("t"), np.ones(4))
+        assert len(list(self._dir.rglob("*.npy"))) == 1
+        assert cache.exists("t")
+        cache.close()
+        other.close()
+
+    def test_purge_expired(self):
+        cache = self.make_cache()
+        cache.set("t", np.arange(3), ttl=1)
+        cache.set("keep", np.arange(3))
+        time.sleep(1.1)
+        assert cache.purge_expired() == 1
+        assert cache.exists("keep")
+        cache.close()
+
+    def test_rejects_object_arrays(self):
+        cache = self.make_cache()
+        with pytest.raises(CacheError):
+            cache.set("bad", np.array([{"a": 1}], dtype=object))
+        cache.close()
+
+    def test_stats(self):
+        cache = self.make_cache()
+        cache.set("a", np.zeros(8, dtype=np.float64))
+        s = cache.stats()
+        assert s.backend == "array"
+        assert s.total_keys == 1
+        assert s.extra["bytes"] == 64
+        cache.set("a", np.zeros(4, dtype=np.float64))  # overwrite
+        cache.set_many({"b": np.zeros(2, dtype=np.int8), "c": np.zeros(2, dtype=np.int8)}, tags=["t"])
+        cache.set("gone", np.zeros(100, dtype=np.int8), ttl=-1)
+        assert cache.delete("b")
+        s = cache.stats()
+        assert (s.total_keys, s.extra["bytes"]) == (2, 34)
+        assert cache.invalidate_tags("t") == 1
+        assert (cache.stats().total_keys, cache.stats().extra["bytes"]) == (1, 32)
+        cache.close()
+
+    def test_stats_totals_seeded_for_existing_index(self):
+        cache = self.make_cache()
+        cache.set_many({"a": np.zeros(3, dtype=np.int8), "b": np.zeros(5, dtype=np.int8)})
+        with cache._transaction() as conn:
+            conn.execute("DELETE FROM arrays_meta")  # as left by an older version
+        cache.close()
+        reopened = self.make_cache()
+        assert (reopened.stats().total_keys, reopened.stats().extra["bytes"]) == (2, 8)
+        reopened.close()
+
+    def test_open_maps_bounded(self):
+        cache = self.make_cache(max_open=2)
+        for i in range(5):
+            cache.set(f"k{i}", np.arange(i + 1))
+            cache.get(f"k{i}")
+        assert cache.stats().extra["open_maps"] == 2
+        cache.close()
+
+    def test_get_or_set(self):
+        cache = self.make_cache()
+        calls = []
+        load = lambda: calls.append(1) or np.arange(5)  # noqa: E731
+        assert np.array_equal(cache.get_or_set("g", load), np.arange(5))
+        assert np.array_equal(cache.get_or_set("g", load), np.arange(5))
+        assert calls == [1]
+        cache.close()
+
+    def test_dump_and_load(self, tmp_path):
+        cache = self.make_cache()
+        cache.set_many({"a": np.arange(4), "b": np.ones((2, 3), dtype=np.float32)}, ttl=600)
+        assert cache.dump(tmp_path / "arrays.snap") == 2
+        cache.clear()
+        assert cache.load(tmp_path / "arrays.snap") == 2
+        assert np.array_equal(cache.get("b"), np.ones((2, 3), dtype=np.float32))
+        cache.close()
+
+    def test_iter_keys_and_delete_prefix(self):
+        cache = self.make_cache()
+        cache.set_many({f"emb:{i}": np.arange(i + 1) for i in range(5)})
+        cache.set("other", np.zeros(2))
+        assert list(cache.iter_keys("emb:", batch=2)) == [f"emb:{i}" for i in range(5)]
+        assert cache.delete_prefix("emb:", batch=2) == 5
+        assert cache.delete_prefix("") == 1
+        assert list(cache.iter_keys()) == [] and not any(self._dir.rglob("*.npy"))
+        cache.close()
+
+    def test_shared_across_processes(self):
+        cache = self.make_cache()
+        cache.set("emb", np.ones((64, 8), dtype=np.float32))
+        results = multiprocessing.Queue()
+        proc = multiprocessing.Process(target=_read_in_child, args=(str(self._dir), results))
+        proc.start()
+        assert results.get(timeout=30) == ("memmap", 512.0)
+        proc.join(timeout=30)
+        cache.close()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from dd_cache.adapters.async_disk import AsyncDiskCache
+from dd_cache.adapters.async_memory import AsyncInMemoryCache
+from dd_cache.async_base import AsyncBaseCacheAdapter
+from tests.conftest import AsyncCacheContractMixin
+
+
+class TestAsyncInMemoryCache(AsyncCacheContractMixin):
+    def make_cache(self) -> AsyncInMemoryCache:
+        return AsyncInMemoryCache()
+
+    def test_get_many_fallback_reads_each_key_once(self, monkeypatch):
+        async def scenario(cache):
+            await cache.set("a", None)
+            monkeypatch.setattr(cache, "exists", lambda key: pytest.fail("get_many called exists()"))
+            found = await AsyncBaseCacheAdapter.get_many(cache, ["a", "missing", "a"])
+            assert found == {"a": None}
+            stats = await cache.stats()
+            assert (stats.hits, stats.misses) == (1, 1)
+
+        self.run(scenario)
+
+    def test_kwargs_pass_through(self):
+        async def scenario(cache):
+            for i in range(10):
+                await cache.set(f"k{i}", i)
+            assert (await cache.stats()).total_keys == 2
+
+        cache = AsyncInMemoryCache(max_entries=2)
+        asyncio.run(scenario(cache))
+
+
+class TestAsyncDiskCache(AsyncCacheContractMixin):
+    @pytest.fixture(autouse=True)
+    def _tmp_db(self, tmp_path):
+        self._db_path = tmp_path / "async_cache.db"
+
+    def make_cache(self) -> AsyncDiskCache:
+        return AsyncDiskCache(self._db_path)
+
+    def test_loop_stays_responsive(self):
+        """Disk work runs in the executor while other tasks keep ticking."""
+        async def scenario(cache):
+            ticks = 0
+
+            async def ticker():
+                nonlocal ticks
+                while True:
+                    ticks += 1
+                    await asyncio.sleep(0)
+
+            task = asyncio.create_task(ticker())
+            await asyncio.gather(*(cache.set(f"k{i}", i) for i in range(50)))
+            task.cancel()
+            assert ticks > 0
+            assert len(await cache.get_many(f"k{i}" for i in range(50))) == 50
+
+        self.run(scenario)
+
+
+class TestAsyncFakeRedisCache(AsyncCacheContractMixin):
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        self._server = fakeredis.FakeServer()
+        self._fake = fakeredis.FakeAsyncRedis
+
+    def make_cache(self, **kwargs):
+        from dd_cache.adapters.async_redis import AsyncRedisCache
+        return AsyncRedisCache(client=self._fake(server=self._server), **kwargs)
+
+    def test_tag_memberships_follow_the_key(self):
+        async def scenario():
+            cache = self.make_cache(tagging=True)
+            await cache.set_many({"a": 1, "b": 2}, ttl=30, tags=["t"])
+            await cache.set("a", "untagged")
+            assert await cache.delete("b")
+            assert not await cache._client.exists("dd-cache:tag:t", "dd-cache:keytags:a")
+            await cache.set("c", 3, ttl=30, tags=["t"])
+            assert 29_000 < await cache._client.pttl("dd-cache:tag:t") <= 30_000
+            await cache.close()
+
+        asyncio.run(scenario())
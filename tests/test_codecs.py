@@ -0,0 +1,75 @@
+import pickle
+
+import pytest
+
+from dd_cache.adapters.disk import DiskCache
+from dd_cache.codecs import Codec, decode
+from dd_cache.models import CacheError
+
+VALUE = {"text": "lorem ipsum " * 500, "tokens": list(range(50)), "ok": True}
+
+
+@pytest.mark.parametrize("serializer", ["pickle", "pickle5", "marshal", "json"])
+@pytest.mark.parametrize("compression", [None, "zlib", "lzma", "bz2"])
+def test_roundtrip(serializer, compression):
+    codec = Codec(serializer, compression, threshold=64)
+    assert codec.decode(codec.encode(VALUE)) == VALUE
+
+
+def test_default_codec_writes_bare_pickle():
+    blob = Codec().encode(VALUE)
+    assert pickle.loads(blob) == VALUE
+
+
+def test_decode_reads_any_codec():
+    blobs = [Codec(s, c).encode(VALUE) for s, c in [("json", "zlib"), ("marshal", None), ("pickle", "lzma")]]
+    blobs.append(pickle.dumps(VALUE))  # legacy, headerless
+    assert all(decode(b) == VALUE for b in blobs)
+
+
+def test_compression_respects_threshold():
+    codec = Codec("pickle", "zlib", threshold=10_000)
+    small = codec.encode("x" * 100)
+    large = codec.encode("x" * 20_000)
+    assert small[1] & 0x0F == 0
+    assert large[1] & 0x0F != 0
+    assert len(large) < 1000
+
+
+def test_incompressible_payload_stored_raw():
+    import os
+    blob = Codec("pickle", "zlib", threshold=1).encode(os.urandom(4096))
+    assert blob[1] & 0x0F == 0
+
+
+def test_json_rejects_arbitrary_objects():
+    with pytest.raises(CacheError):
+        Codec("json").encode(object())
+
+
+def test_unknown_names_raise():
+    with pytest.raises(CacheError):
+        Codec("yaml")
+    with pytest.raises(CacheError):
+        Codec("pickle", "zstd")
+
+
+def test_pickle5_numpy_zero_copy():
+    np = pytest.importorskip("numpy")
+    arr = np.arange(100_000, dtype=np.float32).reshape(1000, 100)
+    codec = Codec("pickle5")
+    blob = codec.encode(arr)
+    out = codec.decode(blob)
+    np.testing.assert_array_equal(out, arr)
+    assert out.flags.writeable is False  # a view over the blob, not a copy
+
+
+def test_disk_cache_mixed_codecs(tmp_path):
+    path = tmp_path / "mixed.db"
+    with DiskCache(path) as plain:
+        plain.set("old", VALUE)
+    with DiskCache(path, codec=Codec("json", "zlib", threshold=16)) as packed:
+        packed.set("new", VALUE)
+        assert packed.get("old") == VALUE
+        assert packed.get("new") == VALUE
+        assert packed.stats().extra["codec"] == "json+zlib"
@@ -0,0 +1,152 @@
+import asyncio
+
+import pytest
+
+from dd_cache.adapters.async_memory import AsyncInMemoryCache
+from dd_cache.adapters.memory import InMemoryCache
+from dd_cache.decorators import cached
+from dd_cache.models import CacheError
+from dd_cache.utils import stable_hash
+
+
+class TestStableHash:
+    def test_stable_and_order_insensitive_for_mappings(self):
+        assert stable_hash({"a": 1, "b": [1, 2]}) == stable_hash({"b": [1, 2], "a": 1})
+        assert stable_hash({1, 2, 3}) == stable_hash({3, 2, 1})
+
+    def test_distinguishes_types(self):
+        assert stable_hash(1) != stable_hash(1.0)
+        assert stable_hash(1) != stable_hash(True)
+        assert stable_hash("1") != stable_hash(b"1")
+        assert stable_hash([1, 2]) != stable_hash((1, 2))
+        assert stable_hash(("ab", "c")) != stable_hash(("a", "bc"))
+
+    def test_numpy_arrays_hash_by_content(self):
+        np = pytest.importorskip("numpy")
+        a = np.arange(12, dtype=np.float32).reshape(3, 4)
+        assert stable_hash(a) == stable_hash(a.copy())
+        assert stable_hash(a.T) == stable_hash(np.ascontiguousarray(a.T))
+        assert stable_hash(a) != stable_hash(a.astype(np.float64))
+        assert stable_hash(a) != stable_hash(a.reshape(4, 3))
+
+
+class TestCached:
+    def test_caches_by_arguments(self):
+        cache = InMemoryCache()
+        calls = []
+
+        @cached(cache)
+        def add(x, y=1):
+            calls.append((x, y))
+            return x + y
+
+        assert add(1) == 2
+        assert add(x=1) == 2
+        assert add(1, y=1) == 2
+        assert add(2) == 3
+        assert calls == [(1, 1), (2, 1)]
+        info = add.cache_info()
+        assert (info.hits, info.misses) == (2, 2)
+        assert info.hit_ratio == 0.5
+
+    def test_keys_are_namespaced_per_function(self):
+        cache = InMemoryCache()
+
+        @cached(cache)
+        def f(x):
+            return "f"
+
+        @cached(cache)
+        def g(x):
+            return "g"
+
+        assert (f(1), g(1)) == ("f", "g")
+        assert f.cache_key(1).startswith(f"{__name__}.")
+        assert f.cache_key(1) != g.cache_key(1)
+
+    def test_custom_key_and_ttl(self):
+        cache = InMemoryCache()
+
+        @cached(cache, ttl=60, key=lambda user_id: f"user:{user_id}", prefix="users")
+        def load(user_id):
+            return {"id": user_id}
+
+        load(7)
+        assert cache.namespace("users").get("user:7") == {"id": 7}
+        assert cache.stats().ttl_enabled is True
+
+    def test_none_results_are_cached(self):
+        calls = []
+
+        @cached(InMemoryCache())
+        def nothing():
+            calls.append(1)
+
+        nothing()
+        nothing()
+        assert calls == [1]
+
+    def test_invalidate_and_cache_clear(self):
+        cache = InMemoryCache()
+        calls = []
+
+        @cached(cache)
+        def square(x):
+            calls.append(x)
+            return x * x
+
+        square(2)
+        square(3)
+        assert square.invalidate(2) is True
+        square(2)
+        square.cache_clear()
+        square(3)
+        assert calls == [2, 3, 2, 3]
+
+    def test_cache_clear_drops_only_its_namespace(self):
+        cache = InMemoryCache()
+        cache.set("other", 1)
+
+        @cached(cache, prefix="squares")
+        def square(x):
+            return x * x
+
+        square(2)
+        square.cache_clear()
+        assert cache.namespace("squares").get(square.cache_key(2)) is None
+        assert cache.get("other") == 1
+        with pytest.raises(CacheError):
+            cached(cache, prefix="a:b")(square)
+
+    def test_requires_matching_adapter(self):
+        with pytest.raises(CacheError):
+            @cached(AsyncInMemoryCache())
+            def f():
+                return 1
+
+        with pytest.raises(CacheError):
+            @cached(InMemoryCache())
+            async def g():
+                return 1
+
+    def test_async_function(self):
+        cache = AsyncInMemoryCache()
+        calls = []
+
+        @cached(cache)
+        async def fetch(x):
+            calls.append(x)
+            await asyncio.sleep(0.01)
+            return x * 10
+
+        async def main():
+            results = await asyncio.gather(*(fetch(1) for _ in range(5)))
+            assert results == [10] * 5
+            assert await fetch.invalidate(1) is True
+            assert await fetch(1) == 10
+            await fetch.cache_clear()
+            assert await cache.get(fetch.cache_key(1)) is None
+
+        asyncio.run(main())
+        assert calls == [1, 1]
+        assert fetch.cache_info().misses == 2
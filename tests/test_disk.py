@@ -1,7 +1,9 @@
+import time
+
 import pytest
 
 from dd_cache.adapters.disk import DiskCache
-from tests.conftest import CacheContractMixin, assert_ttl_expiry
+from tests.conftest import CacheContractMixin, assert_batch_ttl_expiry, assert_ttl_expiry
 
 
 class TestDiskCache(CacheContractMixin):
@@ -16,6 +18,9 @@ class TestDiskCache(CacheContractMixin):
         cache = self.make_cache()
         assert_ttl_expiry(cache, "ttl_key", ttl_seconds=1)
 
+    def test_batch_ttl_expires(self):
+        assert_batch_ttl_expiry(self.make_cache(), ttl_seconds=1)
+
     def test_stats_backend_is_disk(self):
         with self.make_cache() as cache:
             assert cache.stats().backend == "disk"
@@ -24,6 +29,28 @@ class TestDiskCache(CacheContractMixin):
         with self.make_cache() as cache:
             assert "path" in cache.stats().extra
 
+    def test_stats_purges_a_bounded_batch(self, monkeypatch):
+        monkeypatch.setattr("dd_cache.adapters.disk._STATS_PURGE_LIMIT", 2)
+        with self.make_cache() as cache:
+            cache.set_many({f"k{i}": i for i in range(5)}, ttl=1)
+            cache.set("live", 1)
+            time.sleep(1.1)
+            assert cache.stats().total_keys == 4
+            assert cache.stats().total_keys == 2
+            assert cache.purge_expired() == 1
+            assert cache.stats().total_keys == 1
+
+    def test_tags_replaced_on_overwrite_and_dropped_with_rows(self):
+        with self.make_cache() as cache:
+            cache.set("a", 1, tags=["old"])
+            cache.set("a", 2, tags=["new"])
+            assert cache.invalidate_tags("old") == 0
+            assert cache.get("a") == 2
+            cache.set("b", 3, tags=["new"], ttl=-1)
+            cache.purge_expired()
+            tagged = cache._conn.execute("SELECT key FROM cache_tags").fetchall()
+            assert tagged == [("a",)]
+
     def test_persists_across_instances(self):
         c1 = DiskCache(path=self._db_path)
         c1.set("pkey", "pval")
@@ -40,3 +67,289 @@ class TestDiskCache(CacheContractMixin):
         cache.clear()
         assert cache.stats().total_keys == 0
         cache.close()
+
+    def test_purge_expired_uses_bounded_batches(self):
+        cache = self.make_cache()
+        for i in range(10):
+            cache.set(f"short{i}", i, ttl=0)
+        cache.set("long", "v", ttl=60)
+        time.sleep(0.01)
+        assert cache.purge_expired(limit=3) == 3
+        assert cache.purge_expired() == 7
+        assert cache.get("long") == "v"
+        cache.close()
+
+    def test_background_sweeper(self):
+        cache = DiskCache(path=self._db_path, active_expiry=True, sweep_interval=0.05)
+        for i in range(20):
+            cache.set(f"k{i}", i, ttl=0)
+        time.sleep(0.4)
+        count = cache._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        assert count == 0
+        assert cache.stats().extra["swept"] == 20
+        cache.close()
+
+    def test_max_entries_evicts_least_recently_used(self):
+        cache = DiskCache(path=self._db_path, max_entries=10, access_resolution=0)
+        for i in range(10):
+            cache.set(f"k{i}", i)
+        assert cache.get("k0") == 0  # refreshes k0's access time
+        cache.set_many({"n1": 1, "n2": 2})
+        stats = cache.stats()
+        assert stats.total_keys == 10 and stats.evictions == 2
+        assert cache.exists("k0")
+        assert not cache.exists("k1") and not cache.exists("k2")
+        cache.close()
+
+    def test_max_bytes_prefers_expired_rows(self):
+        blob = b"x" * 1000
+        cache = DiskCache(path=self._db_path, max_bytes=20_000)
+        cache.set("expired", blob, ttl=-1)
+        for i in range(25):
+            cache.set(f"k{i}", blob)
+        stats = cache.stats()
+        assert stats.extra["bytes"] <= 20_000
+        assert stats.expirations == 1
+        assert cache.get("k24") == blob
+        cache.close()
+
+    def test_freed_pages_are_returned(self):
+        cache = DiskCache(path=self._db_path, journal_mode="delete")
+        assert cache._conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2  # incremental
+        cache.set_many({f"k{i}": b"x" * 4000 for i in range(500)}, ttl=-1)
+        pages = cache._conn.execute("PRAGMA page_count").fetchone()[0]
+        cache.purge_expired()
+        assert cache._conn.execute("PRAGMA page_count").fetchone()[0] < pages
+        cache.close()
+
+    def test_upgrades_files_without_size_column(self):
+        import sqlite3
+
+        from dd_cache.codecs import DEFAULT_CODEC
+
+        conn = sqlite3.connect(self._db_path)
+        conn.execute("CREATE TABLE cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL)")
+        conn.execute("INSERT INTO cache VALUES ('old', ?, NULL)", (DEFAULT_CODEC.encode("v"),))
+        conn.commit()
+        conn.close()
+        with DiskCache(path=self._db_path, max_entries=1) as cache:
+            assert cache.get("old") == "v"
+            assert cache.stats().extra["bytes"] > 0
+            cache.set("new", 1)  # the legacy row is the least recently used
+            assert cache.get("old") is None and cache.get("new") == 1
+
+    def test_get_or_set_waits_for_other_process_fill(self):
+        import threading
+
+        owner = self.make_cache()
+        waiter = self.make_cache()
+        assert owner._acquire_fill_lock("shared", timeout=5)
+        assert waiter._acquire_fill_lock("shared", timeout=5) is False
+
+        def fill():
+            time.sleep(0.2)
+            owner.set("shared", "from-owner")
+            owner._release_fill_lock("shared")
+
+        t = threading.Thread(target=fill)
+        t.start()
+        calls = []
+        assert waiter.get_or_set("shared", lambda: calls.append(1) or "mine") == "from-owner"
+        t.join()
+        assert calls == []
+        owner.close()
+        waiter.close()
+
+    def test_stale_fill_lock_expires(self):
+        owner = self.make_cache()
+        assert owner._acquire_fill_lock("k", timeout=0.05)
+        time.sleep(0.1)
+        other = self.make_cache()
+        assert other._acquire_fill_lock("k", timeout=5)
+        owner.close()
+        other.close()
+
+    def test_key_scans_page_in_key_order_and_skip_expired(self):
+        with self.make_cache() as cache:
+            cache.set_many({f"job:{i:03}": i for i in range(50)})
+            cache.set("job:dead", "x", ttl=-1)
+            pages = list(cache._scan_keys("job:", 20))
+            assert [len(p) for p in pages] == [20, 20, 10]
+            assert [k for p in pages for k in p] == [f"job:{i:03}" for i in range(50)]
+            assert cache.delete_prefix("job:0", batch=7) == 50
+            assert list(cache.iter_keys()) == []
+
+
+class TestDiskCacheWriteBehind(CacheContractMixin):
+    @pytest.fixture(autouse=True)
+    def _tmp_db(self, tmp_path):
+        self._db_path = tmp_path / "wb_cache.db"
+
+    def make_cache(self) -> DiskCache:
+        return DiskCache(
+            path=self._db_path, journal_mode="wal", synchronous="normal",
+            write_behind=True, flush_interval=60, flush_ops=100,
+        )
+
+    def _row_count(self) -> int:
+        import sqlite3
+        conn = sqlite3.connect(str(self._db_path))
+        try:
+            return conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        finally:
+            conn.close()
+
+    def test_ttl_expires(self):
+        cache = self.make_cache()
+        assert_ttl_expiry(cache, "ttl_key", ttl_seconds=1)
+
+    def test_reads_see_unflushed_writes(self):
+        cache = self.make_cache()
+        cache.set("a", 1)
+        assert self._row_count() == 0
+        assert cache.get("a") == 1
+        assert cache.exists("a") is True
+        assert cache.get_many(["a"]) == {"a": 1}
+        cache.delete("a")
+        assert cache.get("a") is None
+        cache.close()
+
+    def test_flush_on_op_threshold(self):
+        cache = self.make_cache()
+        for i in range(100):
+            cache.set(f"k{i}", i)
+        assert self._row_count() == 100
+        cache.close()
+
+    def test_close_flushes(self):
+        cache = self.make_cache()
+        cache.set("durable", "yes")
+        cache.close()
+        with DiskCache(path=self._db_path) as reopened:
+            assert reopened.get("durable") == "yes"
+
+    def test_background_flush(self):
+        cache = DiskCache(path=self._db_path, write_behind=True, flush_interval=0.02)
+        cache.set("x", 1)
+        time.sleep(0.3)
+        assert self._row_count() == 1
+        cache.close()
+
+    def test_wal_mode_enabled(self):
+        cache = self.make_cache()
+        mode = cache._conn.execute("PRAGMA journal_mode").fetchone()[0]
+        assert mode == "wal"
+        cache.close()
+
+    def test_rejects_unknown_pragmas(self):
+        from dd_cache.models import CacheError
+        with pytest.raises(CacheError):
+            DiskCache(path=self._db_path, synchronous="sometimes")
+
+
+
+class TestDiskCacheDedup(CacheContractMixin):
+    @pytest.fixture(autouse=True)
+    def _tmp_db(self, tmp_path):
+        self._db_path = tmp_path / "dedup_cache.db"
+
+    def make_cache(self) -> DiskCache:
+        return DiskCache(path=self._db_path, dedup=True)
+
+    def _blob_refs(self, cache: DiskCache) -> list[int]:
+        return [row[0] for row in cache._conn.execute("SELECT refs FROM cache_blobs ORDER BY refs")]
+
+    def test_identical_values_stored_once(self):
+        completion = "the same long completion " * 100
+        with self.make_cache() as cache:
+            cache.set_many({f"prompt{i}": completion for i in range(50)})
+            cache.set("small", "x")  # below the dedup threshold, kept inline
+            stats = cache.stats()
+            assert stats.extra["blobs"] == 1
+            assert stats.extra["bytes"] > 50 * stats.extra["blob_bytes"] - 100
+            assert self._blob_refs(cache) == [50]
+            assert cache.get_many(["prompt0", "prompt49", "small"]) == {
+                "prompt0": completion, "prompt49": completion, "small": "x",
+            }
+
+    def test_unreferenced_blobs_are_collected(self):
+        a, b = "a" * 500, "b" * 500
+        with self.make_cache() as cache:
+            cache.set_many({"k1": a, "k2": a, "k3": b})
+            cache.set("k3", a)  # b loses its last reference
+            assert self._blob_refs(cache) == [3]
+            assert cache.delete("k1")
+            cache.delete_many(["k2", "k3"])
+            assert cache.stats().extra["blobs"] == 0
+            cache.set("k4", a, tags=["t"])
+            cache.invalidate_tags("t")
+            assert self._blob_refs(cache) == []
+
+    def test_orphans_reused_before_collection(self):
+        value = "v" * 500
+        with self.make_cache() as cache:
+            cache.set("k", value, ttl=-1)
+            assert cache.get("k") is None  # expires the row, orphaning the blob
+            cache.set("again", value)
+            assert self._blob_refs(cache) == [1]
+            cache.clear()
+            assert cache.stats().extra["blob_bytes"] == 0
+
+    def test_files_shared_with_non_dedup_writers(self):
+        value = "shared value " * 50
+        with self.make_cache() as dedup, DiskCache(path=self._db_path) as plain:
+            dedup.set("k", value)
+            assert plain.get("k") == value
+            plain.set("k", value + "!")  # stored inline, dropping the blob reference
+            assert dedup.get("k") == value + "!"
+            plain.purge_expired()  # any writer collects orphaned blobs
+            assert dedup.stats().extra["blobs"] == 0
+
+
+class TestDiskCacheKeyFilter(CacheContractMixin):
+    @pytest.fixture(autouse=True)
+    def _tmp_db(self, tmp_path):
+        self._db_path = tmp_path / "filtered_cache.db"
+
+    def make_cache(self, **kwargs) -> DiskCache:
+        return DiskCache(path=self._db_path, key_filter=True, **kwargs)
+
+    def test_absent_keys_skip_the_database(self):
+        with self.make_cache() as cache:
+            cache.set_many({f"k{i}": i for i in range(100)})
+            assert [cache.get(f"absent{i}") for i in range(1000)] == [None] * 1000
+            assert not cache.exists("absent")
+            assert cache.get_many(["k1", "absent", "k99"]) == {"k1": 1, "k99": 99}
+            flt = cache.stats().extra["filter"]
+            assert flt["checks"] == 1004
+            assert flt["skipped"] + flt["false_positives"] == 1002
+            assert flt["false_positive_rate"] < 0.05
+
+    def test_filter_built_from_existing_file(self):
+        with DiskCache(path=self._db_path) as plain:
+            plain.set_many({f"k{i}": i for i in range(50)})
+        with self.make_cache() as cache:
+            assert all(cache.get(f"k{i}") == i for i in range(50))
+            assert cache.stats().extra["filter"]["false_positives"] == 0
+
+    def test_write_behind_buffer_is_visible(self):
+        with self.make_cache(write_behind=True) as cache:
+            cache.set("k", "v")
+            cache.rebuild_filter()  # runs before the buffer is flushed
+            assert cache.get("k") == "v"
+
+    def test_bulk_removals_trigger_rebuild(self):
+        with self.make_cache(filter_capacity=1024) as cache:
+            for _ in range(3):
+                cache.set_many({f"k{i}": i for i in range(800)}, tags=["batch"])
+                cache.invalidate_tags("batch")
+            assert cache.stats().extra["filter"]["rebuilds"] >= 2
+            assert cache.get("k1") is None
+            cache.set("k1", "back")
+            assert cache.get("k1") == "back"
+
+    def test_rebuild_requires_filter(self):
+        from dd_cache.models import CacheError
+        with DiskCache(path=self._db_path) as plain:
+            with pytest.raises(CacheError):
+                plain.rebuild_filter()
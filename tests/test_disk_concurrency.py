@@ -0,0 +1,117 @@
+"""Stress tests: many threads and processes hammering one DiskCache file.
+
+These check correctness only (no lock errors, every write visible after).
+Throughput scaling over one shared file is measured by the benchmark::
+
+    python benchmarks/bench_adapters.py --adapters disk --mode processes --workers 1,2,4,8
+"""
+import multiprocessing
+import threading
+
+import pytest
+
+from dd_cache.adapters.disk import DiskCache
+
+OPS_PER_WORKER = 300
+
+
+def _hammer(path: str, worker: int, ops: int = OPS_PER_WORKER) -> int:
+    """Mixed read/write workload; returns the number of completed ops."""
+    cache = DiskCache(path, synchronous="normal")
+    done = 0
+    try:
+        for i in range(ops):
+            key = f"w{worker}:k{i % 50}"
+            if i % 4 == 0:
+                cache.set(key, {"worker": worker, "i": i})
+            else:
+                cache.get(key)
+            done += 1
+        cache.set(f"w{worker}:done", done)
+    finally:
+        cache.close()
+    return done
+
+
+def _process_worker(path: str, worker: int, results) -> None:
+    results.put(_hammer(path, worker))
+
+
+def _run_threads(path: str, workers: int, shared: bool) -> None:
+    errors: list[BaseException] = []
+    cache = DiskCache(path, synchronous="normal") if shared else None
+
+    def run(worker: int) -> None:
+        try:
+            if cache is None:
+                _hammer(path, worker)
+                return
+            for i in range(OPS_PER_WORKER):
+                key = f"w{worker}:k{i % 50}"
+                if i % 4 == 0:
+                    cache.set(key, i)
+                else:
+                    cache.get(key)
+            cache.set(f"w{worker}:done", OPS_PER_WORKER)
+        except BaseException as exc:  # pragma: no cover - surfaced below
+            errors.append(exc)
+
+    threads = [threading.Thread(target=run, args=(w,)) for w in range(workers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    if cache is not None:
+        cache.close()
+    assert errors == []
+
+
+@pytest.mark.parametrize("workers", [1, 4, 8])
+def test_shared_instance_across_threads(tmp_path, workers):
+    path = str(tmp_path / "shared.db")
+    _run_threads(path, workers, shared=True)
+    with DiskCache(path) as cache:
+        for w in range(workers):
+            assert cache.get(f"w{w}:done") == OPS_PER_WORKER
+        assert cache.stats().extra["connections"] >= 1
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_instance_per_thread(tmp_path, workers):
+    path = str(tmp_path / "per_thread.db")
+    _run_threads(path, workers, shared=False)
+    with DiskCache(path) as cache:
+        for w in range(workers):
+            assert cache.get(f"w{w}:done") == OPS_PER_WORKER
+
+
+@pytest.mark.parametrize("workers", [1, 4])
+def test_processes_share_one_file(tmp_path, workers):
+    path = str(tmp_path / "multiproc.db")
+    DiskCache(path).close()  # create schema + WAL before the workers race
+    results = multiprocessing.Queue()
+    procs = [
+        multiprocessing.Process(target=_process_worker, args=(path, w, results))
+        for w in range(workers)
+    ]
+    for p in procs:
+        p.start()
+    done = [results.get(timeout=60) for _ in procs]
+    for p in procs:
+        p.join(timeout=60)
+        assert p.exitcode == 0
+    assert done == [OPS_PER_WORKER] * workers
+    with DiskCache(path) as cache:
+        for w in range(workers):
+            assert cache.get(f"w{w}:done") == OPS_PER_WORKER
+
+
+def test_dead_thread_connections_are_reclaimed(tmp_path):
+    cache = DiskCache(tmp_path / "reclaim.db")
+    for _ in range(5):
+        t = threading.Thread(target=cache.get, args=("k",))
+        t.start()
+        t.join()
+    cache.get("k")  # opening from a new thread prunes the dead ones
+    assert cache.stats().extra["connections"] <= 2
+    cache.close()
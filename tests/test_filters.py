@@ -0,0 +1,65 @@
+"""Tests for the counting Bloom filter behind ``key_filter=True``."""
+import pytest
+
+from dd_cache.filters import CountingBloomFilter, KeyFilter
+from dd_cache.models import CacheError
+
+
+class TestCountingBloomFilter:
+    def test_no_false_negatives_and_bounded_false_positives(self):
+        flt = CountingBloomFilter(10_000, 0.01)
+        for i in range(10_000):
+            flt.add(f"key{i}")
+        assert all(f"key{i}" in flt for i in range(10_000))
+        false = sum(f"other{i}" in flt for i in range(10_000))
+        assert false < 300
+        assert flt.nbytes < 10_000 * 10 + 64
+
+    def test_remove_undoes_add(self):
+        flt = CountingBloomFilter(100)
+        flt.add("a")
+        flt.add("b")
+        flt.remove("a")
+        assert "a" not in flt and "b" in flt
+        flt.clear()
+        assert "b" not in flt
+
+    def test_rejects_bad_parameters(self):
+        with pytest.raises(CacheError):
+            CountingBloomFilter(0)
+        with pytest.raises(CacheError):
+            CountingBloomFilter(10, error_rate=1.5)
+
+
+class TestKeyFilter:
+    def test_rebuild_keeps_concurrent_adds(self):
+        flt = KeyFilter()
+
+        def keys():
+            yield "old"
+            flt.add("written-during-rebuild")
+
+        flt.rebuild(keys(), 1)
+        assert flt.might_contain("old")
+        assert flt.might_contain("written-during-rebuild")
+        assert flt.stats()["rebuilds"] == 1
+
+    def test_due_after_inserts_or_stale_entries(self):
+        flt = KeyFilter(capacity=1024)
+        flt.add_many(f"k{i}" for i in range(1024))
+        assert not flt.due
+        flt.add("one-more")
+        assert flt.due
+        flt.rebuild([], 0)
+        flt.mark_stale(513)
+        assert flt.due
+
+    def test_stats_count_skips_and_false_positives(self):
+        flt = KeyFilter()
+        flt.add("present")
+        assert flt.might_contain("present")
+        assert not flt.might_contain("absent")
+        flt.missed()
+        stats = flt.stats()
+        assert (stats["checks"], stats["skipped"], stats["false_positives"]) == (2, 1, 1)
+        assert stats["false_positive_rate"] == 0.5
@@ -1,9 +1,11 @@
+import threading
 import time
 
 import pytest
 
-from dd_cache.adapters.memory import InMemoryCache
-from tests.conftest import CacheContractMixin, assert_ttl_expiry
+from dd_cache.adapters.memory import ConcurrentInMemoryCache, InMemoryCache
+from dd_cache.models import CacheError
+from tests.conftest import CacheContractMixin, assert_batch_ttl_expiry, assert_ttl_expiry
 
 
 class TestInMemoryCache(CacheContractMixin):
@@ -14,6 +16,9 @@ class TestInMemoryCache(CacheContractMixin):
         cache = self.make_cache()
         assert_ttl_expiry(cache, "ttl_key", ttl_seconds=1)
 
+    def test_batch_ttl_expires(self):
+        assert_batch_ttl_expiry(self.make_cache(), ttl_seconds=1)
+
     def test_ttl_not_expired_yet(self):
         cache = self.make_cache()
         cache.set("alive", "yes", ttl=60)
@@ -37,7 +42,329 @@ class TestInMemoryCache(CacheContractMixin):
         assert s.total_keys == 1
         cache.close()
 
+    def test_stats_purges_a_bounded_batch(self, monkeypatch):
+        monkeypatch.setattr("dd_cache.adapters.memory._STATS_PURGE_LIMIT", 2)
+        cache = self.make_cache()
+        cache.set_many({f"k{i}": i for i in range(5)}, ttl=1)
+        cache.set("live", 1)
+        time.sleep(1.1)
+        assert cache.stats().total_keys == 4
+        assert cache.stats().total_keys == 2
+        assert cache.purge_expired() == 1
+        assert cache.stats().total_keys == 1
+
     def test_stats_backend_is_memory(self):
         cache = self.make_cache()
         assert cache.stats().backend == "memory"
         cache.close()
+
+    def test_iteration_tolerates_writes_between_batches(self):
+        cache = self.make_cache()
+        cache.set_many({f"k{i}": i for i in range(6)})
+        seen = []
+        for key, value in cache.iter_items("k", batch=2):
+            seen.append(key)
+            cache.delete("k5")
+            cache.set(f"new{value}", value)
+        assert seen == ["k0", "k1", "k2", "k3", "k4"]
+
+    def test_delete_prefix_counts_only_removed_keys(self):
+        cache = self.make_cache()
+        cache.set_many({f"k{i}": i for i in range(5)})
+        steps = cache._delete_prefix("k", 2)
+        assert next(steps) == 2
+        cache.delete("k4")
+        assert sum(steps) == 2
+        assert list(cache.iter_keys()) == []
+
+
+class TestBoundedInMemoryCache(CacheContractMixin):
+    def make_cache(self) -> InMemoryCache:
+        return InMemoryCache(max_entries=100)
+
+    def test_lru_evicts_least_recently_used(self):
+        cache = InMemoryCache(max_entries=2, policy="lru")
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        assert cache.exists("a") is True
+        assert cache.exists("b") is False
+        assert cache.stats().extra["evictions"] == 1
+
+    def test_lfu_evicts_least_frequently_used(self):
+        cache = InMemoryCache(max_entries=2, policy="lfu")
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.get("a")
+        cache.get("b")
+        cache.set("c", 3)
+        assert cache.exists("a") is True
+        assert cache.exists("b") is False
+
+    def test_lfu_victim_after_removing_least_frequent(self):
+        cache = InMemoryCache(max_entries=3, policy="lfu")
+        cache.set_many({"a": 1, "b": 2, "c": 3})
+        for key, hits in (("a", 1), ("b", 3), ("c", 2)):
+            for _ in range(hits):
+                cache.get(key)
+        cache.delete("a")
+        cache.set("d", 4)
+        cache.get("d")
+        cache.set("e", 5)  # evicts d, now the least frequent
+        assert [cache.exists(k) for k in "bcde"] == [True, True, False, True]
+        cache.delete("e")
+        cache.set("f", 6)
+        cache.set("g", 7)  # evicts f, the newest key at the lowest frequency
+        assert [cache.exists(k) for k in "bcfg"] == [True, True, False, True]
+
+    def test_tinylfu_keeps_hot_keys(self):
+        cache = InMemoryCache(max_entries=50, policy="tinylfu")
+        for _ in range(5):
+            for i in range(10):
+                cache.set(f"hot{i}", i)
+                cache.get(f"hot{i}")
+        for i in range(500):
+            cache.set(f"cold{i}", i)
+        assert len(cache._store) <= 50
+        assert sum(cache.exists(f"hot{i}") for i in range(10)) == 10
+
+    def test_max_bytes_budget(self):
+        cache = InMemoryCache(max_bytes=1000, sizeof=lambda v: 100)
+        for i in range(20):
+            cache.set(f"k{i}", i)
+        extra = cache.stats().extra
+        assert extra["bytes"] <= 1000
+        assert cache.stats().total_keys == 10
+        assert extra["evictions"] == 10
+
+    def test_value_larger_than_budget_is_rejected(self):
+        cache = InMemoryCache(max_bytes=10, sizeof=len)
+        cache.set("big", "x" * 50)
+        assert cache.exists("big") is False
+        assert cache.stats().extra["bytes"] == 0
+        assert cache.stats().extra["evictions"] == 0
+        cache.set("big", "x")
+        cache.set("big", "x" * 50)
+        assert cache.stats().extra["evictions"] == 1
+
+    def test_delete_releases_bytes(self):
+        cache = InMemoryCache(max_bytes=1000, sizeof=lambda v: 100)
+        cache.set("a", 1)
+        cache.delete("a")
+        assert cache.stats().extra["bytes"] == 0
+
+    def test_unknown_policy_raises(self):
+        from dd_cache.models import CacheError
+        with pytest.raises(CacheError):
+            InMemoryCache(max_entries=1, policy="fifo-ish")
+
+    def test_tag_index_follows_overwrites_and_evictions(self):
+        cache = InMemoryCache(max_entries=2)
+        cache.set("a", 1, tags=["old"])
+        cache.set("a", 2, tags=["new"])
+        assert cache.invalidate_tags("old") == 0
+        cache.set("b", 3, tags=["new"])
+        cache.set("c", 4)  # evicts "a"
+        assert cache._tags == {"new": {"b"}}
+        assert cache.invalidate_tags("new") == 1
+        assert cache._key_tags == {}
+
+
+class TestConcurrentInMemoryCache(CacheContractMixin):
+    def make_cache(self) -> ConcurrentInMemoryCache:
+        return ConcurrentInMemoryCache(shards=8)
+
+    def test_ttl_expires(self):
+        cache = self.make_cache()
+        assert_ttl_expiry(cache, "ttl_key", ttl_seconds=1)
+
+    def test_stats_sum_across_shards(self):
+        cache = self.make_cache()
+        for i in range(100):
+            cache.set(f"k{i}", i)
+        s = cache.stats()
+        assert s.total_keys == 100
+        assert s.extra["shards"] == 8
+        cache.clear()
+        assert cache.stats().total_keys == 0
+
+    def test_limits_split_across_shards(self):
+        cache = ConcurrentInMemoryCache(shards=4, max_entries=40)
+        for i in range(1000):
+            cache.set(f"k{i}", i)
+        s = cache.stats()
+        assert s.total_keys <= 40
+        assert s.extra["evictions"] >= 960
+
+    def test_rejects_policy_instance(self):
+        from dd_cache.eviction import LRUPolicy
+        from dd_cache.models import CacheError
+        with pytest.raises(CacheError):
+            ConcurrentInMemoryCache(max_entries=10, policy=LRUPolicy())
+
+    def test_parallel_readers_and_writers(self):
+        cache = ConcurrentInMemoryCache(shards=4, max_entries=500)
+        errors = []
+
+        def worker(tid):
+            try:
+                for i in range(2000):
+                    key = f"k{(tid * 7 + i) % 300}"
+                    cache.set(key, i)
+                    cache.get(key)
+                    if i % 50 == 0:
+                        cache.delete(key)
+            except Exception as exc:  # pragma: no cover - surfaced below
+                errors.append(exc)
+
+        threads = [threading.Thread(target=worker, args=(t,)) for t in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert errors == []
+        assert cache.stats().total_keys <= 300
+
+
+class TestActiveExpiry:
+    def test_purge_expired_removes_untouched_keys(self):
+        cache = InMemoryCache(active_expiry=True, sweep_interval=None)
+        for i in range(10):
+            cache.set(f"short{i}", i, ttl=0)
+        cache.set("long", "v", ttl=60)
+        time.sleep(0.01)
+        assert cache.purge_expired(limit=4) == 4
+        assert cache.purge_expired() == 6
+        assert len(cache._store) == 1
+
+    def test_overwrite_invalidates_old_deadline(self):
+        cache = InMemoryCache(active_expiry=True, sweep_interval=None)
+        cache.set("k", 1, ttl=0)
+        cache.set("k", 2, ttl=60)
+        time.sleep(0.01)
+        assert cache.purge_expired() == 0
+        assert cache.get("k") == 2
+
+    def test_background_sweeper(self):
+        cache = InMemoryCache(active_expiry=True, sweep_interval=0.05)
+        for i in range(50):
+            cache.set(f"k{i}", i, ttl=0)
+        time.sleep(0.3)
+        assert len(cache._store) == 0
+        assert cache.stats().extra["swept"] == 50
+        cache.close()
+
+    def test_stats_counts_live_keys_without_scan(self):
+        cache = InMemoryCache(active_expiry=True, sweep_interval=None)
+        cache.set("live", "v")
+        cache.set("dead", "v", ttl=0)
+        time.sleep(0.01)
+        assert cache.stats().total_keys == 1
+
+    def test_concurrent_cache_sweeps_all_shards(self):
+        cache = ConcurrentInMemoryCache(shards=4, active_expiry=True, sweep_interval=0.05)
+        for i in range(40):
+            cache.set(f"k{i}", i, ttl=0)
+        cache.set("keep", 1)
+        time.sleep(0.3)
+        assert sum(len(s._store) for s in cache._shards) == 1
+        cache.close()
+
+
+class TestEarlyRefresh:
+    def test_hot_key_recomputed_before_expiry(self):
+        cache = InMemoryCache()
+        values = iter(["first", "second"])
+        assert cache.get_or_set("k", lambda: next(values), ttl=60, early_refresh=1.0) == "first"
+        # A huge beta makes the XFetch draw always fire for this key.
+        assert cache.get_or_set("k", lambda: next(values), ttl=60, early_refresh=1e12) == "second"
+        assert cache.get("k") == "second"
+
+    def test_no_early_refresh_without_beta(self):
+        cache = InMemoryCache()
+        cache.get_or_set("k", lambda: "first", ttl=60)
+        assert cache.get_or_set("k", lambda: "second", ttl=60) == "first"
+
+    def test_unknown_compute_time_never_refreshes_early(self):
+        cache = InMemoryCache()
+        cache.set("k", "stored", ttl=60)
+        assert cache.get_or_set("k", lambda: "new", ttl=60, early_refresh=1e12) == "stored"
+
+
+class TestStaleWhileRevalidate:
+    def test_refreshes_once_in_background(self):
+        cache = ConcurrentInMemoryCache()
+        cache.set("k", "old", ttl=60)
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            release.wait(5)
+            return "new"
+
+        for _ in range(5):
+            assert cache.get_or_set("k", slow, ttl=1, stale_ttl=60) == "old"
+        assert started.wait(5)
+        release.set()
+        deadline = time.monotonic() + 5
+        while cache.get("k") != "new" and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.get("k") == "new"
+        assert calls == [1]
+        assert cache.stats().stale_hits == 5
+
+    def test_failed_refresh_keeps_stale_value(self):
+        cache = ConcurrentInMemoryCache()
+        cache.set("k", "old", ttl=60)
+
+        def boom():
+            raise RuntimeError("backend down")
+
+        assert cache.get_or_set("k", boom, ttl=1, stale_ttl=60) == "old"
+        deadline = time.monotonic() + 5
+        while cache.stats().refresh_failures == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert cache.stats().refresh_failures == 1
+        assert cache.get("k") == "old"
+
+    def test_values_stored_for_ttl_plus_stale_ttl(self):
+        cache = InMemoryCache()
+        cache.get_or_set("k", lambda: "v", ttl=1, stale_ttl=1)
+        time.sleep(1.1)
+        assert cache.get("k") == "v"  # stale, but within the hard TTL
+        assert cache.get_or_set("k", lambda: "fresh", ttl=1, stale_ttl=1) == "fresh"
+        with pytest.raises(CacheError):
+            cache.get_or_set("other", lambda: 1, stale_ttl=5)
+
+    def test_wrappers_over_single_thread_cache_refresh_inline(self):
+        from dd_cache.adapters.tiered import TieredCache
+
+        for cache in (InMemoryCache().namespace("x"), TieredCache(InMemoryCache(), l1=InMemoryCache())):
+            assert not cache._thread_safe
+            cache.set("k", "old", ttl=60)
+            threads = []
+            value = cache.get_or_set(
+                "k", lambda: threads.append(threading.current_thread()) or "new", ttl=1, stale_ttl=60,
+            )
+            assert value == "new"
+            assert threads == [threading.current_thread()]
+
+    def test_refresh_pool_bounds_backlog(self):
+        from dd_cache.stampede import RefreshPool
+
+        pool = RefreshPool(max_workers=1, max_backlog=1)
+        release = threading.Event()
+        assert pool.submit("a", lambda: release.wait(5))
+        assert not pool.submit("a", lambda: None)  # already pending
+        time.sleep(0.05)
+        assert pool.submit("b", lambda: None)
+        assert not pool.submit("c", lambda: None)  # backlog full
+        release.set()
+        deadline = time.monotonic() + 5
+        while pool.pending and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert pool.pending == 0
@@ -0,0 +1,81 @@
+from dd_cache.adapters.disk import DiskCache
+from dd_cache.adapters.memory import InMemoryCache
+from dd_cache.metrics import LatencyHistogram, Metrics, MetricsSink, prometheus_text
+
+
+class RecordingSink(MetricsSink):
+    def __init__(self):
+        self.counts = []
+        self.timings = []
+
+    def count(self, name, value):
+        self.counts.append((name, value))
+
+    def timing(self, op, seconds):
+        self.timings.append(op)
+
+
+def test_histogram_quantiles_bound_observations():
+    hist = LatencyHistogram()
+    for _ in range(99):
+        hist.observe(0.000_010)   # 10 µs
+    hist.observe(0.5)
+    assert hist.count == 100
+    assert 10e-6 <= hist.quantile(0.5) < 20e-6
+    assert hist.quantile(0.999) >= 0.5
+
+
+def test_sink_receives_counts_and_timings():
+    cache = InMemoryCache()
+    sink = RecordingSink()
+    cache.metrics.add_sink(sink)
+    cache.set("k", 1)
+    cache.get("k")
+    assert ("sets", 1) in sink.counts
+    assert ("hits", 1) in sink.counts
+    assert sink.timings == ["set", "get"]
+    cache.metrics.remove_sink(sink)
+    cache.get("k")
+    assert sink.timings == ["set", "get"]
+
+
+def test_evictions_and_expirations_are_counted():
+    cache = InMemoryCache(max_entries=2)
+    for i in range(4):
+        cache.set(f"k{i}", i)
+    cache.set("short", 1, ttl=-1)
+    cache.get("short")
+    s = cache.stats()
+    assert s.evictions >= 2
+    assert s.expirations == 1
+
+
+def test_disk_counts_serialised_bytes(tmp_path):
+    cache = DiskCache(tmp_path / "c.db")
+    cache.set("k", "x" * 1000)
+    cache.get("k")
+    s = cache.stats()
+    assert s.bytes_in >= 1000
+    assert s.bytes_out == s.bytes_in
+    cache.close()
+
+
+def test_disk_row_count_survives_overwrites_and_reopen(tmp_path):
+    path = tmp_path / "c.db"
+    cache = DiskCache(path)
+    cache.set_many({"a": 1, "b": 2})
+    cache.set("a", 3)
+    cache.delete("b")
+    cache.set("gone", 1, ttl=-1)
+    assert cache.stats().total_keys == 1
+    cache.close()
+    assert DiskCache(path).stats().total_keys == 1
+
+
+def test_prometheus_text_exposes_counters_and_histograms():
+    metrics = Metrics()
+    metrics.lookup(True, 0.001)
+    text = prometheus_text(metrics, labels={"cache": "llm"})
+    assert 'dd_cache_hits_total{cache="llm"} 1' in text
+    assert 'dd_cache_op_seconds_count{cache="llm",op="get"} 1' in text
+    assert 'le="+Inf"' in text
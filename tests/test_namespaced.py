@@ -0,0 +1,77 @@
+import pytest
+
+from dd_cache.adapters.disk import DiskCache
+from dd_cache.adapters.memory import ConcurrentInMemoryCache, InMemoryCache
+from dd_cache.adapters.namespaced import NamespacedCache
+from dd_cache.adapters.tiered import TieredCache
+from dd_cache.models import CacheError
+from dd_cache.utils import prefix_end
+from tests.conftest import CacheContractMixin
+
+
+class TestNamespacedCache(CacheContractMixin):
+    def make_cache(self) -> NamespacedCache:
+        return ConcurrentInMemoryCache().namespace("svc")
+
+
+def _parents(tmp_path):
+    yield InMemoryCache()
+    yield ConcurrentInMemoryCache()
+    yield DiskCache(tmp_path / "ns.db")
+    yield DiskCache(tmp_path / "ns-wb.db", write_behind=True)
+    yield TieredCache(DiskCache(tmp_path / "tiered.db"))
+    fakeredis = pytest.importorskip("fakeredis")
+    from dd_cache.adapters.redis_adapter import RedisCache
+    yield RedisCache(client=fakeredis.FakeRedis())
+
+
+def test_clear_invalidates_only_its_namespace(tmp_path):
+    for parent in _parents(tmp_path):
+        llm, embed = parent.namespace("llm", reclaim_batch=7), parent.namespace("embed")
+        parent.set("plain", 1)
+        llm.set_many({f"k{i}": i for i in range(50)}, ttl={"k0": 60})
+        embed.set("k1", "e")
+        llm.clear()
+        assert llm.get("k1") is None
+        assert llm.get_many(["k0", "k1"]) == {}
+        assert embed.get("k1") == "e"
+        assert parent.get("plain") == 1
+        llm.set("k1", "fresh")
+        assert llm.wait_reclaimed(timeout=10)
+        assert llm.get("k1") == "fresh"
+        assert parent.get("ns:llm:0:k1") is None  # retired generation is gone
+        assert parent.get("ns:embed:0:k1") == "e"
+        llm.close()
+        embed.close()
+        parent.close()
+
+
+def test_generation_is_shared_through_the_backend(tmp_path):
+    a = DiskCache(tmp_path / "shared.db").namespace("svc", generation_ttl=0)
+    b = DiskCache(tmp_path / "shared.db").namespace("svc", generation_ttl=0)
+    a.set("k", "v")
+    assert b.get("k") == "v"
+    b.clear()
+    assert a.get("k") is None
+    assert a.stats().extra["generation"] == 1
+
+
+def test_thread_unsafe_parent_reclaims_inline():
+    parent = InMemoryCache()
+    ns = parent.namespace("svc", reclaim_batch=10)
+    ns.set_many({f"k{i}": i for i in range(35)})
+    ns.clear()
+    assert not ns._reclaimers
+    for _ in range(4):
+        ns.get("x")
+    assert not any(k.startswith("ns:svc:0:") for k in parent._store)
+
+
+def test_invalid_namespace_name():
+    with pytest.raises(CacheError):
+        InMemoryCache().namespace("a:b")
+
+
+def test_prefix_end():
+    assert prefix_end("ns:a:1:") == "ns:a:1;"
+    assert "ns:a:1:zzz" < prefix_end("ns:a:1:")
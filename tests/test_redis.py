@@ -1,10 +1,16 @@
 """Redis cache tests — skipped automatically if redis is not installed or not running."""
+import time
+
 import pytest
 
 redis = pytest.importorskip("redis", reason="redis package not installed")
 
 from dd_cache.adapters.redis_adapter import RedisCache  # noqa: E402
-from tests.conftest import CacheContractMixin, assert_ttl_expiry  # noqa: E402
+from tests.conftest import (  # noqa: E402
+    CacheContractMixin,
+    assert_batch_ttl_expiry,
+    assert_ttl_expiry,
+)
 
 
 def _redis_available() -> bool:
@@ -17,7 +23,7 @@ def _redis_available() -> bool:
         return False
 
 
-pytestmark = pytest.mark.skipif(
+requires_server = pytest.mark.skipif(
     not _redis_available(),
     reason="Redis server not reachable on localhost:6379",
 )
@@ -32,6 +38,7 @@ def redis_cache():
     cache.close()
 
 
+@requires_server
 class TestRedisCache(CacheContractMixin):
     @pytest.fixture(autouse=True)
     def _setup(self, redis_cache):
@@ -44,6 +51,9 @@ class TestRedisCache(CacheContractMixin):
     def test_ttl_expires(self):
         assert_ttl_expiry(self._cache, "redis_ttl", ttl_seconds=1)
 
+    def test_batch_ttl_expires(self):
+        assert_batch_ttl_expiry(self._cache, ttl_seconds=1)
+
     def test_stats_backend_is_redis(self):
         assert self._cache.stats().backend == "redis"
 
@@ -65,3 +75,184 @@ class TestRedisCache(CacheContractMixin):
         from dd_cache.models import CacheError
         with pytest.raises(CacheError, match="redis"):
             RedisCache()
+
+
+class TestFakeRedisCache(CacheContractMixin):
+    """Runs the contract against an in-process fakeredis server."""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        self._server = fakeredis.FakeServer()
+        self._fake = fakeredis.FakeRedis
+
+    def make_cache(self) -> RedisCache:
+        return RedisCache(client=self._fake(server=self._server))
+
+    def test_batch_ttl_expires(self):
+        assert_batch_ttl_expiry(self.make_cache(), ttl_seconds=1)
+
+    def test_set_many_is_pipelined(self):
+        cache = self.make_cache()
+        cache.set_many({f"k{i}": i for i in range(2500)}, ttl=60)
+        assert len(cache.get_many(f"k{i}" for i in range(2500))) == 2500
+        assert cache.delete_many(f"k{i}" for i in range(2500)) == 2500
+
+    def test_fill_lock_is_exclusive_and_owned(self):
+        a = self.make_cache()
+        b = self.make_cache()
+        assert a._acquire_fill_lock("k", timeout=5)
+        assert b._acquire_fill_lock("k", timeout=5) is False
+        b._release_fill_lock("k")  # not b's lock: must be a no-op
+        assert b._acquire_fill_lock("k", timeout=5) is False
+        a._release_fill_lock("k")
+        assert b._acquire_fill_lock("k", timeout=5)
+
+    def test_lookup_reports_expiry(self):
+        cache = self.make_cache()
+        cache.set("k", "v", ttl=60)
+        value, expires_at = cache._lookup("k", with_expiry=True)
+        assert value == "v"
+        assert time.time() + 55 < expires_at <= time.time() + 60
+
+
+class TestFakeRedisKeyFilter(CacheContractMixin):
+    """The contract again, with the in-process key filter in front."""
+
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        self._server = fakeredis.FakeServer()
+        self._fake = fakeredis.FakeRedis
+
+    def make_cache(self) -> RedisCache:
+        return RedisCache(client=self._fake(server=self._server), key_filter=True)
+
+    def test_absent_keys_skip_the_server(self):
+        cache = self.make_cache()
+        cache.set_many({f"k{i}": i for i in range(100)})
+        assert [cache.get(f"absent{i}") for i in range(500)] == [None] * 500
+        assert cache.get_many(["k1", "absent"]) == {"k1": 1}
+        flt = cache.stats().extra["filter"]
+        assert flt["skipped"] + flt["false_positives"] == 501
+        assert flt["false_positive_rate"] < 0.05
+
+    def test_rebuild_picks_up_other_writers(self):
+        cache = self.make_cache()
+        other = RedisCache(client=self._fake(server=self._server))
+        other.set("theirs", 1)
+        assert cache.get("theirs") is None  # not written through this client
+        cache.rebuild_filter()
+        assert cache.get("theirs") == 1
+
+    def test_failed_fill_lock_lets_polls_through(self):
+        a = self.make_cache()
+        b = self.make_cache()
+        assert a._acquire_fill_lock("k", timeout=5)
+        assert b._acquire_fill_lock("k", timeout=5) is False
+        a.set("k", "filled")  # the other client's fill, unseen by b's filter
+        a._release_fill_lock("k")
+        assert b.get("k") == "filled"
+
+
+class TestFakeRedisScan:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        self._client = fakeredis.FakeRedis()
+
+    def test_scans_pass_count_and_skip_internal_keys(self, monkeypatch):
+        cache = RedisCache(client=self._client, scan_count=50)
+        cache.set_many({f"k{i}": i for i in range(120)}, tags=["all"])
+        assert cache._acquire_fill_lock("k1", timeout=5)
+        counts = []
+        scan_iter = self._client.scan_iter
+        monkeypatch.setattr(
+            self._client, "scan_iter",
+            lambda **kw: counts.append(kw["count"]) or scan_iter(**kw),
+        )
+        assert [len(keys) for keys in cache._scan_keys("", 100)] == [100, 20]
+        assert cache.delete_prefix("k") == 120
+        assert counts == [50] * 4  # keys, then their tag lists and tag sets
+        assert self._client.exists("dd-cache:tag:all", "dd-cache:lock:k1") == 2
+
+    def test_lookup_many_reads_expiry_in_bulk(self):
+        cache = RedisCache(client=self._client)
+        cache.set_many({"a": 1, "b": None}, ttl={"a": 30})
+        found = cache._lookup_many(["a", "b", "missing"])
+        assert set(found) == {"a", "b"} and found["b"] == (None, None)
+        assert found["a"][0] == 1 and 29 < found["a"][1] - time.time() <= 30
+
+    def test_delete_prefix_keeps_bookkeeping_keys(self):
+        cache = RedisCache(client=self._client)
+        svc = cache.namespace("svc")
+        svc.set("k", "old")
+        svc.clear()
+        assert svc.wait_reclaimed(5)
+        cache.set("ns:svc:0:k", "old")  # a late write into the retired generation
+        cache.set("dd-user", 1)
+        assert cache._acquire_fill_lock("k", timeout=5)
+        assert cache.delete_prefix("dd") == 1
+        assert cache._ns_generation("svc") == 1
+        assert cache.namespace("svc").get("k") is None
+        assert not cache._acquire_fill_lock("k", timeout=5)
+
+
+class TestFakeRedisTagSets:
+    @pytest.fixture(autouse=True)
+    def _setup(self):
+        fakeredis = pytest.importorskip("fakeredis")
+        self._client = fakeredis.FakeRedis()
+        self._cache = RedisCache(client=self._client, tagging=True)
+
+    def test_untagged_writes_skip_tag_bookkeeping(self, monkeypatch):
+        cache = RedisCache(client=self._client)
+        cache.set("t", 1, tags=["tbl"])
+        monkeypatch.setattr(self._client, "pipeline", lambda **kw: pytest.fail("untagged write used a pipeline"))
+        cache.set("k", 1, ttl=30)
+        assert cache.delete("k") is True
+        assert cache.delete_many(["t", "missing"]) == 1
+        assert self._client.smembers("dd-cache:tag:tbl") == {b"t"}  # left to expire
+
+    def test_overwrite_and_delete_drop_memberships(self):
+        cache = self._cache
+        cache.set_many({f"k{i}": i for i in range(10)}, tags=["tbl", "old"])
+        cache.set("k0", "untagged")
+        cache.set("k1", "retagged", tags=["tbl"])
+        assert cache.delete("k2")
+        assert cache.delete_many(["k3", "k4"]) == 2
+        assert self._client.scard("dd-cache:tag:tbl") == 6
+        assert self._client.scard("dd-cache:tag:old") == 5
+        assert not self._client.exists("dd-cache:keytags:k0", "dd-cache:keytags:k2")
+        assert cache.invalidate_tags("old") == 5
+        assert self._client.scard("dd-cache:tag:tbl") == 1  # only k1 is left
+        assert cache.invalidate_tags("tbl") == 1
+        assert [k for k in self._client.scan_iter("dd-cache:*")] == []
+
+    def test_tag_sets_outlive_their_longest_member(self):
+        cache = self._cache
+        cache.set("a", 1, ttl=10, tags=["t"])
+        assert 9_000 < self._client.pttl("dd-cache:tag:t") <= 10_000
+        cache.set("b", 1, ttl=100, tags=["t"])
+        cache.set("c", 1, ttl=5, tags=["t"])
+        assert 99_000 < self._client.pttl("dd-cache:tag:t") <= 100_000
+        assert 4_000 < self._client.pttl("dd-cache:keytags:c") <= 5_000
+        cache.set("d", 1, tags=["t"])
+        assert self._client.pttl("dd-cache:tag:t") == -1
+        cache.set("e", 1, ttl=1, tags=["t"])
+        assert self._client.pttl("dd-cache:tag:t") == -1
+
+    def test_expired_members_age_out_with_the_set(self):
+        for i in range(100):
+            self._cache.set(f"k{i}", i, ttl=1, tags=["tbl"])
+        time.sleep(1.1)
+        assert not self._client.exists("dd-cache:tag:tbl")
+        assert list(self._client.scan_iter("dd-cache:keytags:*")) == []
+
+    def test_namespace_reclaim_drops_its_tag_sets(self):
+        svc = self._cache.namespace("svc")
+        svc.set("k", 1, tags=["t"])
+        svc.clear()
+        assert svc.wait_reclaimed(5)
+        assert list(self._client.scan_iter("dd-cache:tag:*")) == []
+        assert list(self._client.scan_iter("dd-cache:keytags:*")) == []
@@ -0,0 +1,160 @@
+"""Tests for the similarity-keyed SemanticCache."""
+import threading
+import time
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from dd_cache.adapters.disk import DiskCache  # noqa: E402
+from dd_cache.adapters.memory import ConcurrentInMemoryCache, InMemoryCache  # noqa: E402
+from dd_cache.models import CacheError  # noqa: E402
+from dd_cache.semantic import SemanticCache  # noqa: E402
+
+DIM = 32
+
+
+def _unit(rng, n):
+    v = rng.standard_normal((n, DIM)).astype(np.float32)
+    return v / np.linalg.norm(v, axis=1, keepdims=True)
+
+
+def _near(vec, rng, noise=0.05):
+    return vec + noise * rng.standard_normal(DIM).astype(np.float32) / np.sqrt(DIM)
+
+
+class TestSemanticCache:
+    def make_cache(self, **kwargs) -> SemanticCache:
+        return SemanticCache(InMemoryCache(), dim=DIM, threshold=0.9, **kwargs)
+
+    def test_similar_query_hits_and_dissimilar_misses(self):
+        rng = np.random.default_rng(0)
+        cache = self.make_cache()
+        vecs = _unit(rng, 50)
+        for i, v in enumerate(vecs):
+            cache.set(v, f"answer{i}")
+        value, score = cache.lookup(_near(vecs[7], rng))
+        assert value == "answer7" and score > 0.9
+        assert cache.get(_unit(rng, 1)[0]) is None
+        stats = cache.stats()
+        assert (stats.hits, stats.misses, stats.total_keys) == (1, 1, 50)
+
+    def test_get_many_batches_queries(self):
+        rng = np.random.default_rng(1)
+        cache = self.make_cache()
+        vecs = _unit(rng, 20)
+        for i, v in enumerate(vecs):
+            cache.set(v, i)
+        queries = [_near(vecs[3], rng), _unit(rng, 1)[0], vecs[11]]
+        assert cache.get_many(queries) == [3, None, 11]
+        assert cache.get_many([]) == []
+
+    def test_string_queries_use_embed(self):
+        table = {"hello": [1.0] + [0.0] * (DIM - 1), "hi": [0.99, 0.1] + [0.0] * (DIM - 2)}
+        cache = self.make_cache(embed=table.__getitem__)
+        cache.set("hello", "greeting")
+        assert cache.get("hi") == "greeting"
+        with pytest.raises(CacheError):
+            self.make_cache().get("hello")
+
+    def test_rejects_wrong_dimension_and_unknown_index(self):
+        cache = self.make_cache()
+        with pytest.raises(CacheError):
+            cache.set(np.ones(DIM + 1), "x")
+        with pytest.raises(CacheError):
+            self.make_cache(index="hnsw")
+
+    def test_ttl_and_external_deletes_respected(self):
+        rng = np.random.default_rng(2)
+        backing = InMemoryCache()
+        cache = SemanticCache(backing, dim=DIM, threshold=0.9)
+        a, b = _unit(rng, 2)
+        cache.set(a, "short", ttl=1)
+        key = cache.set(b, "gone")
+        backing.delete(key)  # evicted behind the index's back
+        assert cache.get(b) is None
+        assert cache.stats().extra["rows"] == 2
+        time.sleep(1.1)
+        assert cache.get(a) is None
+        assert cache.stats().total_keys == 0
+
+    def test_falls_back_to_next_candidate(self):
+        backing = InMemoryCache()
+        cache = SemanticCache(backing, dim=DIM, threshold=0.9)
+        best = np.zeros(DIM, dtype=np.float32)
+        best[0] = 1.0
+        second = best.copy()
+        second[1] = 0.2
+        backing.delete(cache.set(best, "best"))
+        cache.set(second, "second")
+        assert cache.lookup(best)[0] == "second"
+
+    def test_delete_and_row_reuse(self):
+        rng = np.random.default_rng(3)
+        cache = self.make_cache()
+        a, b = _unit(rng, 2)
+        cache.set(a, "a")
+        assert cache.delete(a) and not cache.delete(a)
+        cache.set(b, "b")
+        assert cache.stats().extra["rows"] == 1
+        assert cache.get(a) is None and cache.get(b) == "b"
+        cache.clear()
+        assert cache.get(b) is None and cache.stats().total_keys == 0
+
+    def test_get_or_set_single_flight(self):
+        rng = np.random.default_rng(4)
+        cache = SemanticCache(ConcurrentInMemoryCache(), dim=DIM, threshold=0.9)
+        query = _unit(rng, 1)[0]
+        calls = []
+
+        def compute():
+            calls.append(1)
+            time.sleep(0.1)
+            return "computed"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(cache.get_or_set(query, compute)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        assert results == ["computed"] * 8
+        assert len(calls) == 1
+        assert cache.get_or_set(_near(query, rng), compute) == "computed"
+        assert len(calls) == 1
+
+    def test_rebuild_from_persistent_cache(self, tmp_path):
+        rng = np.random.default_rng(5)
+        vecs = _unit(rng, 30)
+        disk = DiskCache(str(tmp_path / "sem.db"))
+        cache = SemanticCache(disk, dim=DIM, threshold=0.9)
+        for i, v in enumerate(vecs):
+            cache.set(v, i, ttl=3600 if i % 2 else None)
+        disk.set("unrelated", 1)
+        disk.close()
+
+        disk = DiskCache(str(tmp_path / "sem.db"))
+        cache = SemanticCache(disk, dim=DIM, threshold=0.9)
+        assert cache.get(vecs[4]) is None
+        assert cache.rebuild(batch=7) == 30
+        assert cache.get(_near(vecs[4], rng)) == 4
+        assert cache.stats().ttl_enabled
+        disk.close()
+
+    def test_ivf_index_finds_neighbours(self):
+        rng = np.random.default_rng(6)
+        cache = self.make_cache(index="ivf", train_size=500, nprobe=4)
+        vecs = _unit(rng, 2000)
+        for i, v in enumerate(vecs):
+            cache.set(v, i)
+        assert cache.stats().extra["nlist"] > 1
+        probes = rng.choice(2000, 100, replace=False)
+        found = cache.get_many([_near(vecs[i], rng, noise=0.02) for i in probes])
+        assert sum(f == i for f, i in zip(found, probes)) >= 90
+        cache.delete(vecs[probes[0]])
+        assert cache.get(vecs[probes[0]]) is None
+        cache.set(vecs[probes[0]], "again")
+        assert cache.get(vecs[probes[0]]) == "again"
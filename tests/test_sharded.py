@@ -0,0 +1,81 @@
+import pytest
+
+from dd_cache.adapters.disk import DiskCache
+from dd_cache.adapters.memory import ConcurrentInMemoryCache, InMemoryCache
+from dd_cache.adapters.sharded import ShardedCache
+from dd_cache.models import CacheError
+from tests.conftest import CacheContractMixin, assert_batch_ttl_expiry, assert_ttl_expiry
+
+
+class TestShardedCache(CacheContractMixin):
+    def make_cache(self) -> ShardedCache:
+        return ShardedCache([ConcurrentInMemoryCache() for _ in range(3)])
+
+    def test_stats_backend_name(self):
+        assert self.make_cache().stats().backend == "sharded"
+
+    def test_ttl_expires(self):
+        assert_ttl_expiry(self.make_cache(), "ttl_key", ttl_seconds=1)
+
+    def test_batch_ttl_expires(self):
+        assert_batch_ttl_expiry(self.make_cache(), ttl_seconds=1)
+
+    def test_stats_ttl_enabled_if_any_shard_expires_keys(self, tmp_path):
+        ttl_shard, plain_shard = InMemoryCache(), DiskCache(tmp_path / "plain.db")
+        cache = ShardedCache({"ttl": ttl_shard, "plain": plain_shard})
+        assert not cache.stats().ttl_enabled
+        ttl_shard.set("k", 1, ttl=60)
+        assert not plain_shard.stats().ttl_enabled
+        assert cache.stats().ttl_enabled
+        cache.close()
+
+    def test_keys_spread_over_shards(self):
+        cache = self.make_cache()
+        cache.set_many({f"k{i}": i for i in range(3000)})
+        counts = [s.stats().total_keys for s in cache.shards.values()]
+        assert sum(counts) == 3000
+        assert min(counts) > 700  # roughly a third each
+        for name, shard in cache.shards.items():
+            assert shard.get("k1") == (1 if cache.shard_for("k1") == name else None)
+        cache.close()
+
+    def test_membership_change_moves_few_keys(self):
+        cache = ShardedCache({name: InMemoryCache() for name in "abcd"})
+        keys = [f"k{i}" for i in range(4000)]
+        before = {key: cache.shard_for(key) for key in keys}
+        cache.add_shard("e", InMemoryCache())
+        after = {key: cache.shard_for(key) for key in keys}
+        moved = [key for key in keys if before[key] != after[key]]
+        assert all(after[key] == "e" for key in moved)
+        assert 0.1 < len(moved) / len(keys) < 0.3  # about 1/5
+        cache.remove_shard("e")
+        assert {key: cache.shard_for(key) for key in keys} == before
+
+    def test_remove_shard_validation(self):
+        cache = ShardedCache({"only": InMemoryCache()})
+        with pytest.raises(CacheError):
+            cache.remove_shard("missing")
+        with pytest.raises(CacheError):
+            cache.remove_shard("only")
+        with pytest.raises(CacheError):
+            cache.add_shard("only", InMemoryCache())
+
+    def test_parallel_batches_over_disk_shards(self, tmp_path):
+        cache = ShardedCache([DiskCache(str(tmp_path / f"shard{i}.db")) for i in range(4)])
+        items = {f"k{i}": [i] * 3 for i in range(500)}
+        cache.set_many(items, tags=["batch"])
+        assert cache.get_many([*items, "absent"]) == items
+        assert cache.delete_many(["k1", "k2", "absent"]) == 2
+        assert cache.invalidate_tags("batch") == 498
+        assert cache.stats().total_keys == 0
+        cache.close()
+
+    def test_namespace_spans_shards(self):
+        cache = self.make_cache()
+        ns = cache.namespace("users", generation_ttl=0)
+        ns.set_many({f"k{i}": i for i in range(100)})
+        ns.clear()
+        assert ns.wait_reclaimed(timeout=5)
+        assert ns.get("k1") is None
+        assert cache.stats().total_keys == 0
+        cache.close()
@@ -0,0 +1,138 @@
+import multiprocessing
+import sys
+import threading
+import uuid
+
+import pytest
+
+from dd_cache.models import CacheError
+from tests.conftest import CacheContractMixin, assert_batch_ttl_expiry, assert_ttl_expiry
+
+pytestmark = pytest.mark.skipif(sys.platform == "win32", reason="POSIX shared memory and fcntl locks")
+
+from dd_cache.adapters.shared import SharedMemoryCache  # noqa: E402
+
+
+def _writer(name: str) -> None:
+    cache = SharedMemoryCache(name)
+    cache.set_many({f"child{i}": i for i in range(100)})
+    cache.close()
+
+
+class TestSharedMemoryCache(CacheContractMixin):
+    @pytest.fixture(autouse=True)
+    def _segments(self):
+        self._opened = []
+        yield
+        for cache in self._opened:
+            cache.unlink()
+
+    def make_cache(self, **kwargs) -> SharedMemoryCache:
+        kwargs.setdefault("max_entries", 1024)
+        kwargs.setdefault("arena_bytes", 1024 * 1024)
+        cache = SharedMemoryCache(f"dd-test-{uuid.uuid4().hex[:12]}", **kwargs)
+        self._opened.append(cache)
+        return cache
+
+    def test_stats_backend_name(self):
+        assert self.make_cache().stats().backend == "shared_memory"
+
+    def test_ttl_expires(self):
+        assert_ttl_expiry(self.make_cache(), "ttl_key", ttl_seconds=1)
+
+    def test_batch_ttl_expires(self):
+        assert_batch_ttl_expiry(self.make_cache(), ttl_seconds=1)
+
+    def test_invalidate_tags(self):
+        cache = self.make_cache()
+        with pytest.raises(CacheError):
+            cache.set("a", 1, tags=["users"])
+        with pytest.raises(CacheError):
+            cache.invalidate_tags("users")
+
+    def test_shared_between_processes(self):
+        cache = self.make_cache()
+        cache.set("parent", "hello")
+        ctx = multiprocessing.get_context("spawn")
+        child = ctx.Process(target=_writer, args=(cache._name,))
+        child.start()
+        child.join(30)
+        assert child.exitcode == 0
+        assert cache.get("child42") == 42
+        assert cache.stats().total_keys == 101
+        cache.close()
+
+    def test_attach_uses_existing_sizes(self):
+        cache = self.make_cache(max_entries=64, ways=4)
+        other = SharedMemoryCache(cache._name, max_entries=4096)
+        other.set("k", "v")
+        assert cache.get("k") == "v"
+        assert other.stats().extra["slots"] == 64
+        other.close()
+
+    def test_instances_in_one_process_exclude_each_other(self):
+        cache = self.make_cache(max_entries=8, ways=8)  # a single bucket
+        other = SharedMemoryCache(cache._name)
+        assert other._thread_locks is cache._thread_locks
+
+        def write(target, worker):
+            for i in range(300):
+                target.set(f"k{i % 12}", (worker, i))
+                target.delete(f"k{(i + 6) % 12}")
+
+        threads = [threading.Thread(target=write, args=(c, w)) for w, c in enumerate([cache, other] * 2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        live = sum(cache.exists(f"k{i}") for i in range(12))
+        assert cache.stats().total_keys == other.stats().total_keys == live
+        other.close()
+        cache.set("after", 1)  # the shared lock file is still open
+        assert cache.get("after") == 1
+
+    def test_full_bucket_evicts_oldest(self):
+        cache = self.make_cache(max_entries=8, ways=8)  # a single bucket
+        for i in range(10):
+            cache.set(f"k{i}", i)
+        stats = cache.stats()
+        assert stats.total_keys == 8 and stats.evictions == 2
+        assert cache.get("k0") is None and cache.get("k9") == 9
+
+    def test_arena_wrap_drops_oldest_data(self):
+        cache = self.make_cache(arena_bytes=64 * 1024)
+        blob = b"x" * 4000
+        for i in range(40):
+            cache.set(f"k{i}", blob)
+        assert cache.get("k0") is None
+        assert cache.get("k39") == blob
+        live = sum(cache.exists(f"k{i}") for i in range(40))
+        assert cache.stats().total_keys == live < 40
+
+    def test_rejects_oversized_values(self):
+        with pytest.raises(CacheError):
+            self.make_cache(arena_bytes=8192).set("big", b"x" * 4096)
+
+    def test_delete_after_overwrite_leaves_no_copy(self):
+        cache = self.make_cache()
+        cache.set("k", 1)
+        cache.set("k", 2)
+        assert cache.get("k") == 2
+        assert cache.delete("k") is True
+        assert cache.get("k") is None
+        assert cache.stats().total_keys == 0
+
+    def test_stats_totals_follow_writes(self):
+        cache = self.make_cache()
+        cache.set("a", b"12345")
+        cache.set("b", b"1", ttl=60)
+        cache.set("a", b"123")
+        other = SharedMemoryCache(cache._name)
+        stats = other.stats()
+        assert stats.total_keys == 2 and stats.ttl_enabled
+        assert stats.extra["bytes"] == cache.stats().extra["bytes"] > 0
+        other.delete("b")
+        assert cache.stats().total_keys == 1 and not cache.stats().ttl_enabled
+        cache.clear()
+        assert other.stats().total_keys == 0 and other.stats().extra["bytes"] == 0
+        other.close()
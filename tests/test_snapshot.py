@@ -0,0 +1,57 @@
+import io
+import time
+
+import pytest
+
+from dd_cache.adapters.disk import DiskCache
+from dd_cache.adapters.memory import InMemoryCache
+from dd_cache.codecs import Codec
+from dd_cache.models import CacheError
+from dd_cache.snapshot import migrate, read_snapshot, restore, write_snapshot
+
+
+def test_format_round_trip_keeps_expiry():
+    expires = time.time() + 100
+    entries = [[("a", 1, None), ("b", [1, 2], expires)], [("ü", {"x": None}, None)]]
+    buf = io.BytesIO()
+    assert write_snapshot(entries, buf, codec=Codec("pickle5", compression="zlib"), compress=False) == 3
+    buf.seek(0)
+    assert list(read_snapshot(buf)) == entries
+
+
+def test_truncated_snapshot_is_rejected():
+    buf = io.BytesIO()
+    write_snapshot([[("a", "x" * 100, None)]], buf)
+    with pytest.raises(CacheError):
+        list(read_snapshot(io.BytesIO(buf.getvalue()[:-20])))
+    with pytest.raises(CacheError):
+        list(read_snapshot(io.BytesIO(b"garbage")))
+
+
+def test_restore_skips_expired_and_keeps_remaining_ttl():
+    cache = InMemoryCache()
+    now = time.time()
+    assert restore(cache, [[("live", 1, now + 1), ("gone", 2, now - 1), ("forever", 3, None)]]) == 2
+    assert cache.get("gone") is None
+    assert cache._lookup("live", with_expiry=True)[1] <= now + 2
+    time.sleep(1.1)
+    assert cache.get_many(["live", "forever"]) == {"forever": 3}
+
+
+def test_dump_to_path_and_warm_start(tmp_path):
+    with DiskCache(tmp_path / "cache.db") as disk:
+        disk.set_many({f"k{i}": i for i in range(2500)}, ttl=600)
+        assert disk.dump(tmp_path / "snap.bin") == 2500
+    fresh = InMemoryCache()
+    assert fresh.load(tmp_path / "snap.bin") == 2500
+    assert fresh.get("k2499") == 2499
+
+
+def test_migrate_between_adapters(tmp_path):
+    source = InMemoryCache()
+    source.set_many({"results:1": "a", "results:2": "b", "other": "c"})
+    with DiskCache(tmp_path / "cache.db") as target:
+        assert migrate(source, target, prefix="results:", batch=1) == 2
+        assert target.get_many(["results:1", "results:2", "other"]) == {"results:1": "a", "results:2": "b"}
+        back = InMemoryCache()
+        assert migrate(target, back) == 2
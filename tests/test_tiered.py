@@ -0,0 +1,154 @@
+import time
+
+import pytest
+
+from dd_cache.adapters.disk import DiskCache
+from dd_cache.adapters.memory import InMemoryCache
+from dd_cache.adapters.tiered import TieredCache
+from dd_cache.models import CacheError
+from tests.conftest import CacheContractMixin, assert_batch_ttl_expiry, assert_ttl_expiry
+
+
+class TestTieredCache(CacheContractMixin):
+    def make_cache(self) -> TieredCache:
+        return TieredCache(InMemoryCache(), l1_max_entries=100)
+
+    def test_ttl_expires(self):
+        assert_ttl_expiry(self.make_cache(), "ttl_key", ttl_seconds=1)
+
+    def test_batch_ttl_expires(self):
+        assert_batch_ttl_expiry(self.make_cache(), ttl_seconds=1)
+
+    def test_l2_hit_is_promoted(self):
+        l2 = InMemoryCache()
+        l2.set("k", "v")
+        cache = TieredCache(l2)
+        assert cache.get("k") == "v"
+        l2.clear()  # behind the tier's back: L1 still serves it
+        assert cache.get("k") == "v"
+        extra = cache.stats().extra
+        assert (extra["l1_hits"], extra["l2_hits"], extra["misses"]) == (1, 1, 0)
+        assert extra["l1_hit_ratio"] == 0.5
+        cache.close()
+
+    def test_promoted_entry_keeps_l2_ttl(self):
+        l2 = InMemoryCache()
+        l2.set("k", "v", ttl=1)
+        cache = TieredCache(l2)
+        assert cache.get("k") == "v"
+        time.sleep(1.1)
+        assert cache.get("k") is None
+        cache.close()
+
+    def test_l1_ttl_bounds_staleness(self):
+        l2 = InMemoryCache()
+        cache = TieredCache(l2, l1_ttl=0.2)
+        cache.set("k", "old")
+        l2.set("k", "new")  # another writer updates the backend
+        assert cache.get("k") == "old"
+        time.sleep(0.3)
+        assert cache.get("k") == "new"
+        cache.close()
+
+    def test_delete_and_clear_invalidate_both_tiers(self):
+        l2 = InMemoryCache()
+        cache = TieredCache(l2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.delete("a") is True
+        assert cache.get("a") is None and l2.get("a") is None
+        cache.clear()
+        assert cache.get("b") is None and l2.get("b") is None
+        cache.close()
+
+    def test_get_many_promotes_only_with_l1_ttl(self):
+        l2 = InMemoryCache()
+        l2.set_many({"a": 1, "b": 2})
+        cache = TieredCache(l2, l1_ttl=60)
+        assert cache.get_many(["a", "b", "c"]) == {"a": 1, "b": 2}
+        assert cache.get_many(["a", "b"]) == {"a": 1, "b": 2}
+        extra = cache.stats().extra
+        assert (extra["l1_hits"], extra["l2_hits"], extra["misses"]) == (2, 2, 1)
+        cache.close()
+
+    @pytest.mark.parametrize("wrap", ["plain", "disk", "namespaced", "sharded"])
+    def test_get_many_promotion_keeps_l2_ttl(self, wrap, tmp_path):
+        from dd_cache.adapters.sharded import ShardedCache
+
+        l2 = {
+            "plain": lambda: InMemoryCache(),
+            "disk": lambda: DiskCache(tmp_path / "l2.db"),
+            "namespaced": lambda: InMemoryCache().namespace("svc"),
+            "sharded": lambda: ShardedCache([InMemoryCache(), InMemoryCache()]),
+        }[wrap]()
+        l2.set_many({"short": 1, "long": 2}, ttl={"short": 1})
+        cache = TieredCache(l2, l1_ttl=60)
+        assert cache.get_many(["short", "long"]) == {"short": 1, "long": 2}
+        time.sleep(1.1)
+        assert cache.get_many(["short", "long"]) == {"long": 2}
+        extra = cache.stats().extra
+        assert (extra["l1_hits"], extra["l2_hits"], extra["misses"]) == (1, 2, 1)
+        cache.close()
+
+    def test_rejects_non_positive_l1_ttl(self):
+        with pytest.raises(CacheError):
+            TieredCache(InMemoryCache(), l1_ttl=0)
+
+
+class TestTieredCacheWriteBack(CacheContractMixin):
+    @pytest.fixture(autouse=True)
+    def _tmp_db(self, tmp_path):
+        self._db_path = tmp_path / "tiered.db"
+
+    def make_cache(self) -> TieredCache:
+        return TieredCache(DiskCache(self._db_path), write_back=True, flush_interval=60)
+
+    def test_ttl_expires(self):
+        assert_ttl_expiry(self.make_cache(), "ttl_key", ttl_seconds=1)
+
+    def test_writes_reach_l2_on_flush(self):
+        cache = self.make_cache()
+        cache.set("a", 1)
+        cache.set_many({"b": 2, "c": 3}, ttl={"c": 60})
+        with DiskCache(self._db_path) as other:
+            assert other.get("a") is None
+            assert cache.flush() == 3
+            assert other.get_many(["a", "b", "c"]) == {"a": 1, "b": 2, "c": 3}
+        cache.close()
+
+    def test_reads_see_buffer_after_l1_eviction(self):
+        cache = TieredCache(
+            DiskCache(self._db_path), l1=InMemoryCache(max_entries=1),
+            write_back=True, flush_interval=60,
+        )
+        cache.set("a", 1)
+        cache.set("b", 2)
+        assert cache.get("a") == 1
+        assert cache.exists("a") is True
+        cache.close()
+
+    def test_delete_discards_buffered_write(self):
+        cache = self.make_cache()
+        cache.set("a", 1)
+        assert cache.delete("a") is True
+        cache.flush()
+        assert cache.get("a") is None
+        cache.close()
+
+    def test_flush_deletes_writes_that_expired_while_buffered(self):
+        with DiskCache(self._db_path) as other:
+            other.set("a", "old")
+        cache = self.make_cache()
+        cache.set("a", "new", ttl=1)
+        time.sleep(1.1)
+        assert cache.flush() == 1
+        with DiskCache(self._db_path) as other:
+            assert other.get("a") is None
+        cache.close()
+
+    def test_close_flushes(self):
+        cache = self.make_cache()
+        cache.set("a", 1)
+        cache.close()
+        with DiskCache(self._db_path) as other:
+            assert other.get("a") == 1